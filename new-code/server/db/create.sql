@@ -27,6 +27,7 @@ CREATE TABLE IF NOT EXISTS aircraft_types (
                 model VARCHAR(255),
                 manufacturer VARCHAR(255) NOT NULL,
                 wtc VARCHAR(3),
+                source_hash TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
@@ -42,6 +43,7 @@ CREATE TABLE IF NOT EXISTS airports (
                 region_name VARCHAR(255),
                 latitude DECIMAL(10, 7),
                 longitude DECIMAL(10, 7),
+                source_hash TEXT,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
                 updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
             );
@@ -70,6 +72,7 @@ CREATE TABLE logbook_entries (
     instrument_sim NUMERIC(3,1) NOT NULL DEFAULT 0,
     flight_type VARCHAR(20),
     flight_rule VARCHAR(20),
+    route_distance_km NUMERIC(8,1), -- NULL until data/route_geometry.py measures it, -1 if it can't
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
     updated_at TIMESTAMP,
     FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
@@ -79,5 +82,42 @@ CREATE TABLE logbook_entries (
 CREATE INDEX idx_logbook_user_date ON logbook_entries(user_id, flight_date);
 CREATE INDEX idx_logbook_aircraft ON logbook_entries(aircraft_reg);
 CREATE INDEX idx_route_data ON logbook_entries USING GIN (route_data);
+-- Last write to each entry, for the incremental jobs in data/ (see job_state.ENTRY_CHANGED_AT)
+CREATE INDEX idx_logbook_changed_at ON logbook_entries ((COALESCE(updated_at, created_at)));
 
+-- Per-user monthly hour totals, maintained by data/monthly_hours_rollup.py
+CREATE TABLE IF NOT EXISTS logbook_monthly_hours (
+    user_id INTEGER NOT NULL,
+    year SMALLINT NOT NULL,
+    month SMALLINT NOT NULL,
+    aircraft_reg VARCHAR(10) NOT NULL,
+    day_hours NUMERIC(10,1) NOT NULL DEFAULT 0,
+    night_hours NUMERIC(10,1) NOT NULL DEFAULT 0,
+    instrument_hours NUMERIC(10,1) NOT NULL DEFAULT 0,
+    flight_count INTEGER NOT NULL DEFAULT 0,
+    max_flight_hours NUMERIC(5,1) NOT NULL DEFAULT 0,
+    PRIMARY KEY (user_id, year, month, aircraft_reg),
+    FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+);
 
+-- route_data normalized one row per stop, maintained by data/route_stops_etl.py
+CREATE TABLE IF NOT EXISTS route_stops (
+    entry_id INTEGER NOT NULL,
+    seq SMALLINT NOT NULL,
+    type VARCHAR(20),
+    airport_id INTEGER,
+    custom_name VARCHAR(255),
+    PRIMARY KEY (entry_id, seq),
+    FOREIGN KEY (entry_id) REFERENCES logbook_entries(id) ON DELETE CASCADE
+);
+
+CREATE INDEX IF NOT EXISTS idx_route_stops_airport ON route_stops(airport_id);
+
+-- Watermarks and checkpoints of the batch jobs in data/
+CREATE TABLE IF NOT EXISTS job_state (
+    job VARCHAR(50) PRIMARY KEY,
+    watermark TIMESTAMP,
+    last_id INTEGER,
+    details JSONB NOT NULL DEFAULT '{}',
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+);
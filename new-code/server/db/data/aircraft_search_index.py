@@ -0,0 +1,198 @@
+#!/usr/bin/env python3
+"""
+Inverted token index for /api/aircraft-types/search.
+
+The route ANDs one "contains term" test per search term across designator (with '-' and
+'.' stripped), manufacturer, model and designator || manufacturer || model, then ranks with
+match_priority and match_score. Terms never contain whitespace, so a term is contained in a
+field exactly when it is contained in one of the field's whitespace-separated tokens. This
+index keeps every token with its postings and a sorted table of token suffixes, so "contains
+term" becomes a prefix lookup on the suffix table.
+
+Because the route wraps every term in '%' before it reaches the SQL, two of its CASE arms
+can never fire: the \\m...\\M regex (priority 1) and the designator equality (priority 3).
+The effective ranking, reproduced here, is:
+
+    2. model contains every term
+    4. designator contains the first term
+    5. manufacturer contains every term
+    6. anything else that matched
+
+then match_score DESC (2 per term found in model or designator, else 1 if in manufacturer),
+LENGTH(model), model, with id as a final tie-break, LIMIT 20.
+"""
+import bisect
+import gzip
+import heapq
+import json
+import os
+import sys
+import time
+from typing import Dict, List
+
+import parse_cache
+
+# Bump when the artifact layout changes
+FORMAT_VERSION = 1
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(SCRIPT_DIR, 'aircraft-search-index.json.gz')
+
+AIRCRAFT_FIELDS = ['id', 'designator', 'model', 'manufacturer', 'wtc']
+
+# Which field a token came from, as bits so one posting can cover several fields
+MODEL = 1
+MANUFACTURER = 2
+DESIGNATOR = 4
+DESIGNATOR_STRIPPED = 8
+
+SEARCH_LIMIT = 20
+
+
+def strip_designator(designator: str) -> str:
+    """Same normalization as REPLACE(REPLACE(designator, '-', ''), '.', '') in the route."""
+    return designator.replace('-', '').replace('.', '')
+
+
+def field_tokens(row: Dict) -> Dict[str, int]:
+    """Lower-cased tokens of one row mapped to the fields they appear in."""
+    tokens = {}
+    fields = [
+        (row['model'], MODEL),
+        (row['manufacturer'], MANUFACTURER),
+        (row['designator'], DESIGNATOR),
+        (strip_designator(row['designator']) if row['designator'] is not None else None, DESIGNATOR_STRIPPED),
+    ]
+    for text, bit in fields:
+        if text is None:
+            continue
+        for token in text.lower().split():
+            tokens[token] = tokens.get(token, 0) | bit
+    return tokens
+
+
+def build_index(aircraft: List[Dict]) -> Dict:
+    """Build the artifact from aircraft_types rows (dicts with AIRCRAFT_FIELDS)."""
+    aircraft = sorted(aircraft, key=lambda a: a['id'])
+    postings = {}
+    for position, row in enumerate(aircraft):
+        for token, bits in field_tokens(row).items():
+            postings.setdefault(token, []).append([position, bits])
+
+    tokens = sorted(postings)
+    return {
+        'format_version': FORMAT_VERSION,
+        'aircraft': [[row[field] for field in AIRCRAFT_FIELDS] for row in aircraft],
+        'tokens': tokens,
+        'postings': [postings[token] for token in tokens],
+    }
+
+
+def read_aircraft(conn) -> List[Dict]:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(AIRCRAFT_FIELDS)} FROM aircraft_types;")
+        return [dict(zip(AIRCRAFT_FIELDS, row)) for row in cur.fetchall()]
+
+
+def build_from_table(conn, path: str = INDEX_FILE):
+    start = time.perf_counter()
+    index = build_index(read_aircraft(conn))
+    parse_cache.write_json_gz(path, index)
+    print(f"Built aircraft search index for {len(index['aircraft'])} aircraft types "
+          f"({len(index['tokens'])} tokens) in {time.perf_counter() - start:.2f}s ({path})")
+
+
+class AircraftSearchIndex:
+    """Loaded artifact; load once and call search() per request."""
+
+    def __init__(self, data: Dict):
+        if data.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported aircraft index format {data.get('format_version')}")
+        self.aircraft = [dict(zip(AIRCRAFT_FIELDS, row)) for row in data['aircraft']]
+        self.postings = data['postings']
+
+        # Every suffix of every token, so substring lookups become prefix lookups
+        suffixes = sorted(
+            (token[i:], token_index)
+            for token_index, token in enumerate(data['tokens'])
+            for i in range(len(token))
+        )
+        self.suffixes = [suffix for suffix, _ in suffixes]
+        self.suffix_tokens = [token_index for _, token_index in suffixes]
+
+        # Sort keys for LENGTH(model) ASC, model ASC; NULLs sort last as in Postgres
+        self.model_keys = [
+            (0, len(row['model']), row['model']) if row['model'] is not None else (1, 0, '')
+            for row in self.aircraft
+        ]
+
+    @classmethod
+    def load(cls, path: str = INDEX_FILE) -> 'AircraftSearchIndex':
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    def _fields_containing(self, term: str) -> Dict[int, int]:
+        """Map row position -> bits of the fields that contain term."""
+        start = bisect.bisect_left(self.suffixes, term)
+        stop = bisect.bisect_left(self.suffixes, term + '\uffff')
+        hits = {}
+        for token_index in {self.suffix_tokens[i] for i in range(start, stop)}:
+            for position, bits in self.postings[token_index]:
+                hits[position] = hits.get(position, 0) | bits
+        return hits
+
+    def search(self, query: str, limit: int = SEARCH_LIMIT) -> List[Dict]:
+        terms = [term.lower() for term in query.split()]
+        if not terms:
+            return []
+
+        per_term = [self._fields_containing(term) for term in terms]
+
+        # WHERE: every term must hit some field; the concatenated expression only counts
+        # for the raw designator when the concatenation isn't NULL (i.e. model is set)
+        candidates = None
+        for hits in per_term:
+            matched = {
+                position for position, bits in hits.items()
+                if bits & (MODEL | MANUFACTURER | DESIGNATOR_STRIPPED)
+                or (bits & DESIGNATOR and self.aircraft[position]['model'] is not None)
+            }
+            candidates = matched if candidates is None else candidates & matched
+            if not candidates:
+                return []
+
+        ranked = []
+        for position in candidates:
+            bits = [hits.get(position, 0) for hits in per_term]
+            if all(b & MODEL for b in bits):
+                priority = 2
+            elif bits[0] & DESIGNATOR:
+                priority = 4
+            elif all(b & MANUFACTURER for b in bits):
+                priority = 5
+            else:
+                priority = 6
+            score = sum(2 if b & (MODEL | DESIGNATOR) else 1 if b & MANUFACTURER else 0 for b in bits)
+            ranked.append((priority, -score, self.model_keys[position], self.aircraft[position]['id'], position))
+
+        return [self.aircraft[entry[-1]] for entry in heapq.nsmallest(limit, ranked)]
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python aircraft_search_index.py <query> [<query> ...]")
+        return
+
+    index = AircraftSearchIndex.load()
+    for query in sys.argv[1:]:
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = time.perf_counter() - start
+        print(f"{query!r}: {len(results)} results in {elapsed * 1e6:.0f} µs")
+        for aircraft in results:
+            print(f"  {aircraft['designator'] or '----':<4} {aircraft['manufacturer']} {aircraft['model'] or ''}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,207 @@
+#!/usr/bin/env python3
+"""
+Prebuilt index for /api/airports/search.
+
+The route's SQL matches '%q%' against icao, iata and airport_name, which no B-tree index
+can serve. import_airports.py writes this artifact after each load so lookups can be
+answered from memory with the same result set and ranking tiers:
+
+    1. icao equals q            2. icao starts with q
+    3. iata equals q            4. iata starts with q
+    5. airport_name contains q  6. icao or iata contains q
+
+ties broken by LENGTH(airport_name), airport_name. Names are compared lower-cased, as
+LOWER() does; the final tie-break uses code point order rather than the database collation.
+"""
+import bisect
+import gzip
+import json
+import os
+import sys
+import time
+from typing import Dict, Iterable, List, Optional
+
+import parse_cache
+
+# Bump when the artifact layout changes so old files are rebuilt
+FORMAT_VERSION = 1
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+INDEX_FILE = os.path.join(SCRIPT_DIR, 'airport-search-index.json.gz')
+
+AIRPORT_FIELDS = ['id', 'icao', 'iata', 'airport_name', 'country_code', 'region_name', 'latitude', 'longitude']
+
+# Posting lists are kept for every gram up to this length; longer queries are verified
+# against the shortest posting list of their trigrams
+MAX_GRAM = 3
+
+
+def grams(text: str) -> Iterable[str]:
+    """Every distinct substring of text up to MAX_GRAM characters."""
+    return {text[i:i + n] for n in range(1, MAX_GRAM + 1) for i in range(len(text) - n + 1)}
+
+
+def build_index(airports: List[Dict], source_hash: str, table_md5: str) -> Dict:
+    """Build the artifact from airport rows (dicts with AIRPORT_FIELDS)."""
+    # Store airports in the final tie-break order, so ascending positions are already ranked
+    airports = sorted(airports, key=lambda a: (len(a['airport_name']), a['airport_name']))
+
+    icao, iata = [], []
+    name_grams, code_grams = {}, {}
+    for position, airport in enumerate(airports):
+        for code, codes in ((airport['icao'], icao), (airport['iata'], iata)):
+            if code:
+                codes.append([code.lower(), position])
+        for gram in grams(airport['airport_name'].lower()):
+            name_grams.setdefault(gram, []).append(position)
+        code_text = {g for code in (airport['icao'], airport['iata']) if code for g in grams(code.lower())}
+        for gram in code_text:
+            code_grams.setdefault(gram, []).append(position)
+
+    return {
+        'format_version': FORMAT_VERSION,
+        'source_sha256': source_hash,
+        'table_md5': table_md5,
+        'airports': [[airport[field] for field in AIRPORT_FIELDS] for airport in airports],
+        'icao': sorted(icao),
+        'iata': sorted(iata),
+        'name_grams': name_grams,
+        'code_grams': code_grams,
+    }
+
+
+def read_airports(conn) -> List[Dict]:
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT {', '.join(AIRPORT_FIELDS)} FROM airports;")
+        rows = [dict(zip(AIRPORT_FIELDS, row)) for row in cur.fetchall()]
+    for row in rows:
+        # NUMERIC comes back as Decimal, which JSON can't hold
+        for field in ('latitude', 'longitude'):
+            if row[field] is not None:
+                row[field] = float(row[field])
+    return rows
+
+
+def table_md5(conn) -> str:
+    """
+    Digest of every field the artifact stores, over all airports in id order. A sync, a
+    refresh swap or a manual fix can change ids or rows without the CSV changing.
+    """
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT md5(COALESCE(string_agg(ROW({', '.join(AIRPORT_FIELDS)})::text, ',' ORDER BY id), ''))
+            FROM airports;
+        """)
+        return cur.fetchone()[0]
+
+
+def read_header(path: str) -> Optional[Dict]:
+    """Version and source digests of an existing artifact, or None if there isn't a usable one."""
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            data = json.load(file)
+        return {field: data.get(field) for field in ('format_version', 'source_sha256', 'table_md5')}
+    except (OSError, ValueError):
+        return None
+
+
+def build_if_stale(conn, csv_path: str, path: str = INDEX_FILE, force: bool = False) -> bool:
+    """Rebuild the artifact unless it was already built from this CSV and these airports rows."""
+    source_hash = parse_cache.file_sha256(csv_path)
+    # Taken before the rows are read, so a change in between shows up as stale next time
+    digest = table_md5(conn)
+    header = read_header(path)
+    if not force and header == {'format_version': FORMAT_VERSION, 'source_sha256': source_hash, 'table_md5': digest}:
+        print(f"Airport search index is up to date ({path})")
+        return False
+
+    start = time.perf_counter()
+    index = build_index(read_airports(conn), source_hash, digest)
+    parse_cache.write_json_gz(path, index)
+    print(f"Built airport search index for {len(index['airports'])} airports "
+          f"in {time.perf_counter() - start:.2f}s ({path})")
+    return True
+
+
+class AirportSearchIndex:
+    """Loaded artifact; load once and call search() per request."""
+
+    def __init__(self, data: Dict):
+        if data.get('format_version') != FORMAT_VERSION:
+            raise ValueError(f"Unsupported airport index format {data.get('format_version')}")
+        self.airports = [dict(zip(AIRPORT_FIELDS, row)) for row in data['airports']]
+        self.names = [airport['airport_name'].lower() for airport in self.airports]
+        self.icao_codes = [code for code, _ in data['icao']]
+        self.icao_positions = [position for _, position in data['icao']]
+        self.iata_codes = [code for code, _ in data['iata']]
+        self.iata_positions = [position for _, position in data['iata']]
+        self.name_grams = data['name_grams']
+        self.code_grams = data['code_grams']
+
+    @classmethod
+    def load(cls, path: str = INDEX_FILE) -> 'AirportSearchIndex':
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return cls(json.load(file))
+
+    @staticmethod
+    def _prefix(codes: List[str], positions: List[int], query: str, exact: bool) -> List[int]:
+        start = bisect.bisect_left(codes, query)
+        stop = bisect.bisect_right(codes, query) if exact else bisect.bisect_left(codes, query + '\uffff')
+        return sorted(positions[start:stop])
+
+    def _containing(self, postings: Dict[str, List[int]], query: str, matches) -> Iterable[int]:
+        """Ascending positions whose text contains query, driven by the rarest gram."""
+        if not query:
+            return range(len(self.airports))
+        if len(query) <= MAX_GRAM:
+            return postings.get(query, [])
+        trigrams = [query[i:i + MAX_GRAM] for i in range(len(query) - MAX_GRAM + 1)]
+        candidates = min((postings.get(gram, []) for gram in trigrams), key=len)
+        return (position for position in candidates if matches(position))
+
+    def _code_contains(self, position: int, query: str) -> bool:
+        airport = self.airports[position]
+        return any(code and query in code.lower() for code in (airport['icao'], airport['iata']))
+
+    def search(self, query: str, limit: int = 10) -> List[Dict]:
+        query = query.lower()
+        tiers = [
+            lambda: self._prefix(self.icao_codes, self.icao_positions, query, exact=True),
+            lambda: self._prefix(self.icao_codes, self.icao_positions, query, exact=False),
+            lambda: self._prefix(self.iata_codes, self.iata_positions, query, exact=True),
+            lambda: self._prefix(self.iata_codes, self.iata_positions, query, exact=False),
+            lambda: self._containing(self.name_grams, query, lambda p: query in self.names[p]),
+            lambda: self._containing(self.code_grams, query, lambda p: self._code_contains(p, query)),
+        ]
+
+        results = []
+        seen = set()
+        for tier in tiers:
+            for position in tier():
+                if position in seen:
+                    continue
+                seen.add(position)
+                results.append(self.airports[position])
+                if len(results) == limit:
+                    return results
+        return results
+
+
+def main():
+    if len(sys.argv) < 2:
+        print("Usage: python airport_search_index.py <query> [<query> ...]")
+        return
+
+    index = AirportSearchIndex.load()
+    for query in sys.argv[1:]:
+        start = time.perf_counter()
+        results = index.search(query)
+        elapsed = time.perf_counter() - start
+        print(f"{query!r}: {len(results)} results in {elapsed * 1e6:.0f} µs")
+        for airport in results:
+            print(f"  {airport['id']:>6} {airport['icao'] or '----'} {airport['iata'] or '---'} {airport['airport_name']}")
+
+
+if __name__ == "__main__":
+    main()
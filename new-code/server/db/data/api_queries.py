@@ -0,0 +1,264 @@
+"""
+SQL run by the API routes in server/index.js, copied here so the Python tools measure
+the same queries the server executes. Keep the two in sync by hand.
+"""
+from typing import List
+
+# /api/statistics/:userId; /api/dashboard/:userId runs the same SQL, so it isn't measured separately
+STATISTICS_SQL = """
+      WITH total_hours AS (
+        SELECT 
+          COALESCE(SUM(icus_day + icus_night + dual_day + dual_night + command_day + 
+            command_night + co_pilot_day + co_pilot_night + instrument_flight + instrument_sim), 0) 
+          AS summed_hours,
+          DATE_PART('year', flight_date) AS flight_year,
+          DATE_PART('month', flight_date) AS flight_month
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s
+        GROUP BY flight_year, flight_month
+      ),
+      lifetime_hours AS (
+        SELECT COALESCE(SUM(icus_day + icus_night + dual_day + dual_night + command_day + 
+          command_night + co_pilot_day + co_pilot_night + instrument_flight + instrument_sim), 0) 
+        AS lifetime_hours
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s
+      ),
+      monthly_hours AS (
+        SELECT COALESCE(SUM(summed_hours), 0) AS hours_this_month 
+        FROM total_hours
+        WHERE flight_year = DATE_PART('year', CURRENT_DATE)
+          AND flight_month = DATE_PART('month', CURRENT_DATE)
+      ),
+      yearly_hours AS (
+        SELECT COALESCE(SUM(summed_hours), 0) AS hours_this_year 
+        FROM total_hours
+        WHERE flight_year = DATE_PART('year', CURRENT_DATE)
+      ),
+      popular_airport AS (
+        SELECT 
+            COALESCE(
+                jsonb_build_object(
+                    'icao', airports.icao,
+                    'name', airports.airport_name
+                )::text,
+                ''
+            ) AS most_common_airport
+        FROM logbook_entries,
+             jsonb_array_elements(route_data) AS route_stops
+             JOIN airports ON (route_stops->>'airport_id')::integer = airports.id
+        WHERE logbook_entries.user_id = %(user_id)s
+          AND route_data IS NOT NULL
+        GROUP BY airports.icao, airports.airport_name
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+      ),
+      popular_plane AS (
+        SELECT COALESCE(ua.aircraft_designator || ' - ' || ua.aircraft_manufacturer || ' ' || ua.aircraft_model, '') AS most_common_plane
+        FROM logbook_entries le
+        JOIN user_aircraft ua ON ua.user_id = le.user_id AND ua.aircraft_reg = le.aircraft_reg
+        WHERE le.user_id = %(user_id)s
+          AND le.flight_date >= DATE_TRUNC('month', CURRENT_DATE)
+        GROUP BY ua.aircraft_designator, ua.aircraft_manufacturer, ua.aircraft_model
+        ORDER BY COUNT(*) DESC
+        LIMIT 1
+      ),
+      longest_flight AS (
+        SELECT 
+          COALESCE(MAX(icus_day + icus_night + dual_day + dual_night + command_day + 
+            command_night + co_pilot_day + co_pilot_night + instrument_flight + instrument_sim), 0) 
+          AS longest_flight
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s
+          AND flight_date >= DATE_TRUNC('month', CURRENT_DATE)
+      ),
+      average_flight_duration AS (
+        SELECT 
+          COALESCE(AVG(icus_day + icus_night + dual_day + dual_night + command_day + 
+            command_night + co_pilot_day + co_pilot_night + instrument_flight + instrument_sim), 0) 
+          AS average_flight_duration
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s
+      ),
+      night_flight_hours AS (
+        SELECT 
+          COALESCE(SUM(icus_night + dual_night + command_night + co_pilot_night), 0) 
+          AS night_flight_hours
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s
+      )
+      SELECT 
+        COALESCE(mh.hours_this_month, 0) AS hours_this_month,
+        COALESCE(yh.hours_this_year, 0) AS hours_this_year,
+        COALESCE(lh.lifetime_hours, 0) AS lifetime_hours,
+        COALESCE(pa.most_common_airport, '') AS popular_airport,
+        COALESCE(pp.most_common_plane, '') AS popular_plane,
+        COALESCE(lf.longest_flight, 0) AS longest_flight,
+        COALESCE(afd.average_flight_duration, 0) AS average_flight_duration,
+        COALESCE(nfh.night_flight_hours, 0) AS night_flight_hours
+      FROM 
+        (SELECT 0 AS dummy) d
+        LEFT JOIN monthly_hours mh ON true
+        LEFT JOIN yearly_hours yh ON true
+        LEFT JOIN lifetime_hours lh ON true
+        LEFT JOIN popular_airport pa ON true
+        LEFT JOIN popular_plane pp ON true
+        LEFT JOIN longest_flight lf ON true
+        LEFT JOIN average_flight_duration afd ON true
+        LEFT JOIN night_flight_hours nfh ON true;
+    """
+
+# The hour figures of STATISTICS_SQL answered from logbook_monthly_hours instead of
+# logbook_entries (see monthly_hours_rollup.py); the airport and plane figures aren't rolled up
+STATISTICS_ROLLUP_SQL = """
+      SELECT
+        COALESCE(SUM(day_hours + night_hours + instrument_hours) FILTER (
+          WHERE year = DATE_PART('year', CURRENT_DATE) AND month = DATE_PART('month', CURRENT_DATE)
+        ), 0) AS hours_this_month,
+        COALESCE(SUM(day_hours + night_hours + instrument_hours) FILTER (
+          WHERE year = DATE_PART('year', CURRENT_DATE)
+        ), 0) AS hours_this_year,
+        COALESCE(SUM(day_hours + night_hours + instrument_hours), 0) AS lifetime_hours,
+        COALESCE(MAX(max_flight_hours) FILTER (
+          WHERE MAKE_DATE(year, month, 1) >= DATE_TRUNC('month', CURRENT_DATE)
+        ), 0) AS longest_flight,
+        COALESCE(SUM(day_hours + night_hours + instrument_hours) / NULLIF(SUM(flight_count), 0), 0)
+          AS average_flight_duration,
+        COALESCE(SUM(night_hours), 0) AS night_flight_hours
+      FROM logbook_monthly_hours
+      WHERE user_id = %(user_id)s;
+    """
+
+# The popular_airport figure of STATISTICS_SQL, and the same answered from route_stops
+# (see route_stops_etl.py) through idx_logbook_user_date and the route_stops primary key
+POPULAR_AIRPORT_SQL = """
+        SELECT airports.icao, airports.airport_name, COUNT(*) AS visits
+        FROM logbook_entries,
+             jsonb_array_elements(route_data) AS route_stops
+             JOIN airports ON (route_stops->>'airport_id')::integer = airports.id
+        WHERE logbook_entries.user_id = %(user_id)s
+          AND route_data IS NOT NULL
+        GROUP BY airports.icao, airports.airport_name
+        ORDER BY COUNT(*) DESC
+        LIMIT 1;
+    """
+
+POPULAR_AIRPORT_ROUTE_STOPS_SQL = """
+        SELECT airports.icao, airports.airport_name, SUM(v.visits) AS visits
+        FROM (
+            -- Count per airport id first, so airports is joined once per distinct airport
+            SELECT rs.airport_id, COUNT(*) AS visits
+            FROM logbook_entries le
+            JOIN route_stops rs ON rs.entry_id = le.id
+            WHERE le.user_id = %(user_id)s
+            GROUP BY rs.airport_id
+        ) v
+        JOIN airports ON airports.id = v.airport_id
+        GROUP BY airports.icao, airports.airport_name
+        ORDER BY SUM(v.visits) DESC
+        LIMIT 1;
+    """
+
+# /api/airports/search
+AIRPORT_SEARCH_SQL = """
+      SELECT 
+        id, icao, iata, airport_name, country_code, 
+        region_name, latitude, longitude
+      FROM airports
+      WHERE 
+        LOWER(icao) LIKE LOWER(%(pattern)s) OR
+        LOWER(iata) LIKE LOWER(%(pattern)s) OR
+        LOWER(airport_name) LIKE LOWER('%%' || %(query)s || '%%')
+      ORDER BY 
+        CASE 
+          WHEN LOWER(icao) = LOWER(%(query)s) THEN 1
+          WHEN LOWER(icao) LIKE LOWER(%(query)s || '%%') THEN 2
+          WHEN LOWER(iata) = LOWER(%(query)s) THEN 3
+          WHEN LOWER(iata) LIKE LOWER(%(query)s || '%%') THEN 4
+          WHEN LOWER(airport_name) LIKE LOWER('%%' || %(query)s || '%%') THEN 5
+          ELSE 6
+        END,
+        LENGTH(airport_name),
+        airport_name
+      LIMIT 10;
+"""
+
+
+def airport_search_params(query: str) -> dict:
+    return {'pattern': f"%{query}%", 'query': query}
+
+
+def aircraft_search_terms(query: str) -> List[str]:
+    return [term for term in query.split() if term]
+
+
+def aircraft_search_sql(term_count: int) -> str:
+    """/api/aircraft-types/search builds its SQL from the number of search terms."""
+    terms = [f"%(t{i})s" for i in range(term_count)]
+
+    conditions = ' AND '.join(f"""
+      (
+        LOWER(REPLACE(REPLACE(designator, '-', ''),'.', '' )) LIKE LOWER({t}) OR
+        LOWER(manufacturer) LIKE LOWER({t}) OR
+        LOWER(model) LIKE LOWER({t}) OR
+        LOWER(designator || ' ' || manufacturer || ' ' || model) LIKE LOWER({t})
+      )
+    """ for t in terms)
+
+    exact_model = ' AND '.join(f"LOWER(model) ~ ('\\m' || LOWER({t}) || '\\M')" for t in terms)
+    partial_model = ' AND '.join(f"LOWER(model) LIKE LOWER({t})" for t in terms)
+    manufacturer = ' AND '.join(f"LOWER(manufacturer) LIKE LOWER({t})" for t in terms)
+    score = ' + '.join(f"""
+            CASE WHEN LOWER(model) LIKE LOWER({t}) THEN 2
+                 WHEN LOWER(designator) LIKE LOWER({t}) THEN 2
+                 WHEN LOWER(manufacturer) LIKE LOWER({t}) THEN 1
+                 ELSE 0
+            END
+          """ for t in terms)
+
+    return f"""
+      WITH search_results AS (
+        SELECT 
+          id, 
+          designator, 
+          model, 
+          manufacturer, 
+          wtc,
+          CASE
+            -- Exact matches in model get highest priority
+            WHEN {exact_model} THEN 1
+            -- Partial word matches in model get second priority
+            WHEN {partial_model} THEN 2
+            -- Exact matches in designator get third priority
+            WHEN LOWER(designator) = LOWER(%(t0)s) THEN 3
+            -- Partial matches in designator get fourth priority
+            WHEN LOWER(designator) LIKE LOWER(%(t0)s || '%%') THEN 4
+            -- Matches in manufacturer get fifth priority
+            WHEN {manufacturer} THEN 5
+            -- Any other matches get lowest priority
+            ELSE 6
+          END as match_priority,
+          -- Calculate how many search terms match
+          {score} as match_score
+        FROM aircraft_types
+        WHERE {conditions}
+      )
+      SELECT 
+        id, 
+        designator, 
+        model, 
+        manufacturer, 
+        wtc
+      FROM search_results
+      ORDER BY 
+        match_priority ASC,
+        match_score DESC,
+        LENGTH(model) ASC,
+        model ASC
+      LIMIT 20;
+    """
+
+
+def aircraft_search_params(query: str) -> dict:
+    # Like the route, every term is wrapped in wildcards before it reaches the SQL
+    return {f"t{i}": f"%{term}%" for i, term in enumerate(aircraft_search_terms(query))}
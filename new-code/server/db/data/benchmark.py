@@ -0,0 +1,344 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for the reference-data importers, the test-data generator, route geometry and the
+heavy API queries.
+
+The import cases truncate and reload tables, so point this at a throwaway database:
+
+    python benchmark.py run --database-url postgres://.../bench --output results.json
+    python benchmark.py compare baseline.json results.json --threshold 0.10
+
+A case that fails stops the run with a non-zero exit, and no report is written.
+"""
+import argparse
+import json
+import multiprocessing
+import os
+import platform
+import queue as queue_module
+import statistics
+import sys
+import time
+from datetime import date, datetime
+from typing import Callable, Dict, List, Optional
+
+import psycopg2
+from dotenv import load_dotenv
+
+import api_queries
+import import_profile
+
+# Load environment variables
+load_dotenv()
+
+AIRPORT_QUERIES = ['syd', 'ymml', 'kjfk', 'international', 'heathrow', 'x']
+AIRCRAFT_QUERIES = ['737', 'cessna 172', 'a320', 'pa-28', 'boeing 787 dreamliner']
+
+
+# Import cases. Each runs in a freshly spawned process so peak RSS belongs to that case
+# alone, and returns the rows handled and the seconds spent in the stage being measured.
+
+def case_import_airports(database_url: str, mode: str) -> Dict:
+    import import_airports
+    conn = psycopg2.connect(database_url)
+    try:
+        start = time.perf_counter()
+        if mode == 'bulk':
+            rows = import_airports.import_airports_bulk(conn)
+        else:
+            rows = import_airports.import_airports(conn)
+        return {'rows': rows, 'seconds': time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def case_aircraft_parse(database_url: str, workers: int) -> Dict:
+    import import_aircraft_data
+    start = time.perf_counter()
+    # Count without keeping the entries, as the streaming load does
+    rows = sum(1 for _ in import_aircraft_data.iter_aircraft(import_aircraft_data.PDF_FILE, workers))
+    return {'rows': rows, 'seconds': time.perf_counter() - start}
+
+
+def case_aircraft_load(database_url: str) -> Dict:
+    import import_aircraft_data
+    # Parsing is measured separately; take the entries from the parse cache when possible
+    aircraft_data = list(import_aircraft_data.load_aircraft(import_aircraft_data.PDF_FILE, os.cpu_count() or 1))
+    conn = psycopg2.connect(database_url)
+    try:
+        start = time.perf_counter()
+        import_aircraft_data.import_aircraft_types(conn, aircraft_data)
+        return {'rows': len(aircraft_data), 'seconds': time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def case_generate(database_url: str, rows: int, flights_per_user: int, workers: int) -> Dict:
+    import generate_logbook_data
+    options = generate_logbook_data.build_options(
+        users=max(1, rows // flights_per_user),
+        flights_per_user=min(rows, flights_per_user),
+        start_date=date(2005, 1, 1),
+        end_date=date(2025, 12, 31),
+        prefix='bench_',
+    )
+    conn = psycopg2.connect(database_url)
+    try:
+        start = time.perf_counter()
+        loaded = generate_logbook_data.generate(conn, options, workers, database_url)
+        return {'rows': loaded, 'seconds': time.perf_counter() - start}
+    finally:
+        conn.close()
+
+
+def case_route_distances(database_url: str, legs: int) -> Dict:
+    import route_geometry
+    conn = psycopg2.connect(database_url)
+    try:
+        geometry = route_geometry.AirportGeometry.from_db(conn)
+    finally:
+        conn.close()
+    timings = route_geometry.microbenchmark(geometry, legs, queries=legs // 10, k=5)
+    # The vectorized route pass is the number to track; the rest is printed for reference
+    name, count, _, seconds = next(t for t in timings if t[0] == 'route distances (vectorized)')
+    return {'rows': count, 'seconds': seconds}
+
+
+def _child(queue, case: Callable, args: tuple):
+    try:
+        result = case(*args)
+        result['peak_rss_kb'] = import_profile.peak_rss_kb()
+        queue.put(result)
+    except Exception as e:
+        queue.put({'error': f"{type(e).__name__}: {e}"})
+
+
+def run_isolated(name: str, case: Callable, *args, size: Optional[int] = None) -> Dict:
+    print(f"Running {name}{f' ({size} rows)' if size else ''}...")
+    context = multiprocessing.get_context('spawn')
+    queue = context.Queue()
+    process = context.Process(target=_child, args=(queue, case, args))
+    process.start()
+    while True:
+        try:
+            result = queue.get(timeout=1)
+            break
+        except queue_module.Empty:
+            # A child killed by a signal never reports back
+            if not process.is_alive():
+                result = {'error': f"process exited with code {process.exitcode}"}
+                break
+    process.join()
+    return summarize(name, size, result)
+
+
+class BenchmarkError(RuntimeError):
+    """A case that failed; the run stops rather than reporting a number it didn't measure."""
+
+
+def summarize(name: str, size: Optional[int], result: Dict) -> Dict:
+    if 'error' in result:
+        raise BenchmarkError(f"{name} failed: {result['error']}")
+    summary = {'case': name, 'size': size}
+    seconds = result['seconds']
+    summary.update({
+        'wall_seconds': round(seconds, 6),
+        'rows': result['rows'],
+        'rows_per_sec': round(result['rows'] / seconds, 1) if seconds else None,
+        'peak_rss_kb': result.get('peak_rss_kb'),
+    })
+    for key in ('p95_seconds', 'calls'):
+        if key in result:
+            summary[key] = result[key]
+    print(f"  {summary['wall_seconds']:.4f}s, {summary['rows']} rows")
+    return summary
+
+
+# Query cases run in this process; the time that matters is spent in the server.
+
+def time_query(conn, sql, param_sets: List[Dict], repeat: int) -> Dict:
+    """Median time over `repeat` rounds of running sql (or sql(params)) once per parameter set."""
+    timings = []
+    rows = 0
+    with conn.cursor() as cur:
+        # Warm the cache so the first round isn't an outlier
+        for params in param_sets:
+            cur.execute(sql(params) if callable(sql) else sql, params)
+            cur.fetchall()
+        for _ in range(repeat):
+            start = time.perf_counter()
+            rows = 0
+            for params in param_sets:
+                cur.execute(sql(params) if callable(sql) else sql, params)
+                rows += len(cur.fetchall())
+            timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {
+        'rows': rows,
+        'seconds': statistics.median(timings),
+        'p95_seconds': round(timings[min(len(timings) - 1, int(len(timings) * 0.95))], 6),
+        'calls': len(param_sets),
+    }
+
+
+def run_query(conn, name: str, size: Optional[int], sql, param_sets: List[Dict], repeat: int) -> Dict:
+    print(f"Running {name}{f' ({size} rows)' if size else ''}...")
+    try:
+        result = time_query(conn, sql, param_sets, repeat)
+    except psycopg2.Error as e:
+        conn.rollback()
+        result = {'error': f"{type(e).__name__}: {e}".strip()}
+    return summarize(name, size, result)
+
+
+def heaviest_user(conn) -> Optional[int]:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT user_id FROM logbook_entries
+            GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1;
+        """)
+        row = cur.fetchone()
+    return row[0] if row else None
+
+
+def analyze(database_url: str):
+    conn = psycopg2.connect(database_url)
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("VACUUM ANALYZE logbook_entries;")
+    finally:
+        conn.close()
+
+
+def run(args) -> List[Dict]:
+    url = args.database_url
+    results = []
+
+    if 'import' in args.groups:
+        results.append(run_isolated('import_airports.bulk', case_import_airports, url, 'bulk'))
+        results.append(run_isolated('import_airports.row', case_import_airports, url, 'row'))
+        results.append(run_isolated('aircraft.parse.serial', case_aircraft_parse, url, 1))
+        results.append(run_isolated('aircraft.parse.parallel', case_aircraft_parse, url, args.workers))
+        results.append(run_isolated('aircraft.load', case_aircraft_load, url))
+
+    if 'geometry' in args.groups:
+        results.append(run_isolated('route_distances', case_route_distances, url, args.legs, size=args.legs))
+
+    if 'query' in args.groups:
+        conn = psycopg2.connect(url)
+        try:
+            results.append(run_query(conn, 'query.airports_search', None, api_queries.AIRPORT_SEARCH_SQL,
+                                     [api_queries.airport_search_params(q) for q in AIRPORT_QUERIES], args.repeat))
+            results.append(run_query(conn, 'query.aircraft_types_search', None,
+                                     lambda params: api_queries.aircraft_search_sql(len(params)),
+                                     [api_queries.aircraft_search_params(q) for q in AIRCRAFT_QUERIES], args.repeat))
+        finally:
+            conn.close()
+
+    for size in args.sizes:
+        if 'generate' in args.groups:
+            results.append(run_isolated('generate_logbook_data', case_generate, url, size,
+                                        args.flights_per_user, args.workers, size=size))
+            analyze(url)
+        if 'query' in args.groups:
+            conn = psycopg2.connect(url)
+            try:
+                user_id = heaviest_user(conn)
+                params = [{'user_id': user_id}]
+                results.append(run_query(conn, 'query.statistics', size, api_queries.STATISTICS_SQL,
+                                         params, args.repeat))
+                results.append(run_query(conn, 'query.statistics_rollup', size,
+                                         api_queries.STATISTICS_ROLLUP_SQL, params, args.repeat))
+                results.append(run_query(conn, 'query.popular_airport', size,
+                                         api_queries.POPULAR_AIRPORT_SQL, params, args.repeat))
+                results.append(run_query(conn, 'query.popular_airport_route_stops', size,
+                                         api_queries.POPULAR_AIRPORT_ROUTE_STOPS_SQL, params, args.repeat))
+            finally:
+                conn.close()
+
+    return results
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> bool:
+    """Print a comparison table and return True if any case got slower than the threshold allows."""
+    base = {(r['case'], r['size']): r for r in baseline['results']}
+    regressed = False
+    print(f"{'case':<32} {'size':>10} {'baseline':>12} {'current':>12} {'change':>9}")
+    for result in current['results']:
+        key = (result['case'], result['size'])
+        old = base.get(key)
+        size = result['size'] if result['size'] is not None else '-'
+        if old is None or 'wall_seconds' not in old:
+            print(f"{result['case']:<32} {size:>10} {'-':>12} {result.get('wall_seconds', 'error'):>12}")
+            continue
+        if 'wall_seconds' not in result:
+            print(f"{result['case']:<32} {size:>10} {old['wall_seconds']:>12.4f} {'error':>12}  REGRESSION")
+            regressed = True
+            continue
+        change = (result['wall_seconds'] - old['wall_seconds']) / old['wall_seconds'] if old['wall_seconds'] else 0.0
+        flag = ''
+        if change > threshold:
+            flag = '  REGRESSION'
+            regressed = True
+        elif change < -threshold:
+            flag = '  faster'
+        print(f"{result['case']:<32} {size:>10} {old['wall_seconds']:>12.4f} "
+              f"{result['wall_seconds']:>12.4f} {change:>+8.1%}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the importers and the heavy logbook queries')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run the benchmarks and write a JSON report')
+    run_parser.add_argument('--database-url', default=os.getenv('BENCHMARK_DATABASE_URL'),
+                            help='Throwaway database to benchmark against (default: $BENCHMARK_DATABASE_URL)')
+    run_parser.add_argument('--output', default='benchmark-results.json')
+    run_parser.add_argument('--groups', nargs='+', choices=['import', 'generate', 'query', 'geometry'],
+                            default=['import', 'generate', 'query', 'geometry'])
+    run_parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help='Total logbook rows to generate before each round of statistics queries')
+    run_parser.add_argument('--legs', type=int, default=1000000, help='Route legs for the geometry case')
+    run_parser.add_argument('--flights-per-user', type=int, default=2000)
+    run_parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    run_parser.add_argument('--repeat', type=int, default=20, help='Timed rounds per query case')
+
+    compare_parser = subparsers.add_parser('compare', help='Compare a run against a saved baseline')
+    compare_parser.add_argument('baseline')
+    compare_parser.add_argument('current')
+    compare_parser.add_argument('--threshold', type=float, default=0.10,
+                                help='Slowdown that counts as a regression (default: 0.10 = 10%%)')
+
+    args = parser.parse_args()
+
+    if args.command == 'compare':
+        with open(args.baseline) as file:
+            baseline = json.load(file)
+        with open(args.current) as file:
+            current = json.load(file)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    # The import cases truncate tables, so never fall back to the app's DATABASE_URL
+    if not args.database_url:
+        parser.error('run needs --database-url or BENCHMARK_DATABASE_URL pointing at a throwaway database')
+
+    try:
+        results = run(args)
+    except BenchmarkError as e:
+        sys.exit(f"Error: {e}; no report written")
+    report = {
+        'created_at': datetime.now().isoformat(timespec='seconds'),
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'cpu_count': os.cpu_count(),
+        'results': results,
+    }
+    with open(args.output, 'w') as file:
+        json.dump(report, file, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
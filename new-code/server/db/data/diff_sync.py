@@ -0,0 +1,100 @@
+import hashlib
+import json
+from typing import Callable, Dict, Iterable, List, Tuple
+
+from psycopg2.extras import execute_values
+
+import schema
+
+# Rows per INSERT/UPDATE/DELETE statement
+BATCH_SIZE = 500
+
+
+def row_hash(row: Dict, columns: List[str]) -> str:
+    """Stable hash of a row's column values, stored in source_hash to detect changes."""
+    values = [row[column] for column in columns]
+    return hashlib.md5(json.dumps(values, ensure_ascii=False).encode('utf-8')).hexdigest()
+
+
+def _batches(items: List, size: int) -> Iterable[List]:
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+def sync_table(conn, table: str, columns: Dict[str, str], key_of: Callable[[Dict], Tuple],
+               rows: Iterable[Dict], batch_size: int = BATCH_SIZE) -> Dict[str, int]:
+    """
+    Bring `table` in line with `rows` by writing only what changed.
+
+    columns maps each synced column to its SQL type, key_of returns a row's natural key.
+    Rows are matched on that key, so existing ids are kept; rows whose hash differs are
+    updated, new keys are inserted and keys missing from the source are deleted. When the
+    source repeats a key the last row wins. Only commits if it has to add source_hash.
+    """
+    names = list(columns)
+
+    # Desired state, in source order. Read before touching the table, since rows may be a
+    # parser still working through its file
+    source = {}
+    for row in rows:
+        source[key_of(row)] = row
+
+    schema.ensure_column(conn, table, 'source_hash', 'TEXT')
+
+    # Current state
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT id, source_hash, {', '.join(names)} FROM {table} ORDER BY id;")
+        existing = {}
+        duplicate_ids = []
+        for record in cur.fetchall():
+            row = dict(zip(['id', 'source_hash'] + names, record))
+            key = key_of(row)
+            if key in existing:
+                # Left over from a reload that allowed duplicates; keep the lowest id
+                duplicate_ids.append(row['id'])
+            else:
+                existing[key] = row
+
+    inserts = []
+    updates = []
+    for key, row in source.items():
+        digest = row_hash(row, names)
+        current = existing.get(key)
+        if current is None:
+            inserts.append([row[name] for name in names] + [digest])
+        elif current['source_hash'] != digest:
+            updates.append([current['id']] + [row[name] for name in names] + [digest])
+    deletes = [row['id'] for key, row in existing.items() if key not in source] + duplicate_ids
+
+    # Casts keep NULLs in the first VALUES row from being typed as text
+    typed = ', '.join(f"%s::{columns[name]}" for name in names)
+    with conn.cursor() as cur:
+        for batch in _batches(inserts, batch_size):
+            execute_values(cur, f"""
+                INSERT INTO {table} ({', '.join(names)}, source_hash)
+                VALUES %s
+            """, batch, template=f"({typed}, %s)", page_size=batch_size)
+
+        for batch in _batches(updates, batch_size):
+            execute_values(cur, f"""
+                UPDATE {table} AS t SET
+                    {', '.join(f'{name} = v.{name}' for name in names)},
+                    source_hash = v.source_hash,
+                    updated_at = CURRENT_TIMESTAMP
+                FROM (VALUES %s) AS v (id, {', '.join(names)}, source_hash)
+                WHERE t.id = v.id
+            """, batch, template=f"(%s::integer, {typed}, %s)", page_size=batch_size)
+
+        for batch in _batches(deletes, batch_size):
+            cur.execute(f"DELETE FROM {table} WHERE id = ANY(%s);", (batch,))
+
+    return {
+        'unchanged': len(source) - len(inserts) - len(updates),
+        'inserted': len(inserts),
+        'updated': len(updates),
+        'deleted': len(deletes),
+    }
+
+
+def format_counts(counts: Dict[str, int]) -> str:
+    return ', '.join(f"{count} {name}" for name, count in counts.items())
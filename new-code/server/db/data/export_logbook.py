@@ -0,0 +1,308 @@
+#!/usr/bin/env python3
+"""
+Streams logbook entries to CSV or NDJSON, for one user or for every user as a backup.
+
+Entries are read through a named server-side cursor in (user_id, flight_date) order, the
+order of idx_logbook_user_date, and written as they arrive, so memory stays flat however
+long the logbook is. Route airport ids are resolved through an airport map loaded once.
+Like a paper logbook, every --page-size entries are followed by a "carried_forward" row
+with the running hour totals, and each user's entries end with a "total" row.
+
+    python export_logbook.py --username pilot1 -o pilot1.csv
+    python export_logbook.py --user-id 3 --format ndjson --page-size 20
+    python export_logbook.py --all --output-dir backup/ --workers 4
+
+--all splits users into contiguous id ranges holding roughly equal numbers of entries and
+exports each range to its own file in a worker process. Every worker reads the same
+exported snapshot, so the files together are a consistent copy of the table.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from decimal import Decimal
+from multiprocessing import Pool
+from typing import Dict, Iterator, List, Optional, TextIO, Tuple
+
+import psycopg2
+from psycopg2.extensions import ISOLATION_LEVEL_REPEATABLE_READ
+from dotenv import load_dotenv
+
+import logbook
+from logbook import HOUR_COLUMNS
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+TEXT_COLUMNS = ['pilot_in_command', 'other_crew', 'route_data', 'details']
+TYPE_COLUMNS = ['flight_type', 'flight_rule']
+
+SELECT_COLUMNS = ['id', 'user_id', 'flight_date', 'aircraft_reg', *TEXT_COLUMNS, *HOUR_COLUMNS, *TYPE_COLUMNS]
+
+# route_data becomes a printable route; total_hours is the sum of the ten hour columns
+CSV_HEADER = [
+    'row_type', 'user_id', 'entry_id', 'flight_date', 'aircraft_reg', 'pilot_in_command', 'other_crew',
+    'route', 'details', *HOUR_COLUMNS, 'total_hours', *TYPE_COLUMNS,
+]
+
+FORMATS = ['csv', 'ndjson']
+
+# Rows fetched per round trip from the server-side cursor
+FETCH_SIZE = 2000
+
+# Set in each worker by _init_worker
+_worker = {}
+
+
+def load_airport_codes(conn) -> Dict[int, str]:
+    """Airport id -> the code a pilot would write: ICAO, else IATA, else the name."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, COALESCE(NULLIF(icao, ''), NULLIF(iata, ''), airport_name) FROM airports;")
+        return dict(cur.fetchall())
+
+
+def route_codes(route_data, airport_codes: Dict[int, str]) -> List[str]:
+    codes = []
+    for stop in route_data or []:
+        if not isinstance(stop, dict):
+            continue
+        try:
+            code = airport_codes.get(int(stop.get('airport_id')))
+        except (TypeError, ValueError):
+            code = None
+        codes.append(code or stop.get('custom_name') or '?')
+    return codes
+
+
+def iter_entries(conn, first_user: int, last_user: int) -> Iterator[Tuple]:
+    """Entries of users first_user..last_user, streamed FETCH_SIZE rows at a time."""
+    with conn.cursor(name='logbook_export') as cur:
+        cur.itersize = FETCH_SIZE
+        # (user_id, flight_date) can come straight off idx_logbook_user_date, with id only
+        # breaking ties within a day (an incremental sort). Either way the sorting happens
+        # on the server; this process only ever holds FETCH_SIZE rows
+        cur.execute(f"""
+            SELECT {', '.join(SELECT_COLUMNS)} FROM logbook_entries
+            WHERE user_id BETWEEN %s AND %s
+            ORDER BY user_id, flight_date, id;
+        """, (first_user, last_user))
+        yield from cur
+
+
+class CsvWriter:
+    def __init__(self, file: TextIO):
+        self.writer = csv.writer(file)
+        self.writer.writerow(CSV_HEADER)
+
+    def entry(self, row: Tuple, route: List[str], total: Decimal):
+        (entry_id, user_id, flight_date, aircraft_reg, pic, other_crew, _, details, *rest) = row
+        hours, types = rest[:len(HOUR_COLUMNS)], rest[len(HOUR_COLUMNS):]
+        self.writer.writerow(['entry', user_id, entry_id, flight_date.isoformat(), aircraft_reg, pic, other_crew,
+                              '-'.join(route), details, *hours, total, *types])
+
+    def totals(self, row_type: str, user_id: int, totals: List[Decimal], entries: int):
+        self.writer.writerow([row_type, user_id, None, None, None, None, None, None, f"{entries} entries",
+                              *totals[:-1], totals[-1], None, None])
+
+
+class NdjsonWriter:
+    def __init__(self, file: TextIO):
+        self.file = file
+
+    def write(self, record: Dict):
+        self.file.write(json.dumps(record, separators=(',', ':')))
+        self.file.write('\n')
+
+    def entry(self, row: Tuple, route: List[str], total: Decimal):
+        record = dict(zip(SELECT_COLUMNS, row))
+        route_data = record.pop('route_data')
+        self.write({
+            'row_type': 'entry',
+            'entry_id': record.pop('id'),
+            **record,
+            'flight_date': record['flight_date'].isoformat(),
+            'route': route,
+            'route_data': route_data,
+            **{column: float(record[column]) for column in HOUR_COLUMNS},
+            'total_hours': float(total),
+        })
+
+    def totals(self, row_type: str, user_id: int, totals: List[Decimal], entries: int):
+        self.write({
+            'row_type': row_type,
+            'user_id': user_id,
+            'entries': entries,
+            **{column: float(value) for column, value in zip(HOUR_COLUMNS + ['total_hours'], totals)},
+        })
+
+
+WRITERS = {'csv': CsvWriter, 'ndjson': NdjsonWriter}
+
+
+def write_entries(entries: Iterator[Tuple], writer, airport_codes: Dict[int, str], page_size: int) -> Tuple[int, int]:
+    """Write entries with carried-forward and total rows; returns (users, entries) written."""
+    hours_start = SELECT_COLUMNS.index(HOUR_COLUMNS[0])
+    users = count = 0
+    user_id = None
+    totals = user_entries = None
+
+    for row in entries:
+        if row[1] != user_id:
+            if user_id is not None:
+                writer.totals('total', user_id, totals, user_entries)
+            user_id = row[1]
+            users += 1
+            # The last slot is the total of all ten columns
+            totals = [Decimal(0)] * (len(HOUR_COLUMNS) + 1)
+            user_entries = 0
+
+        hours = row[hours_start:hours_start + len(HOUR_COLUMNS)]
+        total = sum(hours, Decimal(0))
+        for index, value in enumerate(hours):
+            totals[index] += value
+        totals[-1] += total
+
+        writer.entry(row, route_codes(row[SELECT_COLUMNS.index('route_data')], airport_codes), total)
+        user_entries += 1
+        count += 1
+        if page_size and user_entries % page_size == 0:
+            writer.totals('carried_forward', user_id, totals, user_entries)
+
+    if user_id is not None:
+        writer.totals('total', user_id, totals, user_entries)
+    return users, count
+
+
+def export_users(conn, file: TextIO, first_user: int, last_user: int, options: Dict,
+                 airport_codes: Optional[Dict[int, str]] = None) -> Tuple[int, int]:
+    if airport_codes is None:
+        airport_codes = load_airport_codes(conn)
+    writer = WRITERS[options['format']](file)
+    return write_entries(iter_entries(conn, first_user, last_user), writer, airport_codes, options['page_size'])
+
+
+def plan_shards(conn, shards: int) -> List[Tuple[int, int, int]]:
+    """Split users into at most `shards` contiguous id ranges of about equal entry counts."""
+    with conn.cursor() as cur:
+        # An index-only scan of idx_logbook_user_date
+        cur.execute("SELECT user_id, COUNT(*) FROM logbook_entries GROUP BY user_id ORDER BY user_id;")
+        counts = cur.fetchall()
+
+    total = sum(count for _, count in counts)
+    ranges = []
+    first_user = None
+    entries = 0
+    for user_id, count in counts:
+        if first_user is None:
+            first_user = user_id
+        entries += count
+        # Close the range once it reaches its share of what the earlier ranges left over
+        if entries * (shards - len(ranges)) >= total - sum(r[2] for r in ranges):
+            ranges.append((first_user, user_id, entries))
+            first_user = None
+            entries = 0
+    if first_user is not None:
+        ranges.append((first_user, counts[-1][0], entries))
+    return ranges
+
+
+def _init_worker(worker_db_url, snapshot_id, airport_codes, options):
+    _worker['conn'] = psycopg2.connect(worker_db_url)
+    _worker['conn'].set_session(isolation_level=ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+    _worker['snapshot_id'] = snapshot_id
+    _worker['airport_codes'] = airport_codes
+    _worker['options'] = options
+
+
+def _export_shard(shard: Tuple[int, int, int, str]) -> Tuple[str, int, int, float]:
+    first_user, last_user, _, path = shard
+    conn = _worker['conn']
+    start = time.perf_counter()
+    try:
+        with conn.cursor() as cur:
+            # Must be the first statement of the transaction
+            cur.execute("SET TRANSACTION SNAPSHOT %s;", (_worker['snapshot_id'],))
+        with open(path, 'w', newline='', encoding='utf-8') as file:
+            users, entries = export_users(conn, file, first_user, last_user, _worker['options'],
+                                          _worker['airport_codes'])
+    finally:
+        conn.rollback()
+    return path, users, entries, time.perf_counter() - start
+
+
+def export_all(conn, output_dir: str, workers: int, options: Dict) -> Tuple[int, int]:
+    """Export every user into one file per shard, across worker processes."""
+    os.makedirs(output_dir, exist_ok=True)
+    # Holds the snapshot open for the workers until every shard is written
+    conn.set_session(isolation_level=ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+    with conn.cursor() as cur:
+        cur.execute("SELECT pg_export_snapshot();")
+        snapshot_id = cur.fetchone()[0]
+
+    airport_codes = load_airport_codes(conn)
+    ranges = plan_shards(conn, options['shards'] or workers)
+    shards = [(first_user, last_user, entries,
+               os.path.join(output_dir, f"logbook-{index + 1:03d}-of-{len(ranges):03d}.{options['format']}"))
+              for index, (first_user, last_user, entries) in enumerate(ranges)]
+    print(f"Exporting {sum(s[2] for s in shards)} entries in {len(shards)} shards with {workers} workers")
+
+    users = entries = 0
+    initargs = (db_url, snapshot_id, airport_codes, options)
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for path, shard_users, shard_entries, seconds in pool.imap_unordered(_export_shard, shards):
+            users += shard_users
+            entries += shard_entries
+            print(f"  {path}: {shard_users} users, {shard_entries} entries in {seconds:.2f}s")
+    conn.rollback()
+    return users, entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export logbook entries to CSV or NDJSON')
+    who = parser.add_mutually_exclusive_group(required=True)
+    who.add_argument('--user-id', type=int)
+    who.add_argument('--username')
+    who.add_argument('--all', action='store_true', help='Every user, one file per shard in --output-dir')
+    parser.add_argument('--format', choices=FORMATS, default='csv')
+    parser.add_argument('-o', '--output', default='-', help='Output file for one user (default: stdout)')
+    parser.add_argument('--output-dir', default='.', help='Directory for the --all shard files')
+    parser.add_argument('--page-size', type=int, default=0,
+                        help='Entries per logbook page; each page is followed by a carried_forward row (default: off)')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--shards', type=int, help='Shard files for --all (default: one per worker)')
+    args = parser.parse_args()
+
+    options = {'format': args.format, 'page_size': args.page_size, 'shards': args.shards}
+
+    conn = None
+    try:
+        # Connect to database
+        conn = psycopg2.connect(db_url)
+
+        start = time.perf_counter()
+        if args.all:
+            users, entries = export_all(conn, args.output_dir, args.workers, options)
+        else:
+            user_id = logbook.find_user(conn, args.user_id, args.username)
+            if args.output == '-':
+                users, entries = export_users(conn, sys.stdout, user_id, user_id, options)
+            else:
+                with open(args.output, 'w', newline='', encoding='utf-8') as file:
+                    users, entries = export_users(conn, file, user_id, user_id, options)
+        elapsed = time.perf_counter() - start
+        print(f"Exported {entries} entries for {users} users in {elapsed:.2f}s "
+              f"({entries / elapsed:.0f} entries/sec)", file=sys.stderr)
+
+    except Exception as e:
+        print(f"Error: {e}", file=sys.stderr)
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
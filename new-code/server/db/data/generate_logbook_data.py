@@ -0,0 +1,309 @@
+#!/usr/bin/env python3
+import argparse
+import json
+import os
+import random
+import time
+from collections import defaultdict
+from datetime import date, datetime, timedelta
+from multiprocessing import Pool
+from typing import Dict, List, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+
+import logbook
+from logbook import HOUR_COLUMNS
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+LOGBOOK_COLUMNS = [
+    'user_id', 'flight_date', 'aircraft_reg', 'pilot_in_command', 'other_crew', 'route_data', 'details',
+    *HOUR_COLUMNS,
+    'flight_type', 'flight_rule', 'created_at',
+]
+
+USER_AIRCRAFT_COLUMNS = [
+    'user_id', 'aircraft_reg', 'aircraft_designator', 'aircraft_manufacturer', 'aircraft_model',
+    'aircraft_wtc', 'aircraft_category', 'aircraft_class',
+]
+
+# Kinds of pilot; each user gets one for their whole history
+PROFILES = {
+    'student': {
+        'weight': 3,
+        'capacities': {'dual': 0.7, 'command': 0.3},
+        'hours': (0.8, 2.0),
+        'wtc': 'L',
+        'aircraft_class': 'S',
+        'flight_types': {'training': 0.85, 'checkride': 0.05, 'private': 0.10},
+        'ifr_share': 0.05,
+    },
+    'private': {
+        'weight': 4,
+        'capacities': {'command': 0.9, 'dual': 0.1},
+        'hours': (0.8, 4.5),
+        'wtc': 'L',
+        'aircraft_class': 'S',
+        'flight_types': {'private': 0.85, 'training': 0.15},
+        'ifr_share': 0.15,
+    },
+    'airline': {
+        'weight': 2,
+        'capacities': {'co_pilot': 0.55, 'command': 0.35, 'icus': 0.10},
+        'hours': (0.8, 15.5),
+        'wtc': 'M',
+        'aircraft_class': 'M',
+        'flight_types': {'commercial': 0.95, 'checkride': 0.05},
+        'ifr_share': 0.95,
+    },
+}
+
+CREW_NAMES = [
+    'E.TSIATSIKAS', 'E.LINCOLN-PRICE', 'J.NGUYEN', 'S.PATEL', 'M.OKAFOR',
+    'L.ROSSI', 'K.TANAKA', 'A.SCHMIDT', 'R.GARCIA', 'T.MURPHY',
+]
+
+DETAILS = [
+    'CIRCUITS', 'STALLS', 'FORCED LANDINGS', 'NAVIGATION', 'INSTRUMENT PRACTICE',
+    'STEEP TURNS', 'CROSS COUNTRY', 'NIGHT CIRCUITS', 'FLIGHT REVIEW', 'LINE FLYING',
+    'POSITIONING', 'SIM CHECK', None,
+]
+
+# Largest value a NUMERIC(3,1) column accepts
+MAX_HOURS = 99.9
+
+# Set in each worker by _init_worker
+_worker = {}
+
+
+def pick(rng: random.Random, weights: Dict[str, float]) -> str:
+    return rng.choices(list(weights), weights=list(weights.values()))[0]
+
+
+def load_reference_data(conn) -> Tuple[Dict[str, List[int]], Dict[str, List[Tuple]]]:
+    """Airports grouped by country and aircraft types grouped by leading WTC letter."""
+    airports_by_country = defaultdict(list)
+    types_by_wtc = defaultdict(list)
+    with conn.cursor() as cur:
+        cur.execute("SELECT id, COALESCE(country_code, '') FROM airports ORDER BY id;")
+        for airport_id, country_code in cur:
+            airports_by_country[country_code].append(airport_id)
+
+        # user_aircraft needs every one of these columns
+        cur.execute("""
+            SELECT designator, manufacturer, model, wtc
+            FROM aircraft_types
+            WHERE designator IS NOT NULL AND model IS NOT NULL AND wtc IS NOT NULL
+            ORDER BY id;
+        """)
+        for designator, manufacturer, model, wtc in cur:
+            types_by_wtc[wtc[0]].append((designator, manufacturer, model))
+
+    if not airports_by_country:
+        raise RuntimeError("airports is empty; run import_airports.py first")
+    if not types_by_wtc:
+        raise RuntimeError("aircraft_types is empty; run import_aircraft_data.py first")
+    return dict(airports_by_country), dict(types_by_wtc)
+
+
+def create_users(conn, prefix: str, count: int) -> List[int]:
+    """Replace any earlier synthetic users and return the new ids in index order."""
+    with conn.cursor() as cur:
+        # Cascades to their aircraft and logbook entries, so reruns start clean
+        cur.execute("DELETE FROM users WHERE starts_with(username, %s);", (prefix,))
+        rows = execute_values(cur, """
+            INSERT INTO users (username, password) VALUES %s
+            RETURNING id, username;
+        """, [(f"{prefix}{index:07d}", 'hashedpassword') for index in range(count)], fetch=True, page_size=1000)
+    conn.commit()
+    ids = dict((username, user_id) for user_id, username in rows)
+    return [ids[f"{prefix}{index:07d}"] for index in range(count)]
+
+
+def generate_user(rng: random.Random, user_id: int, options: Dict, airports_by_country, types_by_wtc):
+    """Return (user_aircraft rows, logbook rows) for one user."""
+    profile = PROFILES[pick(rng, {name: p['weight'] for name, p in PROFILES.items()})]
+
+    # Fly mostly around a home airport in one country
+    countries = list(airports_by_country)
+    country = rng.choices(countries, weights=[len(airports_by_country[c]) for c in countries])[0]
+    country_airports = airports_by_country[country]
+    home = rng.choice(country_airports)
+    destinations = rng.sample(country_airports, min(len(country_airports), 15))
+
+    types = types_by_wtc.get(profile['wtc']) or next(iter(types_by_wtc.values()))
+    aircraft = []
+    for _ in range(rng.randint(1, 4)):
+        designator, manufacturer, model = rng.choice(types)
+        registration = 'VH-' + ''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(3))
+        aircraft.append((user_id, registration, designator, manufacturer, model,
+                         profile['wtc'], 'A', profile['aircraft_class']))
+    # Registrations are the user_aircraft key, so drop any repeats
+    aircraft = list({row[1]: row for row in aircraft}.values())
+
+    start, end = options['start_date'], options['end_date']
+    span = (end - start).days
+    dates = sorted(start + timedelta(days=rng.randint(0, span)) for _ in range(options['flights_per_user']))
+
+    low, high = profile['hours']
+    entries = []
+    for flight_date in dates:
+        hours = {column: 0.0 for column in HOUR_COLUMNS}
+        total = min(round(rng.uniform(low, high), 1), MAX_HOURS)
+        night = round(total * rng.uniform(0.2, 1.0), 1) if rng.random() < 0.15 else 0.0
+        capacity = pick(rng, profile['capacities'])
+        hours[f"{capacity}_day"] = round(total - night, 1)
+        hours[f"{capacity}_night"] = night
+
+        flight_rule = 'IFR' if rng.random() < profile['ifr_share'] else 'VFR'
+        if flight_rule == 'IFR':
+            hours['instrument_flight'] = round(rng.uniform(0.1, total * 0.6), 1)
+        if rng.random() < 0.03:
+            hours['instrument_sim'] = round(rng.uniform(0.5, 2.0), 1)
+
+        # Circuits, point-to-point, or a trip with stops
+        roll = rng.random()
+        if roll < 0.3:
+            stops = [home, home]
+        elif roll < 0.85:
+            stops = [home, rng.choice(destinations)]
+        else:
+            stops = [home] + rng.sample(destinations, min(len(destinations), rng.randint(1, 2))) + [rng.choice(destinations)]
+        route = [
+            {
+                'type': 'departure' if i == 0 else 'arrival' if i == len(stops) - 1 else 'stop',
+                'airport_id': airport_id,
+                'is_custom': False,
+                'custom_name': None,
+            }
+            for i, airport_id in enumerate(stops)
+        ]
+
+        in_command = capacity == 'command'
+        entries.append([
+            user_id,
+            flight_date.isoformat(),
+            rng.choice(aircraft)[1],
+            'SELF' if in_command else rng.choice(CREW_NAMES),
+            rng.choice(CREW_NAMES) if not in_command or rng.random() < 0.3 else None,
+            json.dumps(route),
+            rng.choice(DETAILS),
+            *hours.values(),
+            pick(rng, profile['flight_types']),
+            flight_rule,
+            datetime.combine(flight_date, datetime.min.time()) + timedelta(hours=rng.randint(8, 30)),
+        ])
+    return aircraft, entries
+
+
+def _init_worker(worker_db_url, airports_by_country, types_by_wtc, options):
+    _worker['conn'] = psycopg2.connect(worker_db_url)
+    _worker['airports_by_country'] = airports_by_country
+    _worker['types_by_wtc'] = types_by_wtc
+    _worker['options'] = options
+
+
+def _generate_users(users: List[Tuple[int, int]]) -> int:
+    """Worker: generate and COPY the rows for a slice of (user_index, user_id) pairs."""
+    conn = _worker['conn']
+    options = _worker['options']
+    aircraft_rows, logbook_rows = [], []
+    count = 0
+    with conn.cursor() as cur:
+        for user_index, user_id in users:
+            # Seeded per user, so output doesn't depend on how users are spread over workers
+            rng = random.Random(f"{options['seed']}:{user_index}")
+            aircraft, entries = generate_user(rng, user_id, options,
+                                              _worker['airports_by_country'], _worker['types_by_wtc'])
+            aircraft_rows.extend(aircraft)
+            logbook_rows.extend(entries)
+
+            if len(logbook_rows) >= options['batch_size']:
+                logbook.copy_rows(cur, 'user_aircraft', USER_AIRCRAFT_COLUMNS, aircraft_rows)
+                logbook.copy_rows(cur, 'logbook_entries', LOGBOOK_COLUMNS, logbook_rows)
+                count += len(logbook_rows)
+                aircraft_rows, logbook_rows = [], []
+
+        if logbook_rows or aircraft_rows:
+            logbook.copy_rows(cur, 'user_aircraft', USER_AIRCRAFT_COLUMNS, aircraft_rows)
+            logbook.copy_rows(cur, 'logbook_entries', LOGBOOK_COLUMNS, logbook_rows)
+            count += len(logbook_rows)
+    conn.commit()
+    return count
+
+
+def build_options(users: int, flights_per_user: int, start_date: date, end_date: date,
+                  seed: int = 42, batch_size: int = 50000, prefix: str = 'synthetic_') -> Dict:
+    return {
+        'users': users,
+        'flights_per_user': flights_per_user,
+        'start_date': start_date,
+        'end_date': end_date,
+        'seed': seed,
+        'batch_size': batch_size,
+        'prefix': prefix,
+        # Small slices keep the workers evenly loaded
+        'users_per_task': max(1, min(100, batch_size // max(1, flights_per_user))),
+    }
+
+
+def generate(conn, options: Dict, workers: int, database_url: str = None) -> int:
+    """Load synthetic data; workers connect to database_url (default DATABASE_URL)."""
+    airports_by_country, types_by_wtc = load_reference_data(conn)
+    user_ids = create_users(conn, options['prefix'], options['users'])
+    print(f"Created {len(user_ids)} users, generating {options['flights_per_user']} flights each")
+
+    users = list(enumerate(user_ids))
+    slices = [users[start:start + options['users_per_task']]
+              for start in range(0, len(users), options['users_per_task'])]
+
+    total = 0
+    initargs = (database_url or db_url, airports_by_country, types_by_wtc, options)
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for count in pool.imap_unordered(_generate_users, slices):
+            total += count
+            print(f"  {total} logbook entries loaded")
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate synthetic users, aircraft and logbook entries')
+    parser.add_argument('--users', type=int, default=10)
+    parser.add_argument('--flights-per-user', type=int, default=500)
+    parser.add_argument('--start-date', type=date.fromisoformat, default=date(2005, 1, 1))
+    parser.add_argument('--end-date', type=date.fromisoformat, default=date.today())
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1)
+    parser.add_argument('--batch-size', type=int, default=50000, help='Logbook rows per COPY')
+    parser.add_argument('--prefix', default='synthetic_',
+                        help='Username prefix; existing users with this prefix are deleted first')
+    args = parser.parse_args()
+
+    options = build_options(args.users, args.flights_per_user, args.start_date, args.end_date,
+                            args.seed, args.batch_size, args.prefix)
+
+    conn = None
+    try:
+        # Connect to database
+        conn = psycopg2.connect(db_url)
+
+        start = time.perf_counter()
+        total = generate(conn, options, args.workers)
+        elapsed = time.perf_counter() - start
+
+        print(f"Generated {total} logbook entries in {elapsed:.2f}s ({total / elapsed:.0f} rows/sec)")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
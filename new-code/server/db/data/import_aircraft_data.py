@@ -1,11 +1,22 @@
 #!/usr/bin/env python3
+import argparse
+import hashlib
+import time
 import pdfplumber
 import pandas as pd
 import re
 import psycopg2
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
 from dotenv import load_dotenv
+from pdfminer.pdftypes import resolve1
 import os
-from typing import List, Dict
+from typing import Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple
+
+import aircraft_search_index
+import diff_sync
+import import_profile
+import parse_cache
 
 # Load environment variables
 load_dotenv()
@@ -15,199 +26,404 @@ db_url = os.getenv('DATABASE_URL')
 
 # Get the directory where this script is located
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+PDF_FILE = os.path.join(SCRIPT_DIR, 'DOC8643 ICAO Aircraft Type.pdf')
+
+# Wake turbulence categories that end an entry in the PDF
+WTC_VALUES = ['L', 'M', 'J', 'H', 'L/M', 'L/J', 'L/H', 'M/J', 'M/H', 'J/H', 'L/M/J', 'L/M/H', 'L/J/H', 'M/J/H', 'L/M/J/H']
+
+# Pages handed to a worker at a time in parallel mode
+PAGES_PER_CHUNK = 8
+
+# Bump whenever parsing changes so cached results from the old parser are ignored
+PARSER_VERSION = 2
+CACHE_NAME = 'doc8643'
+
+# Columns written by the importers, with the types used when syncing
+AIRCRAFT_COLUMNS = {
+    'designator': 'varchar',
+    'model': 'varchar',
+    'manufacturer': 'varchar',
+    'wtc': 'varchar',
+}
+
+
+def ensure_utf8(text: str) -> str:
+    """Ensure text is properly UTF-8 encoded."""
+    if isinstance(text, bytes):
+        return text.decode('utf-8', errors='ignore')
+    elif isinstance(text, str):
+        # Encode and decode to clean up any problematic characters
+        return text.encode('utf-8', errors='ignore').decode('utf-8')
+    return str(text)
+
+
+def split_columns(text: str) -> List[str]:
+    """Split the text into left and right columns."""
+    lines = text.split('\n')
+    aircraft_entries = []
+
+    for line in lines:
+        # Skip header lines
+        if ('MODEL, MANUFACTURER' in line or
+            'MODÈLE, CONSTRUCTEUR' in line or
+            'PART 3 — AIRCRAFT TYPES BY' in line or
+            not line.strip()):
+            import_profile.count_lines('skipped')
+            continue
+
+        # Split line by large gaps (3 or more spaces)
+        entries = re.split(r'\s{3,}', line.strip())
+
+        # Add each non-empty entry
+        for entry in entries:
+            if entry.strip():
+                aircraft_entries.append(entry.strip())
+
+    return aircraft_entries
+
+
+def split_model_manufacturer(segments: List[str]) -> Dict:
+    """Split the words before the designator into model (up to the comma) and manufacturer."""
+    # Find element in segments that contains a comma
+    comma_index = next((i for i, s in enumerate(segments) if ',' in s), None)
+    # Model is the elements before and including the comma
+    model = ' '.join(segments[:comma_index + 1])
+    # Remove trailing comma
+    model = model.rstrip(',')
+    # Manufacturer is the elements after the comma
+    manufacturer = ' '.join(segments[comma_index + 1:])
+    return {'model': model, 'manufacturer': manufacturer}
+
+
+def parse_line(line: str) -> List[Dict]:
+    """Parse one column entry into one or two aircraft dicts. Raises if the line is malformed."""
+    # split by ' '
+    segments = line.split(' ')
+
+    # Check if line contains multiple entries
+    if line.count(',') > 1:
+        # Handle multiple entries eg. "610 Evolution, BRUMBY BR61 L 728JET, FAIRCHILD DORNIER J728 M"
+        # Find index of first WTC
+        wtc_index = segments.index(next(filter(lambda x: x in WTC_VALUES, segments)))
+        parts = [segments[:wtc_index + 1], segments[wtc_index + 1:]]
+    else: # Single line entry
+        parts = [segments]
+
+    aircraft_data = []
+    for part in parts:
+        # Pop off WTC and designator from end of segments
+        wtc = part.pop()
+        designator = part.pop()
+        aircraft = split_model_manufacturer(part)
+        aircraft['designator'] = designator
+        aircraft['wtc'] = wtc
+        aircraft_data.append(aircraft)
+    return aircraft_data
+
+
+def parse_page(page) -> List[Dict]:
+    """Extract and parse the aircraft entries on a single pdfplumber page."""
+    aircraft_data = []
+    print(f"Processing page {page.page_number}")
+
+    with import_profile.page(page.page_number):
+        # Extract text from page and ensure UTF-8
+        with import_profile.span('extract_text'):
+            text = ensure_utf8(page.extract_text())
+        if not text:
+            return aircraft_data
+
+        # Split into columns and get individual lines
+        with import_profile.span('split_columns'):
+            lines = split_columns(text)
+
+        # Process each line
+        with import_profile.span('parse_lines'):
+            for line in lines:
+                try:
+                    # Clean and encode the line
+                    line = ensure_utf8(line.strip())
+                    aircraft_data.extend(parse_line(line))
+                    import_profile.count_lines('parsed')
+                except Exception as e:
+                    import_profile.count_lines('failed')
+                    print(f"Error processing line: {ensure_utf8(line)}")
+                    print(f"Error: {str(e)}")
+                    continue
+
+    return aircraft_data
+
+
+def page_content_hash(page) -> str:
+    """Hash a page's raw content streams, which is much cheaper than extracting its text."""
+    digest = hashlib.sha256()
+    for stream in page.page_obj.contents:
+        digest.update(resolve1(stream).get_data())
+    return digest.hexdigest()
+
+
+def _parse_pages(pdf, known_hashes: FrozenSet[str]) -> Iterator[Tuple[str, Optional[List[Dict]], float]]:
+    """Yield (page_hash, entries, seconds) per page; entries is None for pages in known_hashes."""
+    for page in pdf.pages:
+        with import_profile.span('page_hash'):
+            page_hash = page_content_hash(page)
+        if page_hash in known_hashes:
+            yield page_hash, None, 0.0
+        else:
+            start = time.perf_counter()
+            aircraft_data = parse_page(page)
+            yield page_hash, aircraft_data, time.perf_counter() - start
+        # Drop the page's cached layout objects once it has been parsed
+        page.flush_cache()
+
+
+def _parse_page_range(pdf_path: str, start: int, stop: int, known_hashes: FrozenSet[str]) -> Tuple[List[Tuple], Dict]:
+    """Worker: parse pages [start, stop) (0-based) in a separate process, with its timings."""
+    # Worker processes are reused, so drop anything left from their previous chunk
+    import_profile.snapshot(reset=True)
+    with import_profile.span('pdf_open'):
+        pdf = pdfplumber.open(pdf_path, pages=list(range(start + 1, stop + 1)))
+    with pdf:
+        pages = list(_parse_pages(pdf, known_hashes))
+    return pages, import_profile.snapshot(reset=True)
+
+
+def extract_pages(pdf_path: str, workers: int = 1,
+                  known_hashes: FrozenSet[str] = frozenset()) -> Iterator[Tuple[str, Optional[List[Dict]], float]]:
+    """Yield per-page parse results in page order, serially or across a process pool."""
+    if workers <= 1:
+        print(f"Reading PDF file from: {pdf_path}")
+        with import_profile.span('pdf_open'):
+            pdf = pdfplumber.open(pdf_path)
+        with pdf:
+            yield from _parse_pages(pdf, known_hashes)
+        return
+
+    print(f"Reading PDF file from: {pdf_path} ({workers} workers)")
+    with import_profile.span('pdf_open'):
+        with pdfplumber.open(pdf_path) as pdf:
+            page_count = len(pdf.pages)
+
+    chunks = iter([(start, min(start + PAGES_PER_CHUNK, page_count))
+                   for start in range(0, page_count, PAGES_PER_CHUNK)])
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Only keep a couple of chunks in flight per worker so finished results don't pile up
+        pending = deque()
+        for _ in range(workers * 2):
+            chunk = next(chunks, None)
+            if chunk is None:
+                break
+            pending.append(executor.submit(_parse_page_range, pdf_path, *chunk, known_hashes))
+
+        # Yield chunks in submission order so pages come out in order
+        while pending:
+            pages, timings = pending.popleft().result()
+            import_profile.merge(timings)
+            chunk = next(chunks, None)
+            if chunk is not None:
+                pending.append(executor.submit(_parse_page_range, pdf_path, *chunk, known_hashes))
+            yield from pages
+
+
+def extract_aircraft_from_pdf(pdf_path: str) -> Iterator[Dict]:
+    """Extract aircraft data from DOC8643 ICAO Aircraft Type PDF, one page at a time."""
+    for _, aircraft_data, _ in extract_pages(pdf_path):
+        yield from aircraft_data
+
+
+def extract_aircraft_parallel(pdf_path: str, workers: int) -> Iterator[Dict]:
+    """Same entries as extract_aircraft_from_pdf, with pages parsed across a process pool."""
+    for _, aircraft_data, _ in extract_pages(pdf_path, workers):
+        yield from aircraft_data
+
+
+def iter_aircraft(pdf_path: str, workers: int) -> Iterator[Dict]:
+    """Pick the serial or parallel parser based on the worker count."""
+    if workers > 1:
+        return extract_aircraft_parallel(pdf_path, workers)
+    return extract_aircraft_from_pdf(pdf_path)
+
+
+def load_aircraft(pdf_path: str, workers: int) -> Iterator[Dict]:
+    """Yield aircraft entries from the parse cache, re-parsing only pages that aren't cached."""
+    start = time.perf_counter()
+    with import_profile.span('cache_load'):
+        pdf_hash = parse_cache.file_sha256(pdf_path)
+        cached = parse_cache.load_document(CACHE_NAME, pdf_hash, PARSER_VERSION)
+    if cached is not None:
+        import_profile.incr('document_cache_hits')
+        elapsed = time.perf_counter() - start
+        print(f"Parse cache hit for {pdf_hash[:12]}: {len(cached['records'])} entries loaded in "
+              f"{elapsed * 1000:.1f} ms (saved ~{cached['parse_seconds']:.1f}s of parsing)")
+        yield from cached['records']
+        return
+
+    print(f"Parse cache miss for {pdf_hash[:12]}, checking the page cache")
+    with import_profile.span('cache_load'):
+        page_cache = parse_cache.load_pages(CACHE_NAME, PARSER_VERSION)
+    pages = {}
+    aircraft_data = []
+    hits = misses = 0
+    saved_seconds = 0.0
+
+    for page_hash, page_data, seconds in extract_pages(pdf_path, workers, frozenset(page_cache)):
+        if page_data is None:
+            hits += 1
+            page_data = page_cache[page_hash]['records']
+            seconds = page_cache[page_hash]['seconds']
+            saved_seconds += seconds
+        else:
+            misses += 1
+        pages[page_hash] = {'records': page_data, 'seconds': seconds}
+        aircraft_data.extend(page_data)
+        yield from page_data
+
+    parse_seconds = sum(page['seconds'] for page in pages.values())
+    with import_profile.span('cache_save'):
+        parse_cache.save_pages(CACHE_NAME, PARSER_VERSION, pages)
+        parse_cache.save_document(CACHE_NAME, pdf_hash, PARSER_VERSION, aircraft_data, parse_seconds)
+    import_profile.incr('page_cache_hits', hits)
+    import_profile.incr('page_cache_misses', misses)
+    print(f"Page cache: {hits} hits, {misses} misses (saved ~{saved_seconds:.1f}s of parsing)")
+
+
+# Function to clean and format strings for SQL
+def clean_for_sql(s):
+    if pd.isna(s) or not s:
+        return 'NULL'
+    # Ensure string is UTF-8 encoded and properly escaped for SQL
+    s = ensure_utf8(str(s).strip())
+    return "'" + s.replace("'", "''") + "'"
+
+
+# Insert aircraft data into database
+def import_aircraft_types(conn, aircraft_data: Iterable[Dict]) -> int:
+    with conn.cursor() as cur:
+        # First, clear existing data with CASCADE
+        with import_profile.span('db_truncate'):
+            cur.execute("TRUNCATE TABLE aircraft_types CASCADE;")
+
+        count = 0
+        for aircraft in aircraft_data:
+            try:
+                if aircraft['manufacturer']:  # Only insert if manufacturer exists
+                    # Rendered separately so statement building and the round trip are timed apart
+                    with import_profile.span('sql_generation'):
+                        sql = cur.mogrify("""
+                            INSERT INTO aircraft_types
+                            (designator, model, manufacturer, wtc)
+                            VALUES (%s, %s, %s, %s)
+                        """, (
+                            aircraft['designator'] if aircraft['designator'] else None,
+                            aircraft['model'] if aircraft['model'] else None,
+                            aircraft['manufacturer'],
+                            aircraft['wtc'] if aircraft['wtc'] else None
+                        ))
+                    with import_profile.span('db_insert'):
+                        cur.execute(sql)
+                    count += 1
+                else:
+                    import_profile.incr('rows_without_manufacturer')
+            except KeyError as e:
+                import_profile.incr('rows_rejected')
+                print(f"Warning: Missing field {e}")
+                print("Aircraft data:", aircraft)
+                continue
+
+        with import_profile.span('db_commit'):
+            conn.commit()
+        print(f"\nSuccessfully imported {count} aircraft types into database.")
+    return count
+
+
+def aircraft_rows(aircraft_data: Iterable[Dict]) -> Iterator[Dict]:
+    """Rows as import_aircraft_types would insert them: manufacturer required, blanks as NULL."""
+    for aircraft in aircraft_data:
+        if aircraft['manufacturer']:
+            yield {
+                'designator': aircraft['designator'] if aircraft['designator'] else None,
+                'model': aircraft['model'] if aircraft['model'] else None,
+                'manufacturer': aircraft['manufacturer'],
+                'wtc': aircraft['wtc'] if aircraft['wtc'] else None,
+            }
+
+
+def aircraft_key(row: Dict):
+    return (row['designator'], row['manufacturer'], row['model'])
+
+
+def sync_aircraft_types(conn, aircraft_data: Iterable[Dict]):
+    """Apply only the inserts, updates and deletes needed to match the PDF, keeping ids stable."""
+    # Parsing happens lazily inside sync_table, so this span includes it; the parse spans
+    # show how much of it that was
+    with import_profile.span('db_sync'):
+        counts = diff_sync.sync_table(conn, 'aircraft_types', AIRCRAFT_COLUMNS, aircraft_key,
+                                      aircraft_rows(aircraft_data))
+    with import_profile.span('db_commit'):
+        conn.commit()
+    print(f"\nAircraft type sync: {diff_sync.format_counts(counts)}")
+    return counts['unchanged'] + counts['inserted'] + counts['updated']
+
+
+def check_parsers(pdf_path: str, workers: int) -> bool:
+    """Parse the PDF serially and in parallel and report whether the entries match."""
+    serial = list(extract_aircraft_from_pdf(pdf_path))
+    parallel = list(extract_aircraft_parallel(pdf_path, max(workers, 2)))
+
+    if serial == parallel:
+        print(f"\nSerial and parallel parsers agree on {len(serial)} entries.")
+        return True
+
+    print(f"\nParsers disagree: {len(serial)} serial entries, {len(parallel)} parallel entries.")
+    for index, (a, b) in enumerate(zip(serial, parallel)):
+        if a != b:
+            print(f"First difference at entry {index}: {a} != {b}")
+            break
+    return False
+
 
 def main():
+    parser = argparse.ArgumentParser(description='Import aircraft types from the DOC8643 PDF')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                        help='Processes used to parse the PDF; 1 parses serially (default: CPU count)')
+    parser.add_argument('--mode', choices=['reload', 'sync'], default='reload',
+                        help='reload: truncate and insert every entry (default); '
+                             'sync: write only changed rows and keep existing ids')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always parse the PDF, ignoring and not updating the parse cache')
+    parser.add_argument('--check', action='store_true',
+                        help='Compare the serial and parallel parsers and exit without touching the database')
+    import_profile.add_arguments(parser)
+    args = parser.parse_args()
+
+    if args.check:
+        check_parsers(PDF_FILE, args.workers)
+        return
+
     conn = None
     try:
-        # Connect to database
-        conn = psycopg2.connect(db_url)
-
-        # Get the current directory (where the script is located)
-        current_dir = SCRIPT_DIR
-        pdf_file = os.path.join(current_dir, 'DOC8643 ICAO Aircraft Type.pdf')
-        output_file = os.path.join(current_dir, '..', 'insert_aircraft_types.sql')
-
-        aircraft_entries = []
-
-        def ensure_utf8(text: str) -> str:
-            """Ensure text is properly UTF-8 encoded."""
-            if isinstance(text, bytes):
-                return text.decode('utf-8', errors='ignore')
-            elif isinstance(text, str):
-                # Encode and decode to clean up any problematic characters
-                return text.encode('utf-8', errors='ignore').decode('utf-8')
-            return str(text)
-
-        def split_columns(text: str) -> List[str]:
-            """Split the text into left and right columns."""
-            lines = text.split('\n')
-            aircraft_entries = []
-            
-            for line in lines:
-                # Skip header lines
-                if ('MODEL, MANUFACTURER' in line or 
-                    'MODÈLE, CONSTRUCTEUR' in line or 
-                    'PART 3 — AIRCRAFT TYPES BY' in line or
-                    not line.strip()):
-                    continue
-                    
-                # Split line by large gaps (3 or more spaces)
-                entries = re.split(r'\s{3,}', line.strip())
-                
-                # Add each non-empty entry
-                for entry in entries:
-                    if entry.strip():
-                        aircraft_entries.append(entry.strip())
-            
-            return aircraft_entries
-
-        def extract_aircraft_from_pdf(pdf_path: str) -> List[Dict]:
-            """Extract aircraft data from DOC8643 ICAO Aircraft Type PDF."""
-            aircraft_data = []
-            
-            print(f"Reading PDF file from: {pdf_file}")
-            with pdfplumber.open(pdf_file) as pdf:
-                for page in pdf.pages:
-                    print(f"Processing page {page.page_number}")
-                    
-                    # Extract text from page and ensure UTF-8
-                    text = ensure_utf8(page.extract_text())
-                    if not text:
-                        continue
-                    
-                    # Split into columns and get individual lines
-                    lines = split_columns(text)
-                    
-                    # Process each line
-                    for line in lines:
-                        
-                        try:
-                            # Clean and encode the line
-                            line = ensure_utf8(line.strip())
-
-                            # Check if line contains multiple entries
-                            if line.count(',') > 1:
-                                # Handle multiple entries eg. "610 Evolution, BRUMBY BR61 L 728JET, FAIRCHILD DORNIER J728 M"
-                                # split by ' '
-                                segments = line.split(' ')
-                                # Find index of first WTC, 'L', 'M', 'J', 'H', 'L/M', 'L/J', 'L/H', 'M/J', 'M/H', 'J/H', 'L/M/J', 'L/M/H', 'L/J/H', 'M/J/H', 'L/M/J/H'
-                                wtc_index = segments.index(next(filter(lambda x: x in ['L', 'M', 'J', 'H', 'L/M', 'L/J', 'L/H', 'M/J', 'M/H', 'J/H', 'L/M/J', 'L/M/H', 'L/J/H', 'M/J/H', 'L/M/J/H'], segments)))
-
-                                aircraft1_segments = segments[:wtc_index + 1]
-                                aircraft2_segments = segments[wtc_index + 1:]
-
-                                # Pop off WTC from end of segments
-                                aircraft1_wtc = aircraft1_segments.pop()
-                                aircraft2_wtc = aircraft2_segments.pop()
-
-                                # Pop off designator from end of segments
-                                aircraft1_designator = aircraft1_segments.pop()
-                                aircraft2_designator = aircraft2_segments.pop()
-
-                                # Find element in aircraft1_segments that contains a comma
-                                comma_index1 = next((i for i, s in enumerate(aircraft1_segments) if ',' in s), None)
-                                # Aircraft 1 model is the elements before and including the comma
-                                aircraft1_model = ' '.join(aircraft1_segments[:comma_index1 + 1])
-                                # Remove trailing comma
-                                aircraft1_model = aircraft1_model.rstrip(',')
-                                # Aircraft 1 manufacturer is the elements after the comma
-                                aircraft1_manufacturer = ' '.join(aircraft1_segments[comma_index1 + 1:])
-
-                                comma_index2 = next((i for i, s in enumerate(aircraft2_segments) if ',' in s), None)
-                                aircraft2_model = ' '.join(aircraft2_segments[:comma_index2 + 1])
-                                aircraft2_model = aircraft2_model.rstrip(',')
-                                aircraft2_manufacturer = ' '.join(aircraft2_segments[comma_index2 + 1:])
-
-                                # Append entries to aircraft_data
-                                aircraft_data.append({
-                                    'model': aircraft1_model,
-                                    'manufacturer': aircraft1_manufacturer,
-                                    'designator': aircraft1_designator,
-                                    'wtc': aircraft1_wtc
-                                })
-
-                                aircraft_data.append({
-                                    'model': aircraft2_model,
-                                    'manufacturer': aircraft2_manufacturer,
-                                    'designator': aircraft2_designator,
-                                    'wtc': aircraft2_wtc
-                                })
-
-                            else: # Single line entry
-                                # split by ' '
-                                segments = line.split(' ')
-
-                                aircraft1_wtc = segments.pop()
-                                aircraft1_designator = segments.pop()
-                                
-                                 # Find element in aircraft1_segments that contains a comma
-                                comma_index1 = next((i for i, s in enumerate(aircraft1_segments) if ',' in s), None)
-                                # Aircraft 1 model is the elements before and including the comma
-                                aircraft1_model = ' '.join(aircraft1_segments[:comma_index1 + 1])
-                                # Remove trailing comma
-                                aircraft1_model = aircraft1_model.rstrip(',')
-                                # Aircraft 1 manufacturer is the elements after the comma
-                                aircraft1_manufacturer = ' '.join(aircraft1_segments[comma_index1 + 1:])
-
-                                # Append entries to aircraft_data
-                                aircraft_data.append({
-                                    'model': aircraft1_model,
-                                    'manufacturer': aircraft1_manufacturer,
-                                    'designator': aircraft1_designator,
-                                    'wtc': aircraft1_wtc
-                                })
-
-                        except Exception as e:
-                            print(f"Error processing line: {ensure_utf8(line)}")
-                            print(f"Error: {str(e)}")
-                            continue
-            
-            return aircraft_data
+        with import_profile.profiled(f'import_aircraft_data_{args.mode}', args) as run:
+            # Connect to database
+            with import_profile.span('db_connect'):
+                conn = psycopg2.connect(db_url)
+
+            # Entries are inserted as soon as their page has been parsed
+            if args.no_cache:
+                aircraft_data = iter_aircraft(PDF_FILE, args.workers)
+            else:
+                aircraft_data = load_aircraft(PDF_FILE, args.workers)
+            if args.mode == 'sync':
+                run.rows = sync_aircraft_types(conn, aircraft_data)
+            else:
+                run.rows = import_aircraft_types(conn, aircraft_data)
+
+            print("Aircraft data imported successfully!")
+
+            # Built from the table so it carries the real aircraft_types ids
+            with import_profile.span('search_index'):
+                aircraft_search_index.build_from_table(conn)
 
-        # Function to clean and format strings for SQL
-        def clean_for_sql(s):
-            if pd.isna(s) or not s:
-                return 'NULL'
-            # Ensure string is UTF-8 encoded and properly escaped for SQL
-            s = ensure_utf8(str(s).strip())
-            return "'" + s.replace("'", "''") + "'"
-
-        # Extract data from PDF
-        aircraft_data = extract_aircraft_from_pdf(pdf_file)
-
-        # Insert aircraft data into database
-        def import_aircraft_types(conn, aircraft_data):
-            with conn.cursor() as cur:
-                # First, clear existing data with CASCADE
-                cur.execute("TRUNCATE TABLE aircraft_types CASCADE;")
-                
-                count = 0
-                for aircraft in aircraft_data:
-                    try:
-                        if aircraft['manufacturer']:  # Only insert if manufacturer exists
-                            cur.execute("""
-                                INSERT INTO aircraft_types 
-                                (designator, model, manufacturer, wtc)
-                                VALUES (%s, %s, %s, %s)
-                            """, (
-                                aircraft['designator'] if aircraft['designator'] else None,
-                                aircraft['model'] if aircraft['model'] else None,
-                                aircraft['manufacturer'],
-                                aircraft['wtc'] if aircraft['wtc'] else None
-                            ))
-                            count += 1
-                    except KeyError as e:
-                        print(f"Warning: Missing field {e}")
-                        print("Aircraft data:", aircraft)
-                        continue
-                
-                conn.commit()
-                print(f"\nSuccessfully imported {count} aircraft types into database.")
-
-        import_aircraft_types(conn, aircraft_data)
-        
-        print("Aircraft data imported successfully!")
-        
     except Exception as e:
         print(f"Error: {e}")
     finally:
@@ -1,8 +1,14 @@
+import argparse
 import csv
+import time
 import psycopg2
 from dotenv import load_dotenv
 import os
 
+import airport_search_index
+import diff_sync
+import import_profile
+
 # Load environment variables
 load_dotenv()
 
@@ -13,11 +19,51 @@ db_url = os.getenv('DATABASE_URL')
 SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
 CSV_FILE = os.path.join(SCRIPT_DIR, 'iata-icao.csv')
 
+# Columns written by the importers, with the types used when syncing
+AIRPORT_COLUMNS = {
+    'iata': 'varchar',
+    'icao': 'varchar',
+    'airport_name': 'varchar',
+    'country_code': 'varchar',
+    'region_name': 'varchar',
+    'latitude': 'numeric',
+    'longitude': 'numeric',
+}
+
+
+def read_airports():
+    """Yield CSV rows as airport dicts, skipping rows where both IATA and ICAO are empty."""
+    with open(CSV_FILE, 'r', encoding='utf-8') as file:
+        for row in csv.DictReader(file):
+            if not row['iata'] and not row['icao']:
+                import_profile.count_lines('skipped')
+                continue
+            import_profile.count_lines('parsed')
+            yield {
+                'iata': row['iata'] if row['iata'] else None,
+                'icao': row['icao'] if row['icao'] else None,
+                'airport_name': row['airport_name'],
+                'country_code': row['country_code'],
+                'region_name': row['region_name'],
+                'latitude': float(row['latitude']) if row['latitude'] else None,
+                'longitude': float(row['longitude']) if row['longitude'] else None,
+            }
+
+
+def airport_key(row):
+    """ICAO identifies an airport; the few without one fall back to IATA and name."""
+    if row['icao']:
+        return ('icao', row['icao'])
+    return ('iata', row['iata'], row['airport_name'])
+
 
 def import_airports(conn):
+    """Load the CSV one row at a time with an upsert per row."""
+    count = 0
     with conn.cursor() as cur:
         # First, clear existing data
-        cur.execute("TRUNCATE TABLE airports RESTART IDENTITY;")
+        with import_profile.span('db_truncate'):
+            cur.execute("TRUNCATE TABLE airports RESTART IDENTITY;")
         
         # Read and insert data from CSV
         with open(CSV_FILE, 'r', encoding='utf-8') as file:
@@ -25,42 +71,173 @@ def import_airports(conn):
             for row in csv_reader:
                 # Skip rows where both IATA and ICAO are empty
                 if not row['iata'] and not row['icao']:
+                    import_profile.count_lines('skipped')
                     continue
+                import_profile.count_lines('parsed')
                 
-                cur.execute("""
-                    INSERT INTO airports 
-                    (iata, icao, airport_name, country_code, region_name, latitude, longitude)
-                    VALUES (%s, %s, %s, %s, %s, %s, %s)
-                    ON CONFLICT (icao) 
-                    DO UPDATE SET
-                        iata = EXCLUDED.iata,
-                        airport_name = EXCLUDED.airport_name,
-                        country_code = EXCLUDED.country_code,
-                        region_name = EXCLUDED.region_name,
-                        latitude = EXCLUDED.latitude,
-                        longitude = EXCLUDED.longitude
-                    WHERE airports.icao IS NOT NULL;
-                """, (
-                    row['iata'] if row['iata'] else None,
-                    row['icao'] if row['icao'] else None,
-                    row['airport_name'],
-                    row['country_code'],
-                    row['region_name'],
-                    float(row['latitude']) if row['latitude'] else None,
-                    float(row['longitude']) if row['longitude'] else None
-                ))
+                # Rendered separately so statement building and the round trip are timed apart
+                with import_profile.span('sql_generation'):
+                    sql = cur.mogrify("""
+                        INSERT INTO airports 
+                        (iata, icao, airport_name, country_code, region_name, latitude, longitude)
+                        VALUES (%s, %s, %s, %s, %s, %s, %s)
+                        ON CONFLICT (icao) 
+                        DO UPDATE SET
+                            iata = EXCLUDED.iata,
+                            airport_name = EXCLUDED.airport_name,
+                            country_code = EXCLUDED.country_code,
+                            region_name = EXCLUDED.region_name,
+                            latitude = EXCLUDED.latitude,
+                            longitude = EXCLUDED.longitude
+                        WHERE airports.icao IS NOT NULL;
+                    """, (
+                        row['iata'] if row['iata'] else None,
+                        row['icao'] if row['icao'] else None,
+                        row['airport_name'],
+                        row['country_code'],
+                        row['region_name'],
+                        float(row['latitude']) if row['latitude'] else None,
+                        float(row['longitude']) if row['longitude'] else None
+                    ))
+                with import_profile.span('db_insert'):
+                    cur.execute(sql)
+                count += 1
         
+        with import_profile.span('db_commit'):
+            conn.commit()
+    return count
+
+
+def import_airports_bulk(conn):
+    """Stream the CSV into an unlogged staging table with COPY and merge it in one statement."""
+    with conn.cursor() as cur:
+        with import_profile.span('staging_setup'):
+            cur.execute("""
+                DROP TABLE IF EXISTS airports_staging;
+                CREATE UNLOGGED TABLE airports_staging (
+                    seq BIGSERIAL,
+                    iata TEXT,
+                    icao TEXT,
+                    airport_name TEXT,
+                    country_code TEXT,
+                    region_name TEXT,
+                    latitude NUMERIC,
+                    longitude NUMERIC
+                );
+            """)
+
+        with import_profile.span('copy'), open(CSV_FILE, 'r', encoding='utf-8') as file:
+            # COPY maps columns by position, so take the order from the CSV header. It goes into
+            # the statement as identifiers, so it has to be exactly the expected columns
+            header = next(csv.reader(file))
+            if sorted(header) != sorted(AIRPORT_COLUMNS):
+                raise ValueError(f"Unexpected {os.path.basename(CSV_FILE)} header {header}; "
+                                 f"expected the columns {', '.join(AIRPORT_COLUMNS)}")
+            columns = ', '.join(header)
+            # Every field in the CSV is quoted, so empty codes would otherwise load as ''
+            cur.copy_expert(f"""
+                COPY airports_staging ({columns})
+                FROM STDIN WITH (FORMAT csv, FORCE_NULL (iata, icao, latitude, longitude))
+            """, file)
+
+        cur.execute("""
+            SELECT COUNT(*) FILTER (WHERE iata IS NOT NULL OR icao IS NOT NULL),
+                   COUNT(*) FILTER (WHERE iata IS NULL AND icao IS NULL)
+            FROM airports_staging;
+        """)
+        parsed, skipped = cur.fetchone()
+        import_profile.count_lines('parsed', parsed)
+        import_profile.count_lines('skipped', skipped)
+
+        # Everything above only touches the staging table; airports is locked from here to commit
+        with import_profile.span('db_truncate'):
+            cur.execute("TRUNCATE TABLE airports RESTART IDENTITY;")
+
+        # Same result as the per-row upsert: rows without IATA and ICAO are skipped and the last
+        # row for a duplicated ICAO wins. Every upsert attempt there draws an id from the
+        # sequence, even when it ends up updating, so ids are the attempt number of each ICAO's
+        # first row; matching them keeps airport_id references in route_data valid
+        with import_profile.span('merge'):
+            cur.execute("""
+                WITH attempts AS (
+                    SELECT *, ROW_NUMBER() OVER (ORDER BY seq) AS attempt
+                    FROM airports_staging
+                    WHERE iata IS NOT NULL OR icao IS NOT NULL
+                ),
+                ranked AS (
+                    SELECT
+                        *,
+                        MIN(attempt) OVER (PARTITION BY icao) AS first_attempt,
+                        ROW_NUMBER() OVER (PARTITION BY icao ORDER BY seq DESC) AS rn
+                    FROM attempts
+                )
+                INSERT INTO airports
+                (id, iata, icao, airport_name, country_code, region_name, latitude, longitude)
+                SELECT
+                    CASE WHEN icao IS NULL THEN attempt ELSE first_attempt END,
+                    iata, icao, airport_name, country_code, region_name, latitude, longitude
+                FROM ranked
+                WHERE icao IS NULL OR rn = 1;
+            """)
+        count = cur.rowcount
+
+        # Leave the sequence where the per-row path would have left it
+        cur.execute("""
+            SELECT setval(pg_get_serial_sequence('airports', 'id'), GREATEST(COUNT(*), 1), COUNT(*) > 0)
+            FROM airports_staging
+            WHERE iata IS NOT NULL OR icao IS NOT NULL;
+        """)
+
+        cur.execute("DROP TABLE airports_staging;")
+        with import_profile.span('db_commit'):
+            conn.commit()
+    return count
+
+
+def sync_airports(conn):
+    """Apply only the inserts, updates and deletes needed to match the CSV, keeping ids stable."""
+    with import_profile.span('db_sync'):
+        counts = diff_sync.sync_table(conn, 'airports', AIRPORT_COLUMNS, airport_key, read_airports())
+    with import_profile.span('db_commit'):
         conn.commit()
+    print(f"Airport sync: {diff_sync.format_counts(counts)}")
+    # Every source row was compared, so report those as the rows processed
+    return counts['unchanged'] + counts['inserted'] + counts['updated']
 
 def main():
+    parser = argparse.ArgumentParser(description='Import airports from iata-icao.csv')
+    parser.add_argument('--mode', choices=['bulk', 'row', 'sync'], default='bulk',
+                        help='bulk: COPY into a staging table and merge (default); row: one upsert per row; '
+                             'sync: write only changed rows and keep existing ids')
+    parser.add_argument('--rebuild-index', action='store_true',
+                        help='Rebuild the airport search index even if the CSV has not changed')
+    import_profile.add_arguments(parser)
+    args = parser.parse_args()
+
+    conn = None
     try:
-        # Connect to database
-        conn = psycopg2.connect(db_url)
-        
-        # Import data
-        import_airports(conn)
-        
-        print("Airport data imported successfully!")
+        with import_profile.profiled(f'import_airports_{args.mode}', args) as run:
+            # Connect to database
+            with import_profile.span('db_connect'):
+                conn = psycopg2.connect(db_url)
+            
+            # Import data
+            start = time.perf_counter()
+            if args.mode == 'bulk':
+                count = import_airports_bulk(conn)
+            elif args.mode == 'sync':
+                count = sync_airports(conn)
+            else:
+                count = import_airports(conn)
+            elapsed = time.perf_counter() - start
+            run.rows = count
+            
+            print(f"Imported {count} airports in {elapsed:.2f}s ({count / elapsed:.0f} rows/sec, {args.mode} mode)")
+            print("Airport data imported successfully!")
+
+            # Built from the table rather than the CSV so it carries the real airport ids
+            with import_profile.span('search_index'):
+                airport_search_index.build_if_stale(conn, CSV_FILE, force=args.rebuild_index)
         
     except Exception as e:
         print(f"Error: {e}")
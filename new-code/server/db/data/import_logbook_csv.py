@@ -0,0 +1,428 @@
+#!/usr/bin/env python3
+"""
+Bulk import of an existing logbook from CSV into logbook_entries for one user.
+
+The file is streamed row by row and written in COPY batches, so memory stays flat however
+long the logbook is. Airport codes and registrations are resolved against lookup tables
+loaded once at the start. Rows that can't be stored are written, with the reason, to a
+rejects file, and the rest of the file still loads; the whole import commits at the end.
+
+    python import_logbook_csv.py logbook.csv --username pilot1
+    python import_logbook_csv.py logbook.csv --user-id 3 --map "Block time=command_day" --map "Reg=aircraft_reg"
+    python import_logbook_csv.py logbook.csv --user-id 3 --mapping columns.json --date-format %m/%d/%Y
+
+Recognised fields are the logbook_entries columns plus `departure`, `arrival`, `via` (stops
+between them) and `route` (every stop, separated by spaces, '-', ',' or '/'). Headers that
+aren't mapped explicitly are matched against common names such as Date, Reg, PIC, From, To
+and Remarks.
+
+The new entries have higher ids than anything monthly_hours_rollup.py and route_stops_etl.py
+have seen, so their next runs pick them up.
+"""
+import argparse
+import csv
+import json
+import os
+import re
+import time
+from datetime import date, datetime
+from decimal import Decimal, InvalidOperation, ROUND_HALF_UP
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+import import_profile
+import logbook
+from logbook import HOUR_COLUMNS
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+LOGBOOK_COLUMNS = [
+    'user_id', 'flight_date', 'aircraft_reg', 'pilot_in_command', 'other_crew', 'route_data', 'details',
+    *HOUR_COLUMNS,
+    'flight_type', 'flight_rule',
+]
+
+# Column widths from create.sql
+MAX_LENGTHS = {
+    'aircraft_reg': 10,
+    'pilot_in_command': 50,
+    'other_crew': 50,
+    'flight_type': 20,
+    'flight_rule': 20,
+}
+
+ROUTE_FIELDS = ['departure', 'arrival', 'via', 'route']
+FIELDS = set(LOGBOOK_COLUMNS + ROUTE_FIELDS) - {'user_id', 'route_data'}
+
+# Header names seen in spreadsheet and app exports, after normalize_header()
+HEADER_ALIASES = {
+    'date': 'flight_date',
+    'flight_date': 'flight_date',
+    'aircraft_reg': 'aircraft_reg',
+    'registration': 'aircraft_reg',
+    'aircraft_registration': 'aircraft_reg',
+    'reg': 'aircraft_reg',
+    'rego': 'aircraft_reg',
+    'tail_number': 'aircraft_reg',
+    'pilot_in_command': 'pilot_in_command',
+    'pic': 'pilot_in_command',
+    'pic_name': 'pilot_in_command',
+    'captain': 'pilot_in_command',
+    'other_crew': 'other_crew',
+    'crew': 'other_crew',
+    'from': 'departure',
+    'departure': 'departure',
+    'dep': 'departure',
+    'origin': 'departure',
+    'to': 'arrival',
+    'arrival': 'arrival',
+    'arr': 'arrival',
+    'destination': 'arrival',
+    'via': 'via',
+    'stops': 'via',
+    'route': 'route',
+    'details': 'details',
+    'remarks': 'details',
+    'notes': 'details',
+    'flight_type': 'flight_type',
+    'flight_rule': 'flight_rule',
+    'flight_rules': 'flight_rule',
+    'rules': 'flight_rule',
+    **{column: column for column in HOUR_COLUMNS},
+}
+
+DATE_FORMATS = ['%Y-%m-%d', '%d/%m/%Y', '%d.%m.%Y', '%d-%m-%Y', '%d/%m/%y']
+
+# NUMERIC(3,1): one decimal place, at most 99.9
+MAX_HOURS = Decimal('99.9')
+TENTH = Decimal('0.1')
+
+# Logbook rows per COPY
+BATCH_SIZE = 5000
+
+
+class RejectedRow(ValueError):
+    """A CSV row that can't be stored; the message goes to the rejects file."""
+
+
+def normalize_header(header: str) -> str:
+    return re.sub(r'[^a-z0-9]+', '_', header.strip().lower()).strip('_')
+
+
+def registration_key(registration: str) -> str:
+    """VH-TAE, vh-tae and VHTAE all name the same aircraft."""
+    return re.sub(r'[\s-]', '', registration).lower()
+
+
+def build_column_map(headers: List[str], explicit: Dict[str, str]) -> Dict[str, str]:
+    """Map CSV headers to fields: explicit mappings first, then the known aliases."""
+    for header, field in explicit.items():
+        if header not in headers:
+            raise ValueError(f"Mapped column {header!r} is not in the CSV header")
+        if field not in FIELDS:
+            raise ValueError(f"Unknown field {field!r} for column {header!r}")
+
+    column_map = dict(explicit)
+    taken = set(explicit.values())
+    for header in headers:
+        if header in column_map:
+            continue
+        field = HEADER_ALIASES.get(normalize_header(header))
+        if field and field not in taken:
+            column_map[header] = field
+            taken.add(field)
+
+    missing = {'flight_date', 'aircraft_reg', 'pilot_in_command'} - taken
+    if missing:
+        raise ValueError(f"No column mapped to {', '.join(sorted(missing))}; use --map HEADER=FIELD")
+    return column_map
+
+
+class Lookups:
+    """Airport codes and the user's registrations, loaded once for the whole file."""
+
+    def __init__(self, conn, user_id: int):
+        with conn.cursor() as cur:
+            cur.execute("SELECT id, icao, iata FROM airports ORDER BY id;")
+            self.icao = {}
+            self.iata = {}
+            for airport_id, icao, iata in cur.fetchall():
+                if icao:
+                    self.icao.setdefault(icao.upper(), airport_id)
+                if iata:
+                    # IATA codes aren't unique in the source data; the lowest id wins
+                    self.iata.setdefault(iata.upper(), airport_id)
+
+            cur.execute("SELECT aircraft_reg FROM user_aircraft WHERE user_id = %s;", (user_id,))
+            self.registrations = {registration_key(reg): reg for (reg,) in cur.fetchall()}
+
+    def airport(self, code: str) -> Optional[int]:
+        code = code.strip().upper()
+        return self.icao.get(code) or self.iata.get(code)
+
+
+def parse_date(value: str, formats: List[str]) -> date:
+    for date_format in formats:
+        try:
+            return datetime.strptime(value.strip(), date_format).date()
+        except ValueError:
+            continue
+    raise RejectedRow(f"unrecognised date {value!r}")
+
+
+def parse_hours(value: str, column: str) -> Decimal:
+    """Decimal hours or h:mm, rounded to the tenth NUMERIC(3,1) keeps."""
+    value = value.strip()
+    if not value:
+        return Decimal(0)
+    # Checked on the text, since int() reads '-0:30' as 0 hours and 30 minutes
+    if value.startswith('-'):
+        raise RejectedRow(f"{column}: negative hours {value!r}")
+    try:
+        if ':' in value:
+            hours, minutes = value.split(':')
+            if not (hours.isdigit() and minutes.isdigit() and int(minutes) < 60):
+                raise ValueError
+            hours = Decimal(int(hours)) + Decimal(int(minutes)) / 60
+        else:
+            hours = Decimal(value)
+    except (ValueError, InvalidOperation):
+        raise RejectedRow(f"{column}: not a number of hours: {value!r}")
+    # Decimal parses NaN and Infinity, which can't be compared or rounded
+    if not hours.is_finite():
+        raise RejectedRow(f"{column}: not a number of hours: {value!r}")
+    hours = hours.quantize(TENTH, rounding=ROUND_HALF_UP)
+    if hours > MAX_HOURS:
+        raise RejectedRow(f"{column}: {value!r} is more than {MAX_HOURS} hours")
+    return hours
+
+
+def text(value: Optional[str], column: str, required: bool = False) -> Optional[str]:
+    value = (value or '').strip()
+    if not value:
+        if required:
+            raise RejectedRow(f"{column} is required")
+        return None
+    if column in MAX_LENGTHS and len(value) > MAX_LENGTHS[column]:
+        raise RejectedRow(f"{column}: {value!r} is longer than {MAX_LENGTHS[column]} characters")
+    return value
+
+
+def route_codes(fields: Dict[str, str]) -> List[str]:
+    if fields.get('route', '').strip():
+        return [code for code in re.split(r'[\s,/-]+', fields['route'].strip()) if code]
+    codes = [fields.get('departure', '').strip()]
+    codes += [code for code in re.split(r'[\s,/-]+', fields.get('via', '').strip()) if code]
+    codes.append(fields.get('arrival', '').strip())
+    return [code for code in codes if code]
+
+
+def build_route(codes: List[str], lookups: Lookups, custom_airports: bool) -> List[Dict]:
+    route = []
+    for index, code in enumerate(codes):
+        airport_id = lookups.airport(code)
+        if airport_id is None and not custom_airports:
+            raise RejectedRow(f"unknown airport {code!r}")
+        route.append({
+            'type': 'departure' if index == 0 else 'arrival' if index == len(codes) - 1 else 'stop',
+            'airport_id': airport_id,
+            'is_custom': airport_id is None,
+            'custom_name': code if airport_id is None else None,
+        })
+    return route
+
+
+def convert_row(row: Dict[str, str], column_map: Dict[str, str], user_id: int, lookups: Lookups,
+                options: Dict) -> List:
+    """One CSV row as a logbook_entries row in LOGBOOK_COLUMNS order; raises RejectedRow."""
+    fields = {field: row.get(header) or '' for header, field in column_map.items()}
+
+    registration = text(fields.get('aircraft_reg'), 'aircraft_reg', required=True)
+    aircraft_reg = lookups.registrations.get(registration_key(registration))
+    if aircraft_reg is None:
+        # The logbook view joins user_aircraft, so an entry for an unknown aircraft would vanish
+        raise RejectedRow(f"aircraft {registration!r} is not in this user's aircraft")
+
+    flight_date = text(fields.get('flight_date'), 'flight_date', required=True)
+    return [
+        user_id,
+        parse_date(flight_date, options['date_formats']).isoformat(),
+        aircraft_reg,
+        text(fields.get('pilot_in_command'), 'pilot_in_command', required=True),
+        text(fields.get('other_crew'), 'other_crew'),
+        json.dumps(build_route(route_codes(fields), lookups, options['custom_airports'])),
+        text(fields.get('details'), 'details'),
+        *(parse_hours(fields.get(column, ''), column) for column in HOUR_COLUMNS),
+        text(fields.get('flight_type'), 'flight_type'),
+        text(fields.get('flight_rule'), 'flight_rule'),
+    ]
+
+
+def copy_batch(cur, rows: List[List]):
+    with import_profile.span('copy'):
+        logbook.copy_rows(cur, 'logbook_entries', LOGBOOK_COLUMNS, rows)
+
+
+class Rejects:
+    """
+    Rejected rows with their line number and reason, in a CSV created on first use. The file
+    of an earlier run is removed up front, so a clean run doesn't leave old failures behind.
+    """
+
+    def __init__(self, path: str, headers: List[str]):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
+        self.path = path
+        self.headers = headers
+        self.file = None
+        self.writer = None
+        self.count = 0
+
+    def add(self, line: int, reason: str, row: Dict[str, str]):
+        if self.writer is None:
+            self.file = open(self.path, 'w', newline='', encoding='utf-8')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(['line', 'error'] + self.headers)
+        self.writer.writerow([line, reason] + [row.get(header) for header in self.headers])
+        self.count += 1
+
+    def close(self):
+        if self.file:
+            self.file.close()
+
+
+def read_rows(file, delimiter: str) -> Tuple[List[str], Iterator[Tuple[int, Dict[str, str]]]]:
+    reader = csv.DictReader(file, delimiter=delimiter)
+    headers = reader.fieldnames or []
+
+    def rows():
+        for row in reader:
+            # Physical line of the row's last line, so it matches what an editor shows
+            yield reader.line_num, row
+    return headers, rows()
+
+
+def import_logbook(conn, path: str, user_id: int, explicit_map: Dict[str, str], options: Dict) -> Tuple[int, int]:
+    """Load the CSV for user_id and commit; returns (rows loaded, rows rejected)."""
+    with import_profile.span('lookups'):
+        lookups = Lookups(conn, user_id)
+    print(f"Loaded {len(lookups.icao)} ICAO codes, {len(lookups.iata)} IATA codes "
+          f"and {len(lookups.registrations)} registrations")
+
+    loaded = 0
+    with open(path, newline='', encoding='utf-8-sig') as file, conn.cursor() as cur:
+        headers, rows = read_rows(file, options['delimiter'])
+        column_map = build_column_map(headers, explicit_map)
+        print("Columns: " + ', '.join(f"{header} -> {field}" for header, field in column_map.items()))
+
+        rejects = Rejects(options['rejects_path'], headers)
+        try:
+            batch = []
+            for line, row in rows:
+                try:
+                    batch.append(convert_row(row, column_map, user_id, lookups, options))
+                    import_profile.count_lines('parsed')
+                except RejectedRow as e:
+                    rejects.add(line, str(e), row)
+                    import_profile.count_lines('failed')
+                    continue
+
+                if len(batch) >= options['batch_size']:
+                    copy_batch(cur, batch)
+                    loaded += len(batch)
+                    batch = []
+                    print(f"  {loaded} entries copied")
+
+            if batch:
+                copy_batch(cur, batch)
+                loaded += len(batch)
+        finally:
+            rejects.close()
+
+    if options['dry_run']:
+        conn.rollback()
+        print(f"Dry run: rolled back {loaded} entries")
+    else:
+        with import_profile.span('db_commit'):
+            conn.commit()
+    if rejects.count:
+        print(f"{rejects.count} rows rejected, see {rejects.path}")
+    return loaded, rejects.count
+
+
+def parse_mapping(values: List[str]) -> Dict[str, str]:
+    mapping = {}
+    for value in values:
+        header, sep, field = value.rpartition('=')
+        if not sep or not header:
+            raise ValueError(f"--map expects HEADER=FIELD, got {value!r}")
+        mapping[header] = field.strip()
+    return mapping
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Bulk import a logbook CSV for one user')
+    parser.add_argument('csv_file')
+    user = parser.add_mutually_exclusive_group(required=True)
+    user.add_argument('--user-id', type=int)
+    user.add_argument('--username')
+    parser.add_argument('--mapping', help='JSON file mapping CSV headers to fields')
+    parser.add_argument('--map', action='append', default=[], metavar='HEADER=FIELD',
+                        help='Map one CSV header to a field; overrides --mapping (repeatable)')
+    parser.add_argument('--date-format', action='append', dest='date_formats', metavar='FORMAT',
+                        help=f"strptime format for dates, tried in order (default: {', '.join(DATE_FORMATS)})")
+    parser.add_argument('--delimiter', default=',')
+    parser.add_argument('--reject-unknown-airports', action='store_true',
+                        help='Reject rows with unknown airport codes instead of storing them as custom stops')
+    parser.add_argument('--rejects', help='Where rejected rows are written (default: <csv_file>.rejects.csv)')
+    parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Rows per COPY')
+    parser.add_argument('--dry-run', action='store_true', help='Validate and load, then roll back')
+    import_profile.add_arguments(parser)
+    args = parser.parse_args()
+
+    explicit_map = {}
+    if args.mapping:
+        with open(args.mapping, encoding='utf-8') as file:
+            explicit_map.update(json.load(file))
+    explicit_map.update(parse_mapping(args.map))
+
+    options = {
+        'date_formats': args.date_formats or DATE_FORMATS,
+        'delimiter': args.delimiter,
+        'custom_airports': not args.reject_unknown_airports,
+        'rejects_path': args.rejects or f"{args.csv_file}.rejects.csv",
+        'batch_size': args.batch_size,
+        'dry_run': args.dry_run,
+    }
+
+    conn = None
+    try:
+        with import_profile.profiled('import_logbook_csv', args) as run:
+            # Connect to database
+            conn = psycopg2.connect(db_url)
+            user_id = logbook.find_user(conn, args.user_id, args.username)
+
+            start = time.perf_counter()
+            loaded, rejected = import_logbook(conn, args.csv_file, user_id, explicit_map, options)
+            elapsed = time.perf_counter() - start
+            run.rows = loaded
+
+            print(f"Imported {loaded} logbook entries for user {user_id} in {elapsed:.2f}s "
+                  f"({loaded / elapsed:.0f} rows/sec), {rejected} rejected")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,340 @@
+"""
+Timing, counters and reports for the importers.
+
+Stages are timed with `with import_profile.span('extract_text'):` and line outcomes are
+counted with import_profile.count_lines('parsed'), attributed to the page set by
+`with import_profile.page(n):`. Each process has its own totals; worker processes return
+snapshot(reset=True) with their results and the parent merge()s it.
+
+An importer's main() runs inside `with import_profile.profiled(job, args):`, which writes a
+JSON report, an optional Prometheus textfile-collector file and a comparison with the
+previous run's report on the way out, and can wrap the run in cProfile and tracemalloc.
+"""
+import cProfile
+import io
+import json
+import os
+import pstats
+import resource
+import socket
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Dict, Optional
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+REPORT_DIR = os.getenv('IMPORT_REPORT_DIR', os.path.join(SCRIPT_DIR, '.reports'))
+TEXTFILE_DIR = os.getenv('PROMETHEUS_TEXTFILE_DIR')
+
+LINE_OUTCOMES = ('parsed', 'skipped', 'failed')
+
+# Entries kept from the cProfile and tracemalloc listings
+TOP_ENTRIES = 25
+
+
+class Profiler:
+    """
+    Span timings and counters for one process. Threads share the totals; the current page
+    is per thread, so pipelines running side by side don't attribute lines to each other.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.local = threading.local()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.spans = {}
+            self.lines = dict.fromkeys(LINE_OUTCOMES, 0)
+            self.pages = {}
+            self.counters = {}
+        self.current_page = None
+
+    @property
+    def current_page(self) -> Optional[int]:
+        return getattr(self.local, 'page', None)
+
+    @current_page.setter
+    def current_page(self, number: Optional[int]):
+        self.local.page = number
+
+    def add_span(self, name: str, seconds: float, calls: int = 1, max_seconds: Optional[float] = None):
+        with self.lock:
+            entry = self.spans.setdefault(name, {'calls': 0, 'seconds': 0.0, 'max_seconds': 0.0})
+            entry['calls'] += calls
+            entry['seconds'] += seconds
+            entry['max_seconds'] = max(entry['max_seconds'], seconds if max_seconds is None else max_seconds)
+
+    def count_lines(self, outcome: str, count: int = 1, page: Optional[int] = None):
+        page = self.current_page if page is None else page
+        with self.lock:
+            self.lines[outcome] += count
+            if page is not None:
+                counts = self.pages.setdefault(page, dict.fromkeys(LINE_OUTCOMES, 0))
+                counts[outcome] += count
+
+    def incr(self, name: str, count: int = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + count
+
+    def snapshot(self, reset: bool = False) -> Dict:
+        with self.lock:
+            data = {
+                'spans': {name: dict(entry) for name, entry in self.spans.items()},
+                'lines': dict(self.lines),
+                'pages': {page: dict(counts) for page, counts in self.pages.items()},
+                'counters': dict(self.counters),
+            }
+            if reset:
+                self.reset()
+        return data
+
+    def merge(self, data: Dict):
+        with self.lock:
+            for name, entry in data['spans'].items():
+                self.add_span(name, entry['seconds'], entry['calls'], entry['max_seconds'])
+            for page, counts in data['pages'].items():
+                for outcome, count in counts.items():
+                    self.pages.setdefault(page, dict.fromkeys(LINE_OUTCOMES, 0))[outcome] += count
+            for outcome, count in data['lines'].items():
+                self.lines[outcome] += count
+            for name, count in data['counters'].items():
+                self.incr(name, count)
+
+
+_profiler = Profiler()
+
+# A worker forked while another thread held the lock would inherit it locked
+os.register_at_fork(after_in_child=lambda: setattr(_profiler, 'lock', threading.RLock()))
+
+
+@contextmanager
+def span(name: str):
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profiler.add_span(name, time.perf_counter() - start)
+
+
+@contextmanager
+def page(number: int):
+    """Attribute count_lines() calls inside the block to this page."""
+    previous = _profiler.current_page
+    _profiler.current_page = number
+    try:
+        yield
+    finally:
+        _profiler.current_page = previous
+
+
+def add_span(name: str, seconds: float, calls: int = 1):
+    _profiler.add_span(name, seconds, calls)
+
+
+def count_lines(outcome: str, count: int = 1, page: Optional[int] = None):
+    _profiler.count_lines(outcome, count, page)
+
+
+def incr(name: str, count: int = 1):
+    _profiler.incr(name, count)
+
+
+def snapshot(reset: bool = False) -> Dict:
+    return _profiler.snapshot(reset)
+
+
+def merge(data: Dict):
+    _profiler.merge(data)
+
+
+def add_arguments(parser):
+    group = parser.add_argument_group('profiling')
+    group.add_argument('--report-dir', default=REPORT_DIR,
+                       help='Where the JSON timing report is written (default: $IMPORT_REPORT_DIR or data/.reports)')
+    group.add_argument('--metrics-dir', default=TEXTFILE_DIR,
+                       help='Prometheus textfile-collector directory (default: $PROMETHEUS_TEXTFILE_DIR; off if unset)')
+    group.add_argument('--cprofile', action='store_true',
+                       help='Run under cProfile and save the stats next to the report')
+    group.add_argument('--tracemalloc', action='store_true',
+                       help='Trace Python allocations and report the peak and the top allocation sites')
+
+
+class Run:
+    """What the importer reports about itself while running inside profiled()."""
+
+    def __init__(self):
+        self.rows = None
+        self.extra = {}
+
+
+def _write_atomic(path: str, text: str):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as file:
+        file.write(text)
+    os.replace(tmp_path, path)
+
+
+def _read_report(path: str) -> Optional[Dict]:
+    try:
+        with open(path, encoding='utf-8') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def peak_rss_kb() -> int:
+    """Peak RSS of this process or any worker it has reaped, in KiB (Linux reports KiB)."""
+    own = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    children = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss
+    return max(own, children)
+
+
+def compare(previous: Optional[Dict], report: Dict) -> Optional[Dict]:
+    """Print this run's stages next to the previous run's and return the comparison summary."""
+    if previous and not previous.get('duration_seconds'):
+        previous = None
+    before_spans = previous.get('spans', {}) if previous else {}
+
+    print(f"{'span':<20} {'calls':>8} {'previous':>10} {'current':>10} {'speedup':>8}")
+    for name, entry in report['spans'].items():
+        before = before_spans.get(name, {}).get('seconds')
+        if before is None:
+            print(f"{name:<20} {entry['calls']:>8} {'-':>10} {entry['seconds']:>10.3f}")
+            continue
+        speedup = before / entry['seconds'] if entry['seconds'] else float('inf')
+        print(f"{name:<20} {entry['calls']:>8} {before:>10.3f} {entry['seconds']:>10.3f} {speedup:>7.2f}x")
+
+    if previous is None:
+        print(f"{'total':<20} {'':>8} {'-':>10} {report['duration_seconds']:>10.3f}")
+        return None
+    speedup = previous['duration_seconds'] / report['duration_seconds'] if report['duration_seconds'] else None
+    if speedup is not None:
+        print(f"{'total':<20} {'':>8} {previous['duration_seconds']:>10.3f} "
+              f"{report['duration_seconds']:>10.3f} {speedup:>7.2f}x")
+    return {
+        'finished_at': previous.get('finished_at'),
+        'duration_seconds': previous['duration_seconds'],
+        'speedup': round(speedup, 3) if speedup else None,
+    }
+
+
+def _label(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def prometheus_text(report: Dict) -> str:
+    """The report as Prometheus text exposition format; every metric is a gauge for the last run."""
+    job = _label(report['job'])
+    metrics = []
+
+    def metric(name: str, help_text: str, samples):
+        metrics.append(f"# HELP {name} {help_text}")
+        metrics.append(f"# TYPE {name} gauge")
+        for labels, value in samples:
+            label_text = ','.join([f'job="{job}"'] + [f'{key}="{_label(val)}"' for key, val in labels.items()])
+            metrics.append(f"{name}{{{label_text}}} {value}")
+
+    spans = report['spans'].items()
+    metric('flightlog_import_span_seconds', 'Seconds spent in each import stage in the last run.',
+           [({'span': name}, round(entry['seconds'], 6)) for name, entry in spans])
+    metric('flightlog_import_span_calls', 'Times each import stage ran in the last run.',
+           [({'span': name}, entry['calls']) for name, entry in spans])
+    metric('flightlog_import_lines', 'Source lines by outcome in the last run.',
+           [({'outcome': outcome}, count) for outcome, count in report['lines'].items()])
+    if report['counters']:
+        metric('flightlog_import_events', 'Other import counters from the last run.',
+               [({'name': name}, count) for name, count in report['counters'].items()])
+    metric('flightlog_import_duration_seconds', 'Wall time of the last run.', [({}, report['duration_seconds'])])
+    if report['rows'] is not None:
+        metric('flightlog_import_rows', 'Rows written by the last run.', [({}, report['rows'])])
+    metric('flightlog_import_peak_rss_bytes', 'Peak resident memory of the last run.',
+           [({}, report['peak_rss_kb'] * 1024)])
+    if 'tracemalloc' in report:
+        metric('flightlog_import_traced_peak_bytes', 'Peak memory traced by tracemalloc in the last run.',
+               [({}, report['tracemalloc']['peak_bytes'])])
+    metric('flightlog_import_success', '1 if the last run finished without an error.',
+           [({}, 1 if report['status'] == 'ok' else 0)])
+    metric('flightlog_import_last_run_timestamp_seconds', 'When the last run finished.',
+           [({}, report['finished_timestamp'])])
+    return '\n'.join(metrics) + '\n'
+
+
+@contextmanager
+def profiled(job: str, args):
+    """Run the block with profiling as configured by add_arguments(), then write the reports."""
+    _profiler.reset()
+    run = Run()
+    started_at = datetime.now()
+    start = time.perf_counter()
+    status = 'ok'
+
+    profile = cProfile.Profile() if args.cprofile else None
+    if args.tracemalloc:
+        tracemalloc.start()
+    if profile:
+        profile.enable()
+
+    try:
+        yield run
+    except BaseException:
+        status = 'failed'
+        raise
+    finally:
+        if profile:
+            profile.disable()
+        duration = time.perf_counter() - start
+        data = _profiler.snapshot()
+        report = {
+            'job': job,
+            'host': socket.gethostname(),
+            'started_at': started_at.isoformat(timespec='seconds'),
+            'finished_at': datetime.now().isoformat(timespec='seconds'),
+            'finished_timestamp': round(time.time(), 3),
+            'status': status,
+            'duration_seconds': round(duration, 6),
+            'rows': run.rows,
+            'peak_rss_kb': peak_rss_kb(),
+            'spans': dict(sorted(data['spans'].items(), key=lambda item: -item[1]['seconds'])),
+            'lines': data['lines'],
+            'pages': {str(page): counts for page, counts in sorted(data['pages'].items())},
+            'counters': data['counters'],
+            **run.extra,
+        }
+
+        os.makedirs(args.report_dir, exist_ok=True)
+        report_path = os.path.join(args.report_dir, f"{job}.json")
+
+        if args.tracemalloc:
+            allocations = tracemalloc.take_snapshot()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            report['tracemalloc'] = {
+                'peak_bytes': peak,
+                'top': [f"{stat.traceback}: {stat.size / 1024:.1f} KiB in {stat.count} blocks"
+                        for stat in allocations.statistics('lineno')[:TOP_ENTRIES]],
+            }
+        if profile:
+            stats_path = os.path.join(args.report_dir, f"{job}.pstats")
+            profile.dump_stats(stats_path)
+            listing = io.StringIO()
+            pstats.Stats(profile, stream=listing).sort_stats('cumulative').print_stats(TOP_ENTRIES)
+            report['cprofile'] = {'stats_file': stats_path, 'top': listing.getvalue().splitlines()}
+
+        lines = data['lines']
+        print(f"\nTiming report ({status}, {duration:.2f}s; lines {lines['parsed']} parsed, "
+              f"{lines['skipped']} skipped, {lines['failed']} failed):")
+        report['previous'] = compare(_read_report(report_path), report)
+        _write_atomic(report_path, json.dumps(report, indent=2))
+        print(f"Wrote {report_path}")
+
+        if args.metrics_dir:
+            os.makedirs(args.metrics_dir, exist_ok=True)
+            # The collector reads *.prom, so write under another name and rename into place
+            metrics_path = os.path.join(args.metrics_dir, f"flightlog_{job}.prom")
+            _write_atomic(metrics_path, prometheus_text(report))
+            print(f"Wrote {metrics_path}")
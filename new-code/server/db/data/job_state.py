@@ -0,0 +1,62 @@
+import json
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+# Changes committed by a transaction that started before a run took its watermark carry
+# timestamps older than it; incremental jobs look back this far to re-read them
+WATERMARK_OVERLAP = timedelta(minutes=5)
+
+# When a logbook entry was last written: updated_at once it has been edited, created_at
+# until then. idx_logbook_changed_at indexes exactly this expression, so compare against
+# it verbatim to keep watermark queries off a full scan
+ENTRY_CHANGED_AT = 'COALESCE(updated_at, created_at)'
+
+
+def ensure_table(conn):
+    """Create the table holding each job's checkpoint; it isn't part of create.sql."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS job_state (
+                job VARCHAR(50) PRIMARY KEY,
+                watermark TIMESTAMP,
+                last_id INTEGER,
+                details JSONB NOT NULL DEFAULT '{}',
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            );
+        """)
+
+
+def ensure_changed_at_index(conn):
+    """Index logbook_entries on ENTRY_CHANGED_AT for the jobs that read it past a watermark."""
+    with conn.cursor() as cur:
+        cur.execute(f"CREATE INDEX IF NOT EXISTS idx_logbook_changed_at ON logbook_entries (({ENTRY_CHANGED_AT}));")
+
+
+def load_state(conn, job: str) -> Optional[Dict]:
+    """The saved watermark, last id and details of a job, or None if it has never run."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT watermark, last_id, details FROM job_state WHERE job = %s;", (job,))
+        row = cur.fetchone()
+    if row is None:
+        return None
+    return {'watermark': row[0], 'last_id': row[1], 'details': row[2]}
+
+
+def save_state(conn, job: str, watermark: Optional[datetime] = None, last_id: Optional[int] = None,
+               details: Optional[Dict] = None):
+    """Record a job's progress. Does not commit, so it lands with the work it describes."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO job_state (job, watermark, last_id, details, updated_at)
+            VALUES (%s, %s, %s, %s, CURRENT_TIMESTAMP)
+            ON CONFLICT (job) DO UPDATE SET
+                watermark = EXCLUDED.watermark,
+                last_id = EXCLUDED.last_id,
+                details = EXCLUDED.details,
+                updated_at = CURRENT_TIMESTAMP;
+        """, (job, watermark, last_id, json.dumps(details or {})))
+
+
+def clear_state(conn, job: str):
+    with conn.cursor() as cur:
+        cur.execute("DELETE FROM job_state WHERE job = %s;", (job,))
@@ -0,0 +1,31 @@
+"""Columns and helpers shared by the scripts that read and write logbook_entries."""
+import csv
+import io
+from typing import List, Optional
+
+# The NUMERIC(3,1) hour columns of logbook_entries, in table order
+HOUR_COLUMNS = [
+    'icus_day', 'icus_night', 'dual_day', 'dual_night', 'command_day', 'command_night',
+    'co_pilot_day', 'co_pilot_night', 'instrument_flight', 'instrument_sim',
+]
+
+
+def copy_rows(cur, table: str, columns: List[str], rows: List[List]):
+    """COPY rows in CSV format; None is written unquoted and empty, which COPY reads as NULL."""
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    buffer.seek(0)
+    cur.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer)
+
+
+def find_user(conn, user_id: Optional[int], username: Optional[str]) -> int:
+    """The id of the user given by id or by username, as the scripts' --user-id/--username take them."""
+    with conn.cursor() as cur:
+        if user_id is not None:
+            cur.execute("SELECT id FROM users WHERE id = %s;", (user_id,))
+        else:
+            cur.execute("SELECT id FROM users WHERE username = %s;", (username,))
+        row = cur.fetchone()
+    if row is None:
+        raise ValueError(f"No such user: {user_id if user_id is not None else username}")
+    return row[0]
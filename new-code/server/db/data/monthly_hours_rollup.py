@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""
+Maintains logbook_monthly_hours, a per-user rollup of logbook_entries keyed by
+(user_id, year, month, aircraft_reg).
+
+The statistics and dashboard hour figures (monthly, yearly, lifetime, longest, average and
+night) can all be answered from it, so their cost follows the months a user has flown
+rather than the number of entries.
+
+    python monthly_hours_rollup.py             # incremental, from the saved watermark
+    python monthly_hours_rollup.py --rebuild   # recompute the whole table
+    python monthly_hours_rollup.py --check [--fix] [--user ID]
+
+An incremental run finds changed entries through the id checkpoint and idx_logbook_changed_at.
+Deleted entries leave nothing to find, so each run also compares flight counts for the next
+--count-check-users users after the last ones it checked, wrapping around. Every user is
+checked once per (users / window) runs; --check --fix compares everything at once.
+"""
+import argparse
+import os
+import time
+from typing import List, Optional, Set, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+import job_state
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+JOB_NAME = 'monthly_hours_rollup'
+
+DAY_COLUMNS = ['icus_day', 'dual_day', 'command_day', 'co_pilot_day']
+NIGHT_COLUMNS = ['icus_night', 'dual_night', 'command_night', 'co_pilot_night']
+INSTRUMENT_COLUMNS = ['instrument_flight', 'instrument_sim']
+
+KEY_COLUMNS = ['user_id', 'year', 'month', 'aircraft_reg']
+VALUE_COLUMNS = ['day_hours', 'night_hours', 'instrument_hours', 'flight_count', 'max_flight_hours']
+
+# Users recomputed per DELETE/INSERT round trip
+USER_BATCH_SIZE = 500
+
+# Users whose flight counts an incremental run compares with the rollup
+COUNT_CHECK_USERS = 1000
+
+# The same arithmetic as the statistics query: each entry's length is the sum of all ten
+# hour columns
+ROLLUP_SELECT = f"""
+    SELECT
+        user_id,
+        EXTRACT(YEAR FROM flight_date)::smallint AS year,
+        EXTRACT(MONTH FROM flight_date)::smallint AS month,
+        aircraft_reg,
+        SUM({' + '.join(DAY_COLUMNS)}) AS day_hours,
+        SUM({' + '.join(NIGHT_COLUMNS)}) AS night_hours,
+        SUM({' + '.join(INSTRUMENT_COLUMNS)}) AS instrument_hours,
+        COUNT(*) AS flight_count,
+        MAX({' + '.join(DAY_COLUMNS + NIGHT_COLUMNS + INSTRUMENT_COLUMNS)}) AS max_flight_hours
+    FROM logbook_entries
+    {{where}}
+    GROUP BY user_id, year, month, aircraft_reg
+"""
+
+
+def ensure_table(conn):
+    """Create logbook_monthly_hours, and job_state for the watermark of incremental runs."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TABLE IF NOT EXISTS logbook_monthly_hours (
+                user_id INTEGER NOT NULL,
+                year SMALLINT NOT NULL,
+                month SMALLINT NOT NULL,
+                aircraft_reg VARCHAR(10) NOT NULL,
+                day_hours NUMERIC(10,1) NOT NULL DEFAULT 0,
+                night_hours NUMERIC(10,1) NOT NULL DEFAULT 0,
+                instrument_hours NUMERIC(10,1) NOT NULL DEFAULT 0,
+                flight_count INTEGER NOT NULL DEFAULT 0,
+                max_flight_hours NUMERIC(5,1) NOT NULL DEFAULT 0,
+                PRIMARY KEY (user_id, year, month, aircraft_reg),
+                FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            );
+        """)
+    job_state.ensure_table(conn)
+    job_state.ensure_changed_at_index(conn)
+
+
+def rebuild_users(conn, user_ids: List[int]) -> int:
+    """Recompute every rollup row of these users. Does not commit."""
+    rows = 0
+    with conn.cursor() as cur:
+        for start in range(0, len(user_ids), USER_BATCH_SIZE):
+            batch = user_ids[start:start + USER_BATCH_SIZE]
+            cur.execute("DELETE FROM logbook_monthly_hours WHERE user_id = ANY(%s);", (batch,))
+            # Each user's entries come straight off idx_logbook_user_date
+            cur.execute(f"""
+                INSERT INTO logbook_monthly_hours ({', '.join(KEY_COLUMNS + VALUE_COLUMNS)})
+                {ROLLUP_SELECT.format(where='WHERE user_id = ANY(%s)')};
+            """, (batch,))
+            rows += cur.rowcount
+    return rows
+
+
+def rebuild_all(conn) -> int:
+    """Recompute the whole rollup in one transaction and reset the watermark."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT CURRENT_TIMESTAMP::timestamp, COALESCE(MAX(id), 0) FROM logbook_entries;")
+        watermark, last_id = cur.fetchone()
+        cur.execute("TRUNCATE logbook_monthly_hours;")
+        cur.execute(f"""
+            INSERT INTO logbook_monthly_hours ({', '.join(KEY_COLUMNS + VALUE_COLUMNS)})
+            {ROLLUP_SELECT.format(where='')};
+        """)
+        rows = cur.rowcount
+    job_state.save_state(conn, JOB_NAME, watermark, last_id)
+    conn.commit()
+    return rows
+
+
+def changed_users(conn, watermark, last_id: int) -> Set[int]:
+    """
+    Users with entries inserted or edited since the last run.
+
+    created_at/updated_at catch anything written through the API. Bulk loaders backdate
+    created_at to the flight, so ids above the last one seen count as new as well. Both
+    halves of the OR have an index, so this reads only the changed entries.
+    """
+    since = watermark - job_state.WATERMARK_OVERLAP
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT DISTINCT user_id FROM logbook_entries
+            WHERE id > %s OR {job_state.ENTRY_CHANGED_AT} > %s;
+        """, (last_id, since))
+        return {row[0] for row in cur.fetchall()}
+
+
+def miscounted_users(conn, after_user: int, limit: int) -> Tuple[Set[int], int]:
+    """
+    Of the `limit` users after `after_user`, those whose rollup flight count no longer
+    matches their entries, i.e. entries were deleted (or inserted without any timestamp the
+    watermark could see). Each count is an index-only range scan of idx_logbook_user_date.
+    Returns the users and where the next window starts, 0 once the last user was reached.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT id,
+                   (SELECT COUNT(*) FROM logbook_entries WHERE user_id = users.id)
+                   <> (SELECT COALESCE(SUM(flight_count), 0) FROM logbook_monthly_hours WHERE user_id = users.id)
+            FROM users
+            WHERE id > %s
+            ORDER BY id
+            LIMIT %s;
+        """, (after_user, limit))
+        rows = cur.fetchall()
+    next_after = rows[-1][0] if len(rows) == limit else 0
+    return {user_id for user_id, differs in rows if differs}, next_after
+
+
+def update_incremental(conn, count_check_users: int = COUNT_CHECK_USERS) -> Optional[int]:
+    """
+    Recompute only the users whose entries changed since the saved watermark. Returns the
+    number of users refreshed, or None if there was no watermark and a rebuild was needed.
+    """
+    state = job_state.load_state(conn, JOB_NAME)
+    if state is None or state['watermark'] is None:
+        return None
+
+    with conn.cursor() as cur:
+        # Taken before reading changes, so anything written during this run is seen next time
+        cur.execute("SELECT CURRENT_TIMESTAMP::timestamp, COALESCE(MAX(id), 0) FROM logbook_entries;")
+        watermark, last_id = cur.fetchone()
+
+    users = changed_users(conn, state['watermark'], state['last_id'] or 0)
+    details = state['details']
+    if count_check_users:
+        miscounted, details['count_check_after'] = miscounted_users(
+            conn, details.get('count_check_after', 0), count_check_users)
+        users |= miscounted
+
+    rows = rebuild_users(conn, sorted(users))
+    job_state.save_state(conn, JOB_NAME, watermark, max(last_id, state['last_id'] or 0), details)
+    conn.commit()
+    print(f"Refreshed {len(users)} users ({rows} rollup rows)")
+    return len(users)
+
+
+def check(conn, user_id: Optional[int] = None, show: int = 20) -> List[int]:
+    """Compare the rollup with a fresh aggregate of logbook_entries; returns users that differ."""
+    where = 'WHERE user_id = %(user_id)s' if user_id is not None else ''
+    rollup_where = 'WHERE r.user_id = %(user_id)s' if user_id is not None else ''
+    differs = ' OR '.join(f"live.{column} IS DISTINCT FROM r.{column}" for column in VALUE_COLUMNS)
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            WITH live AS ({ROLLUP_SELECT.format(where=where)}),
+            rollup AS (SELECT * FROM logbook_monthly_hours r {rollup_where})
+            SELECT {', '.join(f'COALESCE(live.{c}, r.{c})' for c in KEY_COLUMNS)},
+                   {', '.join(f'live.{c}' for c in VALUE_COLUMNS)},
+                   {', '.join(f'r.{c}' for c in VALUE_COLUMNS)}
+            FROM live
+            FULL JOIN rollup r USING ({', '.join(KEY_COLUMNS)})
+            WHERE live.user_id IS NULL OR r.user_id IS NULL OR {differs}
+            ORDER BY 1, 2, 3, 4;
+        """, {'user_id': user_id})
+        mismatches = cur.fetchall()
+
+    for row in mismatches[:show]:
+        key = row[:4]
+        live = row[4:4 + len(VALUE_COLUMNS)]
+        stored = row[4 + len(VALUE_COLUMNS):]
+        print(f"  user {key[0]} {key[1]}-{key[2]:02d} {key[3]}: entries {live} rollup {stored}")
+    if len(mismatches) > show:
+        print(f"  ... and {len(mismatches) - show} more")
+    return sorted({row[0] for row in mismatches})
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Maintain the per-user monthly hours rollup')
+    parser.add_argument('--rebuild', action='store_true', help='Recompute the whole rollup')
+    parser.add_argument('--check', action='store_true', help='Compare the rollup with logbook_entries')
+    parser.add_argument('--fix', action='store_true', help='With --check, recompute the users that differ')
+    parser.add_argument('--user', type=int, help='With --check, only check this user')
+    parser.add_argument('--count-check-users', type=int, default=COUNT_CHECK_USERS,
+                        help='Incremental mode: users whose flight counts are compared to catch deletes '
+                             f'(default: {COUNT_CHECK_USERS}, 0 to skip)')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        # Connect to database
+        conn = psycopg2.connect(db_url)
+        ensure_table(conn)
+        conn.commit()
+
+        start = time.perf_counter()
+        if args.check:
+            users = check(conn, args.user)
+            if not users:
+                print("Rollup matches logbook_entries")
+            elif args.fix:
+                rows = rebuild_users(conn, users)
+                conn.commit()
+                print(f"Recomputed {len(users)} users ({rows} rollup rows)")
+            else:
+                print(f"{len(users)} users differ; run with --fix to recompute them")
+        elif args.rebuild or update_incremental(conn, args.count_check_users) is None:
+            if not args.rebuild:
+                print("No watermark yet, rebuilding the whole rollup")
+            rows = rebuild_all(conn)
+            print(f"Rebuilt {rows} rollup rows")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
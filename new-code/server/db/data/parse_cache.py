@@ -0,0 +1,92 @@
+import gzip
+import hashlib
+import json
+import os
+from typing import Dict, List, Optional
+
+# Get the directory where this script is located
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+CACHE_DIR = os.path.join(SCRIPT_DIR, '.cache')
+
+# Records are stored as plain lists in this field order to keep the files small
+RECORD_FIELDS = ['model', 'manufacturer', 'designator', 'wtc']
+
+
+def file_sha256(path: str) -> str:
+    """Hash a file's contents in 1 MiB blocks."""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as file:
+        for block in iter(lambda: file.read(1 << 20), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def pack_records(records: List[Dict]) -> List[List]:
+    return [[record[field] for field in RECORD_FIELDS] for record in records]
+
+
+def unpack_records(rows: List[List]) -> List[Dict]:
+    return [dict(zip(RECORD_FIELDS, row)) for row in rows]
+
+
+def _read(path: str) -> Optional[Dict]:
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        # A truncated or corrupt cache file is treated as a miss
+        print(f"Ignoring unreadable cache file {path}: {e}")
+        return None
+
+
+def write_json_gz(path: str, data: Dict):
+    """Write to a temporary file and rename it into place so readers never see half a file."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as file:
+        json.dump(data, file, separators=(',', ':'))
+    os.replace(tmp_path, path)
+
+
+def document_path(name: str, content_hash: str, parser_version: int) -> str:
+    return os.path.join(CACHE_DIR, f"{name}-{content_hash[:16]}-v{parser_version}.json.gz")
+
+
+def pages_path(name: str, parser_version: int) -> str:
+    return os.path.join(CACHE_DIR, f"{name}-pages-v{parser_version}.json.gz")
+
+
+def load_document(name: str, content_hash: str, parser_version: int) -> Optional[Dict]:
+    """Return {'records', 'parse_seconds'} for a previously parsed document, or None."""
+    data = _read(document_path(name, content_hash, parser_version))
+    if data is None or data.get('content_hash') != content_hash:
+        return None
+    return {'records': unpack_records(data['records']), 'parse_seconds': data['parse_seconds']}
+
+
+def save_document(name: str, content_hash: str, parser_version: int, records: List[Dict], parse_seconds: float):
+    write_json_gz(document_path(name, content_hash, parser_version), {
+        'content_hash': content_hash,
+        'parser_version': parser_version,
+        'parse_seconds': parse_seconds,
+        'records': pack_records(records),
+    })
+
+
+def load_pages(name: str, parser_version: int) -> Dict[str, Dict]:
+    """Return {page_hash: {'records', 'seconds'}} from the page-level cache."""
+    data = _read(pages_path(name, parser_version)) or {}
+    return {
+        page_hash: {'records': unpack_records(page['records']), 'seconds': page['seconds']}
+        for page_hash, page in data.items()
+    }
+
+
+def save_pages(name: str, parser_version: int, pages: Dict[str, Dict]):
+    """Replace the page cache with the pages of the latest parse, dropping pages that no longer exist."""
+    write_json_gz(pages_path(name, parser_version), {
+        page_hash: {'records': pack_records(page['records']), 'seconds': page['seconds']}
+        for page_hash, page in pages.items()
+    })
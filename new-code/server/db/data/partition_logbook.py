@@ -0,0 +1,636 @@
+#!/usr/bin/env python3
+"""
+Converts logbook_entries online into a table range-partitioned by flight_date.
+
+The migration runs in steps, each resumable and safe to re-run:
+
+    python partition_logbook.py prepare [--interval year|month] [--ahead 2]
+    python partition_logbook.py copy [--batch-size 5000] [--pause 0.05]
+    python partition_logbook.py validate
+    python partition_logbook.py report [--user ID]     # EXPLAIN the statistics queries on both tables
+    python partition_logbook.py cutover
+    python partition_logbook.py finish                 # or: rollback
+    python partition_logbook.py partitions [--ahead 2] # from cron, to keep partitions ahead and backfilled
+
+prepare creates logbook_entries_partitioned with its partitions and indexes, and a trigger
+on logbook_entries that mirrors every insert, update and delete into it. copy then fills it
+from the old table in throttled id-range batches, checkpointed in job_state; rows written
+meanwhile arrive through the trigger. cutover validates row counts and hour sums per
+partition, then swaps the names in one short transaction and turns the trigger around, so the
+old table (now logbook_entries_unpartitioned) keeps receiving every write and rollback can
+swap back. finish drops the old table.
+
+Partitions run from the oldest flight_date at prepare to `ahead` intervals past today.
+Entries outside them, such as a backdated flight, go to logbook_entries_default. The
+partitions command then creates the partitions those entries need and moves them out of
+the default partition; only dates beyond the last partition stay there.
+
+A partitioned table's primary key has to include the partition key, so the new one is
+(id, flight_date) and route_stops can no longer have a foreign key to it. From cutover a
+trigger removes the route stops of deleted entries instead; if route_stops doesn't exist
+yet, route_stops_etl.py creates it that way on its first run.
+"""
+import argparse
+import os
+import re
+import time
+from datetime import date
+from typing import Dict, List, Optional, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+import api_queries
+import job_state
+import route_stops_etl
+import schema
+from logbook import HOUR_COLUMNS
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+JOB_NAME = 'logbook_partitioning'
+
+TABLE = 'logbook_entries'
+NEW_TABLE = 'logbook_entries_partitioned'
+OLD_TABLE = 'logbook_entries_unpartitioned'
+
+# Indexes from create.sql, recreated on the partitioned table. Each table keeps its index
+# names under its own suffix while it isn't logbook_entries
+INDEXES = {
+    'idx_logbook_user_date': '(user_id, flight_date)',
+    'idx_logbook_aircraft': '(aircraft_reg)',
+    'idx_route_data': 'USING GIN (route_data)',
+    'idx_logbook_changed_at': f"(({job_state.ENTRY_CHANGED_AT}))",
+}
+INDEX_NAMES = ['logbook_entries_pkey', *INDEXES]
+
+INTERVALS = ['year', 'month']
+
+# Partitions kept ahead of the current one
+AHEAD = 2
+
+BATCH_SIZE = 5000
+PAUSE = 0.05
+
+# Statistics queries whose plans are compared. The month-bounded one is the longest_flight
+# part of STATISTICS_SQL and can be pruned to one partition; lifetime hours has to read
+# all of them
+REPORT_QUERIES = {
+    'statistics': api_queries.STATISTICS_SQL,
+    'longest_flight_this_month': """
+        SELECT COALESCE(MAX(icus_day + icus_night + dual_day + dual_night + command_day +
+          command_night + co_pilot_day + co_pilot_night + instrument_flight + instrument_sim), 0)
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s
+          AND flight_date >= DATE_TRUNC('month', CURRENT_DATE);
+    """,
+    'lifetime_hours': """
+        SELECT COALESCE(SUM(icus_day + icus_night + dual_day + dual_night + command_day +
+          command_night + co_pilot_day + co_pilot_night + instrument_flight + instrument_sim), 0)
+        FROM logbook_entries
+        WHERE user_id = %(user_id)s;
+    """,
+}
+
+SYNC_FUNCTION = """
+    CREATE OR REPLACE FUNCTION logbook_entries_sync() RETURNS trigger AS $$
+    BEGIN
+        -- Both tables have the same columns in the same order, so a row copies across whole
+        IF TG_OP IN ('UPDATE', 'DELETE') THEN
+            EXECUTE format('DELETE FROM %I WHERE id = $1 AND flight_date = $2', TG_ARGV[0])
+                USING OLD.id, OLD.flight_date;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') THEN
+            EXECUTE format('INSERT INTO %I SELECT ($1).* ON CONFLICT DO NOTHING', TG_ARGV[0]) USING NEW;
+        END IF;
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def suffix(table: str) -> str:
+    """'_partitioned' or '_unpartitioned': where a table's index names go while it's standing by."""
+    return table[len(TABLE):]
+
+
+def interval_start(day: date, interval: str) -> date:
+    return date(day.year, 1, 1) if interval == 'year' else date(day.year, day.month, 1)
+
+
+def next_start(day: date, interval: str) -> date:
+    if interval == 'year':
+        return date(day.year + 1, 1, 1)
+    return date(day.year + day.month // 12, day.month % 12 + 1, 1)
+
+
+def partition_name(start: date, interval: str) -> str:
+    if interval == 'year':
+        return f"{TABLE}_y{start.year}"
+    return f"{TABLE}_y{start.year}m{start.month:02d}"
+
+
+def partition_ranges(first: date, ahead: int, interval: str) -> List[Tuple[str, date, date]]:
+    """(name, from, to) for every partition from the one holding `first` to `ahead` past today's."""
+    last = interval_start(date.today(), interval)
+    for _ in range(ahead):
+        last = next_start(last, interval)
+    ranges = []
+    start = interval_start(first, interval)
+    while start <= last:
+        end = next_start(start, interval)
+        ranges.append((partition_name(start, interval), start, end))
+        start = end
+    return ranges
+
+
+def table_exists(conn, table: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (table,))
+        return cur.fetchone()[0]
+
+
+def partitioned_table(conn) -> str:
+    """Whichever of logbook_entries and logbook_entries_partitioned is the partitioned one."""
+    with conn.cursor() as cur:
+        cur.execute("SELECT relname FROM pg_class WHERE relkind = 'p' AND relname IN (%s, %s);", (TABLE, NEW_TABLE))
+        row = cur.fetchone()
+    if row is None:
+        raise ValueError(f"No partitioned {TABLE} yet; run prepare first")
+    return row[0]
+
+
+def partition_bounds(first: date, ahead: int, interval: str) -> List[Tuple[str, str]]:
+    """(name, bounds) for the partitions of partition_ranges plus the default partition."""
+    bounds = [(name, f"FOR VALUES FROM ('{start}') TO ('{end}')")
+              for name, start, end in partition_ranges(first, ahead, interval)]
+    bounds.append((f"{TABLE}_default", 'DEFAULT'))
+    return bounds
+
+
+def attach_partition(cur, table: str, name: str, start: date, end: date):
+    """
+    Create partition `name` of `table`, first moving the default partition's rows in its
+    range into it: Postgres refuses a partition whose rows are still in the default one.
+    """
+    default = f"{TABLE}_default"
+    bounds = f"FOR VALUES FROM ('{start}') TO ('{end}')"
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL;", (default,))
+    waiting = cur.fetchone()[0]
+    if waiting:
+        cur.execute(f"SELECT EXISTS (SELECT 1 FROM {default} WHERE flight_date >= %s AND flight_date < %s);",
+                    (start, end))
+        waiting = cur.fetchone()[0]
+    if not waiting:
+        cur.execute(f"CREATE TABLE {name} PARTITION OF {table} {bounds};")
+        return
+
+    cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE);")
+    # The rows only change partition, so the sync and route_stops triggers mustn't see
+    # deletes. Disabling them locks the default partition against writes until commit
+    cur.execute(f"ALTER TABLE {default} DISABLE TRIGGER USER;")
+    cur.execute(f"""
+        WITH moved AS (
+            DELETE FROM {default} WHERE flight_date >= %s AND flight_date < %s RETURNING *
+        )
+        INSERT INTO {name} SELECT * FROM moved;
+    """, (start, end))
+    cur.execute(f"ALTER TABLE {default} ENABLE TRIGGER USER;")
+    # Adds the parent's indexes, foreign key and triggers to the new partition
+    cur.execute(f"ALTER TABLE {table} ATTACH PARTITION {name} {bounds};")
+
+
+def ensure_partitions(conn, table: str, first: date, ahead: int, interval: str) -> List[str]:
+    """
+    Create any missing partitions up to `ahead` intervals past the current one, one short
+    transaction each, plus a default partition for dates outside them all.
+
+    Entries dated before the first partition, or in a gap, land in the default partition.
+    Every interval up to the last partition that has such rows gets its partition too,
+    and the rows move into it as it's attached. Later dates wait in the default partition
+    until they come within `ahead` of today.
+    """
+    ranges = partition_ranges(first, ahead, interval)
+    default = f"{TABLE}_default"
+    if table_exists(conn, default):
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                SELECT DISTINCT DATE_TRUNC('{interval}', flight_date)::date
+                FROM {default}
+                WHERE flight_date < %s;
+            """, (ranges[-1][2],))
+            waiting = [row[0] for row in cur.fetchall()]
+        conn.commit()
+        ranges = sorted(set(ranges) | {(partition_name(start, interval), start, next_start(start, interval))
+                                       for start in waiting}, key=lambda r: r[1])
+
+    created = []
+    for name, start, end in ranges:
+        if table_exists(conn, name):
+            continue
+        # Attaching a partition locks the parent; don't queue behind a long query
+        schema.with_lock_retries(conn, table, lambda cur: attach_partition(cur, table, name, start, end))
+        created.append(name)
+    if not table_exists(conn, default):
+        schema.with_lock_retries(conn, table, lambda cur: cur.execute(
+            f"CREATE TABLE {default} PARTITION OF {table} DEFAULT;"))
+        created.append(default)
+    return created
+
+
+def prepare(conn, interval: str, ahead: int):
+    """
+    Create the partitioned table and start mirroring writes into it, all in one transaction
+    with the state row, so a prepare that fails leaves nothing behind and can simply be rerun.
+    """
+    job_state.ensure_table(conn)
+    state = job_state.load_state(conn, JOB_NAME)
+    if state is not None:
+        phase = state['details']['phase']
+        next_step = {
+            'copy': 'run copy to go on, or abort to start over',
+            'copied': 'run cutover to go on, or abort to start over',
+            'cutover': 'run finish to keep it, or rollback and then abort to start over',
+            'done': f"{TABLE} is already partitioned",
+        }[phase]
+        raise ValueError(f"Migration already prepared (phase {phase}); {next_step}")
+    conn.commit()
+
+    def create(cur) -> Tuple[int, int]:
+        cur.execute(f"SELECT MIN(flight_date) FROM {TABLE};")
+        first = cur.fetchone()[0] or date.today()
+
+        # Same columns in the same order, with the id default still on logbook_entries_id_seq
+        cur.execute(f"""
+            CREATE TABLE {NEW_TABLE} (
+                LIKE {TABLE} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS,
+                CONSTRAINT logbook_entries_pkey{suffix(NEW_TABLE)} PRIMARY KEY (id, flight_date),
+                CONSTRAINT logbook_entries_user_id_fkey FOREIGN KEY (user_id) REFERENCES users(id) ON DELETE CASCADE
+            ) PARTITION BY RANGE (flight_date);
+        """)
+        for name, definition in INDEXES.items():
+            cur.execute(f"CREATE INDEX {name}{suffix(NEW_TABLE)} ON {NEW_TABLE} {definition};")
+        partitions = partition_bounds(first, ahead, interval)
+        for name, bounds in partitions:
+            cur.execute(f"CREATE TABLE {name} PARTITION OF {NEW_TABLE} {bounds};")
+
+        cur.execute(SYNC_FUNCTION)
+        # Waits for writes in flight, so every write committed after this is mirrored
+        cur.execute(f"""
+            CREATE TRIGGER logbook_entries_sync
+            AFTER INSERT OR UPDATE OR DELETE ON {TABLE}
+            FOR EACH ROW EXECUTE FUNCTION logbook_entries_sync('{NEW_TABLE}');
+        """)
+
+        # Rows up to here are copied in batches; later ones arrive through the trigger
+        cur.execute(f"SELECT COALESCE(MAX(id), 0) FROM {TABLE};")
+        copy_until = cur.fetchone()[0]
+        job_state.save_state(conn, JOB_NAME, None, 0, {
+            'phase': 'copy', 'interval': interval, 'ahead': ahead, 'copy_until': copy_until,
+        })
+        return len(partitions), copy_until
+
+    partitions, copy_until = schema.with_lock_retries(conn, TABLE, create)
+    print(f"Created {NEW_TABLE} with {partitions} partitions")
+    print(f"Mirroring writes into {NEW_TABLE}; entries up to id {copy_until} are left to copy")
+
+
+def copy(conn, batch_size: int, pause: float):
+    """Copy entries up to copy_until in id ranges, checkpointing every batch."""
+    state = require_phase(conn, 'copy', 'copied')
+    details = state['details']
+    last_id = state['last_id']
+    copy_until = details['copy_until']
+    if last_id:
+        print(f"Resuming after id {last_id} of {copy_until}")
+
+    copied = 0
+    start = last_report = time.perf_counter()
+    while last_id < copy_until:
+        upper = min(last_id + batch_size, copy_until)
+        with conn.cursor() as cur:
+            # FOR SHARE makes a concurrent update or delete of these rows wait for this batch,
+            # so its trigger then finds the copied row, or this batch reads the updated one
+            cur.execute(f"""
+                WITH batch AS (
+                    SELECT * FROM {TABLE} WHERE id > %s AND id <= %s FOR SHARE
+                )
+                INSERT INTO {NEW_TABLE} SELECT * FROM batch
+                ON CONFLICT DO NOTHING;
+            """, (last_id, upper))
+            copied += cur.rowcount
+        last_id = upper
+        job_state.save_state(conn, JOB_NAME, None, last_id, details)
+        conn.commit()
+
+        if time.perf_counter() - last_report >= 5 or last_id == copy_until:
+            last_report = time.perf_counter()
+            print(f"  {copied} entries copied, checkpoint id {last_id} of {copy_until} "
+                  f"({copied / (last_report - start):.0f} entries/sec)")
+        if pause:
+            time.sleep(pause)
+
+    details['phase'] = 'copied'
+    job_state.save_state(conn, JOB_NAME, None, last_id, details)
+    conn.commit()
+    with conn.cursor() as cur:
+        cur.execute(f"ANALYZE {NEW_TABLE};")
+    conn.commit()
+    print(f"Copy finished: {copied} entries in {time.perf_counter() - start:.2f}s")
+
+
+def bucket_totals(cur, table: str, interval: str) -> Dict[date, Tuple]:
+    cur.execute(f"""
+        SELECT DATE_TRUNC('{interval}', flight_date)::date, COUNT(*), {', '.join(f'SUM({c})' for c in HOUR_COLUMNS)}
+        FROM {table}
+        GROUP BY 1;
+    """)
+    return {row[0]: row[1:] for row in cur.fetchall()}
+
+
+def validate(conn) -> bool:
+    """
+    Compare row counts and hour sums per partition interval between the two tables.
+
+    Both are read from one snapshot. The trigger writes both tables in the same transaction,
+    so tables that match in a snapshot stay matched as long as the trigger is in place.
+    """
+    state = require_phase(conn, 'copied', 'cutover')
+    interval = state['details']['interval']
+    other = NEW_TABLE if state['details']['phase'] == 'copied' else OLD_TABLE
+
+    conn.commit()
+    conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_REPEATABLE_READ, readonly=True)
+    try:
+        with conn.cursor() as cur:
+            start = time.perf_counter()
+            live = bucket_totals(cur, TABLE, interval)
+            standby = bucket_totals(cur, other, interval)
+        conn.rollback()
+    finally:
+        conn.set_session(isolation_level=psycopg2.extensions.ISOLATION_LEVEL_DEFAULT, readonly=False)
+
+    mismatches = sorted(bucket for bucket in live.keys() | standby.keys() if live.get(bucket) != standby.get(bucket))
+    for bucket in mismatches[:20]:
+        live_row, standby_row = live.get(bucket), standby.get(bucket)
+        print(f"  {bucket}: {TABLE} {live_row[0] if live_row else 0} rows, "
+              f"{other} {standby_row[0] if standby_row else 0} rows; hour sums "
+              f"{'match' if live_row and standby_row and live_row[1:] == standby_row[1:] else 'differ'}")
+    rows = sum(row[0] for row in live.values())
+    if mismatches:
+        print(f"{len(mismatches)} of {len(live | standby)} {interval}s differ between {TABLE} and {other}")
+        return False
+    print(f"{TABLE} and {other} match: {rows} rows over {len(live)} {interval}s, "
+          f"checked in {time.perf_counter() - start:.2f}s")
+    return True
+
+
+def switch(conn, state: Dict, phase: str, incoming: str, retired: str):
+    """
+    Make `incoming` logbook_entries and `retired` the standby in one transaction: rename the
+    tables and their indexes, move the id sequence and the route_stops link, point the sync
+    trigger from the new logbook_entries at the standby, and record `phase` in job_state.
+    """
+    partitioning = incoming == NEW_TABLE
+    has_route_stops = table_exists(conn, 'route_stops')
+
+    def rename(cur) -> float:
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (TABLE,))
+        sequence = cur.fetchone()[0]
+        cur.execute(f"LOCK TABLE {TABLE}, {incoming} IN ACCESS EXCLUSIVE MODE;")
+        locked = time.perf_counter()
+
+        cur.execute(f"DROP TRIGGER logbook_entries_sync ON {TABLE};")
+        if has_route_stops:
+            if partitioning:
+                cur.execute("ALTER TABLE route_stops DROP CONSTRAINT IF EXISTS route_stops_entry_id_fkey;")
+            else:
+                cur.execute(f"DROP TRIGGER IF EXISTS logbook_entries_route_stops ON {TABLE};")
+
+        cur.execute(f"ALTER TABLE {TABLE} RENAME TO {retired};")
+        for name in INDEX_NAMES:
+            # Renaming an index that backs a constraint renames the constraint too
+            cur.execute(f"ALTER INDEX IF EXISTS {name} RENAME TO {name}{suffix(retired)};")
+        cur.execute(f"ALTER TABLE {incoming} RENAME TO {TABLE};")
+        for name in INDEX_NAMES:
+            cur.execute(f"ALTER INDEX IF EXISTS {name}{suffix(incoming)} RENAME TO {name};")
+        if sequence:
+            # Dropping the retired table later mustn't take the sequence with it
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {TABLE}.id;")
+
+        cur.execute(f"""
+            CREATE TRIGGER logbook_entries_sync
+            AFTER INSERT OR UPDATE OR DELETE ON {TABLE}
+            FOR EACH ROW EXECUTE FUNCTION logbook_entries_sync('{retired}');
+        """)
+        if has_route_stops:
+            if partitioning:
+                route_stops_etl.install_delete_trigger(cur)
+            else:
+                # Checked separately below, so the swap doesn't hold its locks for a scan
+                cur.execute(f"""
+                    ALTER TABLE route_stops ADD CONSTRAINT route_stops_entry_id_fkey
+                    FOREIGN KEY (entry_id) REFERENCES {TABLE}(id) ON DELETE CASCADE NOT VALID;
+                """)
+        job_state.save_state(conn, JOB_NAME, None, state['last_id'], {**state['details'], 'phase': phase})
+        return locked
+
+    locked = schema.with_lock_retries(conn, TABLE, rename)
+    lock_seconds = time.perf_counter() - locked
+
+    if has_route_stops and not partitioning:
+        with conn.cursor() as cur:
+            cur.execute("ALTER TABLE route_stops VALIDATE CONSTRAINT route_stops_entry_id_fkey;")
+        conn.commit()
+    return lock_seconds
+
+
+def cutover(conn):
+    state = require_phase(conn, 'copied')
+    if not validate(conn):
+        raise ValueError("Tables differ; not switching")
+    lock_seconds = switch(conn, state, 'cutover', NEW_TABLE, OLD_TABLE)
+    print(f"{TABLE} is now partitioned (locks held {lock_seconds * 1000:.1f} ms); "
+          f"{OLD_TABLE} is kept in sync until finish")
+
+
+def rollback(conn):
+    state = require_phase(conn, 'cutover')
+    lock_seconds = switch(conn, state, 'copied', OLD_TABLE, NEW_TABLE)
+    print(f"{TABLE} is unpartitioned again (locks held {lock_seconds * 1000:.1f} ms); "
+          f"{NEW_TABLE} is kept in sync")
+
+
+def finish(conn):
+    state = require_phase(conn, 'cutover')
+
+    def drop(cur):
+        cur.execute(f"DROP TRIGGER logbook_entries_sync ON {TABLE};")
+        cur.execute(f"DROP TABLE {OLD_TABLE};")
+        cur.execute("DROP FUNCTION logbook_entries_sync();")
+        job_state.save_state(conn, JOB_NAME, None, state['last_id'], {**state['details'], 'phase': 'done'})
+
+    schema.with_lock_retries(conn, TABLE, drop)
+    print(f"Dropped {OLD_TABLE}; migration finished")
+
+
+def abort(conn):
+    """Drop the partitioned copy and the trigger before cutover, leaving logbook_entries as it was."""
+    state = require_phase(conn, 'copy', 'copied')
+
+    def drop(cur):
+        cur.execute(f"DROP TRIGGER IF EXISTS logbook_entries_sync ON {TABLE};")
+        cur.execute(f"DROP TABLE IF EXISTS {NEW_TABLE};")
+        cur.execute("DROP FUNCTION IF EXISTS logbook_entries_sync();")
+        job_state.clear_state(conn, JOB_NAME)
+
+    schema.with_lock_retries(conn, TABLE, drop)
+    print(f"Dropped {NEW_TABLE}; {TABLE} is unchanged (was in phase {state['details']['phase']})")
+
+
+def require_phase(conn, *phases: str) -> Dict:
+    job_state.ensure_table(conn)
+    state = job_state.load_state(conn, JOB_NAME)
+    phase = state['details']['phase'] if state else None
+    if phase not in phases:
+        raise ValueError(f"Migration is in phase {phase or 'not started'}; this step needs {' or '.join(phases)}")
+    return state
+
+
+def plan_nodes(node: Dict) -> List[Dict]:
+    nodes = [node]
+    for child in node.get('Plans', []):
+        nodes.extend(plan_nodes(child))
+    return nodes
+
+
+def explain(conn, sql: str, table: str, user_id: int, repeat: int) -> Dict:
+    """Run the query against `table` and summarize its fastest EXPLAIN ANALYZE."""
+    sql = re.sub(rf'\b{TABLE}\b', table, sql)
+    best = None
+    with conn.cursor() as cur:
+        for _ in range(repeat):
+            cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {sql}", {'user_id': user_id})
+            result = cur.fetchone()[0][0]
+            if best is None or result['Execution Time'] < best['Execution Time']:
+                best = result
+    conn.rollback()
+
+    nodes = plan_nodes(best['Plan'])
+    scanned = {node['Relation Name'] for node in nodes if 'Relation Name' in node}
+    return {
+        'execution_ms': best['Execution Time'],
+        'planning_ms': best['Planning Time'],
+        'buffers': best['Plan'].get('Shared Hit Blocks', 0) + best['Plan'].get('Shared Read Blocks', 0),
+        'relations': sorted(name for name in scanned if name == table or name.startswith(f"{TABLE}_")),
+        'subplans_removed': sum(node.get('Subplans Removed', 0) for node in nodes),
+    }
+
+
+def report(conn, user_id: Optional[int], repeat: int):
+    """EXPLAIN ANALYZE the statistics queries on the unpartitioned and the partitioned table."""
+    partitioned = partitioned_table(conn)
+    unpartitioned = TABLE if partitioned == NEW_TABLE else OLD_TABLE
+    if not table_exists(conn, unpartitioned):
+        raise ValueError(f"{unpartitioned} no longer exists, so there is nothing to compare with")
+
+    with conn.cursor() as cur:
+        cur.execute(f"""
+            SELECT COUNT(*) FROM pg_inherits WHERE inhparent = %s::regclass;
+        """, (partitioned,))
+        partitions = cur.fetchone()[0]
+        if user_id is None:
+            cur.execute(f"SELECT user_id FROM {TABLE} GROUP BY user_id ORDER BY COUNT(*) DESC LIMIT 1;")
+            row = cur.fetchone()
+            user_id = row[0] if row else 0
+    print(f"Plans for user {user_id}, best of {repeat}: {unpartitioned} (before) vs {partitioned} "
+          f"({partitions} partitions, after)")
+    print(f"{'query':<28} {'table':<8} {'exec ms':>9} {'plan ms':>8} {'buffers':>8} {'scanned':>8} {'pruned':>7}")
+
+    for name, sql in REPORT_QUERIES.items():
+        summaries = {}
+        for label, table in (('before', unpartitioned), ('after', partitioned)):
+            try:
+                summaries[label] = explain(conn, sql, table, user_id, repeat)
+            except psycopg2.Error as e:
+                conn.rollback()
+                print(f"{name:<28} {label:<8} failed: {str(e).splitlines()[0]}")
+                continue
+            summary = summaries[label]
+            scanned = len(summary['relations'])
+            print(f"{name:<28} {label:<8} {summary['execution_ms']:>9.2f} {summary['planning_ms']:>8.2f} "
+                  f"{summary['buffers']:>8} {scanned:>8} {summary['subplans_removed']:>7}")
+        if len(summaries) == 2 and summaries['after']['execution_ms']:
+            speedup = summaries['before']['execution_ms'] / summaries['after']['execution_ms']
+            print(f"{'':<28} {'speedup':<8} {speedup:>8.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Migrate logbook_entries to range partitioning by flight_date')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    prepare_parser = subparsers.add_parser('prepare', help='Create the partitioned table and start mirroring writes')
+    prepare_parser.add_argument('--interval', choices=INTERVALS, default='year', help='Range of each partition')
+    prepare_parser.add_argument('--ahead', type=int, default=AHEAD, help='Future partitions to create')
+
+    copy_parser = subparsers.add_parser('copy', help='Copy existing entries in throttled batches')
+    copy_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE, help='Ids per batch')
+    copy_parser.add_argument('--pause', type=float, default=PAUSE, help='Seconds to sleep between batches')
+
+    subparsers.add_parser('validate', help='Compare row counts and hour sums between the two tables')
+
+    report_parser = subparsers.add_parser('report', help='Compare statistics query plans before and after')
+    report_parser.add_argument('--user', type=int, help='User to run the queries for (default: the one with most entries)')
+    report_parser.add_argument('--repeat', type=int, default=3)
+
+    subparsers.add_parser('cutover', help='Validate, then swap the partitioned table in')
+    subparsers.add_parser('rollback', help='Swap the unpartitioned table back in after a cutover')
+    subparsers.add_parser('finish', help='Drop the unpartitioned table after a cutover')
+    subparsers.add_parser('abort', help='Drop the partitioned table before a cutover')
+
+    partitions_parser = subparsers.add_parser('partitions', help='Create future partitions and empty the default one')
+    partitions_parser.add_argument('--ahead', type=int, help='Future partitions to keep (default: as prepared)')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        # Connect to database
+        conn = psycopg2.connect(db_url)
+
+        start = time.perf_counter()
+        if args.command == 'prepare':
+            prepare(conn, args.interval, args.ahead)
+        elif args.command == 'copy':
+            copy(conn, args.batch_size, args.pause)
+        elif args.command == 'validate':
+            validate(conn)
+        elif args.command == 'report':
+            report(conn, args.user, args.repeat)
+        elif args.command == 'cutover':
+            cutover(conn)
+        elif args.command == 'rollback':
+            rollback(conn)
+        elif args.command == 'finish':
+            finish(conn)
+        elif args.command == 'abort':
+            abort(conn)
+        elif args.command == 'partitions':
+            state = require_phase(conn, 'copy', 'copied', 'cutover', 'done')
+            details = state['details']
+            created = ensure_partitions(conn, partitioned_table(conn), date.today(),
+                                        details['ahead'] if args.ahead is None else args.ahead, details['interval'])
+            print(f"Created {len(created)} partitions{': ' + ', '.join(created) if created else ''}")
+        print(f"Done in {time.perf_counter() - start:.2f}s")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,331 @@
+#!/usr/bin/env python3
+"""
+Refreshes airports and aircraft_types together, without leaving either half loaded.
+
+Both pipelines run at the same time, each on a connection from one shared pool. A pipeline
+loads a shadow copy of its table (airports_shadow, aircraft_types_shadow), builds the live
+table's indexes and constraints on it, and checks the row count and key uniqueness. Only
+then is the shadow renamed into place, in a short transaction that holds the live table's
+lock for milliseconds rather than for the whole load. If anything fails before the rename,
+the live table is untouched.
+
+    python refresh_reference_data.py                   # both pipelines
+    python refresh_reference_data.py --only airports
+    python refresh_reference_data.py --dry-run         # load and check the shadows, don't swap
+
+A shadow starts as a copy of the live rows and is brought in line with the CSV or PDF by
+diff_sync, the same way `--mode sync` updates the live tables. Rows are matched on their
+natural key (ICAO for airports, designator, manufacturer and model for aircraft types), so
+existing ids, and with them the airport ids in route_data, survive the swap; only new rows
+get new ids from the live sequence.
+"""
+import argparse
+import os
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from dotenv import load_dotenv
+from psycopg2.pool import ThreadedConnectionPool
+
+import aircraft_search_index
+import airport_search_index
+import diff_sync
+import import_aircraft_data
+import import_airports
+import import_profile
+import schema
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+# The live table must keep at least this share of its rows
+MIN_ROW_RATIO = 0.9
+
+
+def sync_shadow(conn, shadow: str, columns: Dict[str, str], key_of, rows) -> int:
+    """Sync the shadow's copy of the live rows to the source; returns the rows it now holds."""
+    with import_profile.span('db_sync'):
+        counts = diff_sync.sync_table(conn, shadow, columns, key_of, rows)
+    with import_profile.span('db_commit'):
+        conn.commit()
+    print(f"  {shadow}: {diff_sync.format_counts(counts)}")
+    return counts['unchanged'] + counts['inserted'] + counts['updated']
+
+
+def load_airports(conn, shadow: str, options: Dict) -> int:
+    return sync_shadow(conn, shadow, import_airports.AIRPORT_COLUMNS, import_airports.airport_key,
+                       import_airports.read_airports())
+
+
+def load_aircraft_types(conn, shadow: str, options: Dict) -> int:
+    pdf_path = import_aircraft_data.PDF_FILE
+    if options['no_cache']:
+        aircraft_data = import_aircraft_data.iter_aircraft(pdf_path, options['workers'])
+    else:
+        aircraft_data = import_aircraft_data.load_aircraft(pdf_path, options['workers'])
+    return sync_shadow(conn, shadow, import_aircraft_data.AIRCRAFT_COLUMNS, import_aircraft_data.aircraft_key,
+                       import_aircraft_data.aircraft_rows(aircraft_data))
+
+
+def build_airport_search_index(conn):
+    # The CSV may be unchanged while the swap still changed rows, so don't trust its hash
+    airport_search_index.build_if_stale(conn, import_airports.CSV_FILE, force=True)
+
+
+PIPELINES = {
+    'airports': {
+        'table': 'airports',
+        'load': load_airports,
+        # Keys that must be unique, and the rows they apply to (see import_airports.airport_key)
+        'keys': [('id', 'TRUE'), ('icao', 'icao IS NOT NULL'), ('iata, airport_name', 'icao IS NULL')],
+        'search_index': build_airport_search_index,
+    },
+    'aircraft': {
+        'table': 'aircraft_types',
+        'load': load_aircraft_types,
+        'keys': [('id', 'TRUE'), ('designator, manufacturer, model', 'TRUE')],
+        'search_index': aircraft_search_index.build_from_table,
+    },
+}
+
+
+def create_shadow(conn, table: str) -> str:
+    """
+    A copy of the table and its rows without its indexes, so the load doesn't maintain them
+    row by row. Its id default still draws from the live table's sequence.
+    """
+    shadow = f"{table}_shadow"
+    with conn.cursor() as cur:
+        # Left behind by an earlier run that failed
+        cur.execute(f"DROP TABLE IF EXISTS {shadow};")
+        cur.execute(f"""
+            CREATE TABLE {shadow} (
+                LIKE {table} INCLUDING DEFAULTS INCLUDING CONSTRAINTS INCLUDING STORAGE INCLUDING COMMENTS
+            );
+        """)
+        # Same columns in the same order, so the rows copy across whole
+        cur.execute(f"INSERT INTO {shadow} SELECT * FROM {table};")
+    conn.commit()
+    return shadow
+
+
+def live_indexes(conn, table: str) -> List[Dict]:
+    """The table's indexes, with the definition of the constraint behind each one if any."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT i.relname, pg_get_indexdef(x.indexrelid), c.conname, pg_get_constraintdef(c.oid)
+            FROM pg_index x
+            JOIN pg_class i ON i.oid = x.indexrelid
+            LEFT JOIN pg_constraint c ON c.conindid = x.indexrelid AND c.conrelid = x.indrelid
+            WHERE x.indrelid = %s::regclass
+            ORDER BY i.relname;
+        """, (table,))
+        return [{'name': name, 'indexdef': indexdef, 'constraint': conname, 'constraintdef': condef}
+                for name, indexdef, conname, condef in cur.fetchall()]
+
+
+def build_indexes(conn, table: str, shadow: str) -> List[str]:
+    """Recreate the live table's indexes on the shadow as <name>_shadow; returns the live names."""
+    indexes = live_indexes(conn, table)
+    with conn.cursor() as cur:
+        for index in indexes:
+            shadow_name = f"{index['name']}_shadow"
+            if index['constraint']:
+                # Primary keys and unique constraints come back as constraints, not bare indexes
+                if index['constraint'] != index['name']:
+                    raise ValueError(f"Constraint {index['constraint']} is backed by index {index['name']}")
+                cur.execute(f"ALTER TABLE {shadow} ADD CONSTRAINT {shadow_name} {index['constraintdef']};")
+            else:
+                match = re.match(r'(CREATE (?:UNIQUE )?INDEX) \S+ ON (?:ONLY )?\S+ (.*)$', index['indexdef'])
+                cur.execute(f"{match.group(1)} {shadow_name} ON {shadow} {match.group(2)};")
+        cur.execute(f"ANALYZE {shadow};")
+    conn.commit()
+    return [index['name'] for index in indexes]
+
+
+def check_shadow(conn, pipeline: Dict, shadow: str, min_ratio: float) -> List[str]:
+    """Problems that should stop the swap; an empty list means the shadow looks right."""
+    problems = []
+    table = pipeline['table']
+    with conn.cursor() as cur:
+        cur.execute(f"SELECT (SELECT COUNT(*) FROM {shadow}), (SELECT COUNT(*) FROM {table});")
+        new_rows, live_rows = cur.fetchone()
+        print(f"  {shadow}: {new_rows} rows ({live_rows} in {table})")
+        if new_rows == 0:
+            problems.append(f"{shadow} is empty")
+        elif new_rows < live_rows * min_ratio:
+            problems.append(f"{shadow} has {new_rows} rows, fewer than {min_ratio:.0%} of the {live_rows} in {table}")
+
+        for key, where in pipeline['keys']:
+            cur.execute(f"""
+                SELECT COUNT(*) FROM (
+                    SELECT 1 FROM {shadow} WHERE {where} GROUP BY {key} HAVING COUNT(*) > 1
+                ) duplicates;
+            """)
+            duplicates = cur.fetchone()[0]
+            if duplicates:
+                problems.append(f"{shadow} has {duplicates} duplicated ({key}) keys")
+
+        cur.execute("""
+            SELECT COUNT(*) FROM pg_constraint WHERE confrelid = %s::regclass;
+        """, (table,))
+        if cur.fetchone()[0]:
+            # A foreign key would stay attached to the old table through the rename
+            problems.append(f"{table} is referenced by foreign keys, which a rename swap would break")
+    conn.rollback()
+    return problems
+
+
+def swap(conn, table: str, shadow: str, index_names: List[str]) -> float:
+    """
+    Rename the shadow into place and drop the old table in one transaction, retried while
+    the lock is busy; returns how long the lock was held, in seconds.
+    """
+    old = f"{table}_old"
+
+    def rename(cur) -> float:
+        cur.execute("SELECT pg_get_serial_sequence(%s, 'id');", (table,))
+        sequence = cur.fetchone()[0]
+        cur.execute(f"LOCK TABLE {table} IN ACCESS EXCLUSIVE MODE;")
+        locked = time.perf_counter()
+
+        cur.execute(f"DROP TABLE IF EXISTS {old};")
+        cur.execute(f"ALTER TABLE {table} RENAME TO {old};")
+        for name in index_names:
+            # Renaming an index that backs a constraint renames the constraint too
+            cur.execute(f"ALTER INDEX {name} RENAME TO {name}_old;")
+        cur.execute(f"ALTER TABLE {shadow} RENAME TO {table};")
+        for name in index_names:
+            cur.execute(f"ALTER INDEX {name}_shadow RENAME TO {name};")
+        if sequence:
+            # Otherwise dropping the old table would drop the sequence with it
+            cur.execute(f"ALTER SEQUENCE {sequence} OWNED BY {table}.id;")
+            cur.execute(f"""
+                SELECT setval(%s, GREATEST(MAX(id), (SELECT last_value FROM {sequence}), 1))
+                FROM {table};
+            """, (sequence,))
+        # Anything else still depending on the old table, such as a view, fails here and
+        # rolls the whole swap back
+        cur.execute(f"DROP TABLE {old};")
+        return locked
+
+    locked = schema.with_lock_retries(conn, table, rename)
+    return time.perf_counter() - locked
+
+
+def drop_shadow(conn, shadow: str):
+    with conn.cursor() as cur:
+        cur.execute(f"DROP TABLE IF EXISTS {shadow};")
+    conn.commit()
+
+
+def refresh(pool: ThreadedConnectionPool, name: str, options: Dict) -> Dict:
+    """Run one pipeline from shadow load to swap; returns what happened."""
+    pipeline = PIPELINES[name]
+    table = pipeline['table']
+    result = {'pipeline': name, 'table': table, 'rows': None, 'swapped': False, 'lock_seconds': None,
+              'problems': []}
+    start = time.perf_counter()
+
+    conn = pool.getconn()
+    shadow = None
+    try:
+        with import_profile.span(f'{name}_shadow_setup'):
+            shadow = create_shadow(conn, table)
+        with import_profile.span(f'{name}_load'):
+            result['rows'] = pipeline['load'](conn, shadow, options)
+        with import_profile.span(f'{name}_indexes'):
+            index_names = build_indexes(conn, table, shadow)
+        print(f"[{name}] loaded {result['rows']} rows into {shadow} and built {len(index_names)} indexes "
+              f"in {time.perf_counter() - start:.2f}s")
+
+        with import_profile.span(f'{name}_checks'):
+            result['problems'] = check_shadow(conn, pipeline, shadow, options['min_ratio'])
+        for problem in result['problems']:
+            print(f"[{name}] check failed: {problem}")
+
+        if result['problems']:
+            print(f"[{name}] {table} left as it was; {shadow} kept for inspection")
+        elif options['dry_run']:
+            print(f"[{name}] dry run: checks passed, {table} left as it was")
+            drop_shadow(conn, shadow)
+        else:
+            with import_profile.span(f'{name}_swap'):
+                result['lock_seconds'] = swap(conn, table, shadow, index_names)
+            result['swapped'] = True
+            print(f"[{name}] swapped {shadow} in as {table}; lock held {result['lock_seconds'] * 1000:.1f} ms")
+
+            with import_profile.span(f'{name}_search_index'):
+                pipeline['search_index'](conn)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        pool.putconn(conn)
+
+    result['seconds'] = time.perf_counter() - start
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Refresh airports and aircraft types through shadow tables')
+    parser.add_argument('--only', choices=list(PIPELINES), action='append',
+                        help='Run only this pipeline (repeatable; default: all)')
+    parser.add_argument('--dry-run', action='store_true',
+                        help='Load and check the shadow tables, then drop them without swapping')
+    parser.add_argument('--min-row-ratio', type=float, default=MIN_ROW_RATIO,
+                        help='Refuse to swap if the new table has fewer rows than this share of the live one')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Processes used to parse the aircraft PDF on a parse cache miss (default: 1)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always parse the aircraft PDF, ignoring and not updating the parse cache')
+    import_profile.add_arguments(parser)
+    args = parser.parse_args()
+
+    names = args.only or list(PIPELINES)
+    options = {
+        'dry_run': args.dry_run,
+        'min_ratio': args.min_row_ratio,
+        'workers': args.workers,
+        'no_cache': args.no_cache,
+    }
+
+    pool = None
+    try:
+        with import_profile.profiled('refresh_reference_data', args) as run:
+            with import_profile.span('db_connect'):
+                pool = ThreadedConnectionPool(1, len(names), db_url)
+
+            start = time.perf_counter()
+            results = []
+            with ThreadPoolExecutor(max_workers=len(names)) as executor:
+                futures = {name: executor.submit(refresh, pool, name, options) for name in names}
+                for name, future in futures.items():
+                    try:
+                        results.append(future.result())
+                    except Exception as e:
+                        print(f"[{name}] Error: {e}")
+                        results.append({'pipeline': name, 'swapped': False, 'problems': [str(e)]})
+            elapsed = time.perf_counter() - start
+
+            run.rows = sum(result.get('rows') or 0 for result in results)
+            run.extra['pipelines'] = results
+            for result in results:
+                status = 'swapped' if result['swapped'] else 'not swapped'
+                seconds = f" in {result['seconds']:.2f}s" if 'seconds' in result else ''
+                print(f"{result['pipeline']}: {status}{seconds}")
+            print(f"Refresh finished in {elapsed:.2f}s")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if pool:
+            pool.closeall()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,358 @@
+#!/usr/bin/env python3
+"""
+Great-circle distances and nearest-airport lookups over the airports table.
+
+route_data only stores airport ids, so everything geographic needs the coordinates. They
+are loaded once into contiguous NumPy arrays sorted by id; a batch of routes is flattened
+into one array of stops and every leg is measured in a single vectorized pass. Nearest
+airports come from a k-d tree over unit-sphere xyz coordinates, where the straight-line
+(chord) distance orders points the same way as the great-circle distance does.
+
+    python route_geometry.py backfill [--all]
+    python route_geometry.py nearest -33.9 151.2 -k 5
+    python route_geometry.py bench --legs 1000000
+"""
+import argparse
+import math
+import os
+import time
+from itertools import chain
+from typing import Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+import psycopg2
+from dotenv import load_dotenv
+from psycopg2.extras import execute_values
+from scipy.spatial import cKDTree
+
+import schema
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+# Mean Earth radius (IUGG)
+EARTH_RADIUS_KM = 6371.0088
+
+# Stands in for a stop that has no airport (custom waypoints)
+NO_AIRPORT = -1
+
+# Stored in route_distance_km for a route that can't be measured, so the backfill doesn't
+# read it again on every run. NULL means not measured yet
+UNMEASURABLE_KM = -1
+
+# Rows read and updated per backfill batch
+BATCH_SIZE = 5000
+
+
+def unit_vectors(latitudes: np.ndarray, longitudes: np.ndarray) -> np.ndarray:
+    """(n, 3) xyz on the unit sphere for latitudes/longitudes in radians."""
+    cos_lat = np.cos(latitudes)
+    return np.column_stack((cos_lat * np.cos(longitudes), cos_lat * np.sin(longitudes), np.sin(latitudes)))
+
+
+def chord_to_km(chord: np.ndarray) -> np.ndarray:
+    """Great-circle distance for a straight-line distance between two unit vectors."""
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.clip(chord / 2, 0.0, 1.0))
+
+
+def route_airport_ids(route_data: Optional[List]) -> List[int]:
+    """Airport ids of a route_data array in stop order, NO_AIRPORT for custom waypoints."""
+    ids = []
+    for stop in route_data or []:
+        airport_id = stop.get('airport_id') if not stop.get('is_custom') else None
+        try:
+            ids.append(int(airport_id))
+        except (TypeError, ValueError):
+            ids.append(NO_AIRPORT)
+    return ids
+
+
+class AirportGeometry:
+    """Airport coordinates as arrays keyed by id; build once and reuse for every batch."""
+
+    def __init__(self, ids: Sequence[int], latitudes: Sequence[float], longitudes: Sequence[float]):
+        ids = np.asarray(ids, dtype=np.int64)
+        order = np.argsort(ids, kind='stable')
+        self.ids = np.ascontiguousarray(ids[order])
+        self.latitudes = np.ascontiguousarray(np.radians(np.asarray(latitudes, dtype=np.float64)[order]))
+        self.longitudes = np.ascontiguousarray(np.radians(np.asarray(longitudes, dtype=np.float64)[order]))
+        self.cos_latitudes = np.cos(self.latitudes)
+        self.xyz = unit_vectors(self.latitudes, self.longitudes)
+        self._tree = None
+
+    @classmethod
+    def from_db(cls, conn) -> 'AirportGeometry':
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT id, latitude, longitude FROM airports
+                WHERE latitude IS NOT NULL AND longitude IS NOT NULL;
+            """)
+            rows = cur.fetchall()
+        if not rows:
+            return cls([], [], [])
+        ids, latitudes, longitudes = zip(*rows)
+        # DECIMAL comes back as Decimal; float() each once here rather than per query
+        return cls(ids, [float(v) for v in latitudes], [float(v) for v in longitudes])
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    @property
+    def tree(self) -> cKDTree:
+        if self._tree is None:
+            self._tree = cKDTree(self.xyz)
+        return self._tree
+
+    def positions(self, airport_ids) -> Tuple[np.ndarray, np.ndarray]:
+        """Array positions of airport_ids and a mask of the ids that have coordinates."""
+        airport_ids = np.asarray(airport_ids, dtype=np.int64)
+        positions = np.searchsorted(self.ids, airport_ids)
+        positions = np.minimum(positions, max(len(self.ids) - 1, 0))
+        found = (self.ids[positions] == airport_ids) if len(self.ids) else np.zeros(airport_ids.shape, bool)
+        return positions, found
+
+    def _haversine(self, a: np.ndarray, b: np.ndarray) -> np.ndarray:
+        """Distances in km between airports at positions a and b."""
+        half_dlat = (self.latitudes[b] - self.latitudes[a]) / 2
+        half_dlon = (self.longitudes[b] - self.longitudes[a]) / 2
+        h = np.sin(half_dlat) ** 2 + self.cos_latitudes[a] * self.cos_latitudes[b] * np.sin(half_dlon) ** 2
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(h, 1.0)))
+
+    def leg_distances(self, from_ids, to_ids) -> np.ndarray:
+        """Distance in km for each (from, to) pair; NaN where either airport has no coordinates."""
+        a, found_a = self.positions(from_ids)
+        b, found_b = self.positions(to_ids)
+        distances = self._haversine(a, b)
+        distances[~(found_a & found_b)] = np.nan
+        return distances
+
+    def route_distances(self, routes: Iterable[Sequence[int]]) -> np.ndarray:
+        """
+        Total distance in km of each route (a sequence of airport ids, NO_AIRPORT for custom
+        stops). A route is NaN if it has fewer than two stops or any stop can't be located.
+        """
+        routes = list(routes)
+        lengths = np.fromiter((len(route) for route in routes), dtype=np.int64, count=len(routes))
+        total = int(lengths.sum())
+        result = np.full(len(routes), np.nan)
+        if total < 2:
+            return result
+
+        stops = np.fromiter(chain.from_iterable(routes), dtype=np.int64, count=total)
+        positions, found = self.positions(stops)
+
+        # Measure every consecutive pair of the flattened stops, including the pairs that
+        # straddle two routes; those fall outside every route's range below and are ignored
+        legs = self._haversine(positions[:-1], positions[1:])
+        bad = ~(found[:-1] & found[1:])
+        legs[bad] = 0.0
+        leg_sums = np.concatenate(([0.0], np.cumsum(legs)))
+        bad_counts = np.concatenate(([0], np.cumsum(bad)))
+
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        ends = starts + lengths - 1
+        valid = lengths >= 2
+        starts, ends = starts[valid], ends[valid]
+        distances = leg_sums[ends] - leg_sums[starts]
+        distances[(bad_counts[ends] - bad_counts[starts]) > 0] = np.nan
+        result[valid] = distances
+        return result
+
+    def nearest(self, latitudes, longitudes, k: int = 1) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        The k nearest airports to each point (degrees), as (ids, km) arrays of shape (n, k).
+        Missing neighbours (k larger than the airport count) have id NO_AIRPORT and km inf.
+        """
+        points = unit_vectors(np.radians(np.atleast_1d(np.asarray(latitudes, dtype=np.float64))),
+                              np.radians(np.atleast_1d(np.asarray(longitudes, dtype=np.float64))))
+        chords, positions = self.tree.query(points, k=k)
+        chords = np.asarray(chords).reshape(len(points), k)
+        positions = np.asarray(positions).reshape(len(points), k)
+
+        missing = positions >= len(self.ids)
+        ids = np.where(missing, NO_AIRPORT, self.ids[np.minimum(positions, len(self.ids) - 1)])
+        km = np.where(missing, np.inf, chord_to_km(np.where(missing, 0.0, chords)))
+        return ids, km
+
+
+def backfill(conn, geometry: AirportGeometry, recompute_all: bool = False,
+             batch_size: int = BATCH_SIZE) -> Tuple[int, int]:
+    """
+    Store each entry's route distance in route_distance_km, batch by batch in id order.
+
+    By default only entries without a distance are read: new entries, and entries whose route
+    PUT /api/logbook changed, since it clears the distance. An interrupted run therefore picks
+    up where it stopped; recompute_all rewrites every entry, e.g. after airport coordinates
+    change. Entries whose route can't be measured, including those with fewer than two
+    stops, get UNMEASURABLE_KM and are only read again by recompute_all or after a PUT.
+    Commits after each batch and returns (entries read, distances written).
+    """
+    # Databases created from an older create.sql don't have the column yet
+    schema.ensure_column(conn, 'logbook_entries', 'route_distance_km', 'NUMERIC(8,1)')
+    conn.commit()
+
+    last_id = 0
+    read = written = 0
+    missing_only = '' if recompute_all else 'AND route_distance_km IS NULL'
+    while True:
+        with conn.cursor() as cur:
+            # Keyset pagination keeps every batch an index range scan on the primary key
+            cur.execute(f"""
+                SELECT id, route_data FROM logbook_entries
+                WHERE id > %s {missing_only}
+                ORDER BY id
+                LIMIT %s;
+            """, (last_id, batch_size))
+            rows = cur.fetchall()
+            if not rows:
+                break
+
+            distances = geometry.route_distances(route_airport_ids(route_data) for _, route_data in rows)
+            updates = [
+                (entry_id, UNMEASURABLE_KM if np.isnan(distance) else round(float(distance), 1))
+                for (entry_id, _), distance in zip(rows, distances)
+            ]
+            execute_values(cur, """
+                UPDATE logbook_entries AS le SET route_distance_km = v.distance
+                FROM (VALUES %s) AS v (id, distance)
+                WHERE le.id = v.id
+            """, updates, template="(%s::integer, %s::numeric)", page_size=batch_size)
+        conn.commit()
+
+        last_id = rows[-1][0]
+        read += len(rows)
+        written += sum(1 for _, distance in updates if distance != UNMEASURABLE_KM)
+        print(f"  {read} entries read, {written} distances written (last id {last_id})")
+
+    return read, written
+
+
+def synthetic_geometry(count: int, seed: int = 42) -> AirportGeometry:
+    """Airports spread uniformly over the sphere, for benchmarking without a database."""
+    rng = np.random.default_rng(seed)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, count)))
+    longitudes = rng.uniform(-180, 180, count)
+    return AirportGeometry(np.arange(1, count + 1), latitudes, longitudes)
+
+
+def scalar_route_distance(coordinates, route: Sequence[int]) -> float:
+    """Per-leg haversine in plain Python, as a row-by-row job would do it; for comparison."""
+    total = 0.0
+    for a, b in zip(route, route[1:]):
+        lat1, lon1 = coordinates[a]
+        lat2, lon2 = coordinates[b]
+        h = (math.sin((lat2 - lat1) / 2) ** 2
+             + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2)
+        total += 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(h, 1.0)))
+    return total
+
+
+def microbenchmark(geometry: AirportGeometry, legs: int, queries: int, k: int, seed: int = 42):
+    """Time route distances over `legs` legs and k-nearest lookups for `queries` points."""
+    rng = np.random.default_rng(seed)
+    timings = []
+
+    def timed(name, count, unit, fn):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        timings.append((name, count, unit, elapsed))
+        print(f"  {name:<34} {count:>9} {unit:<7} {elapsed:>8.3f}s {count / elapsed:>14,.0f} {unit}/s")
+        return result
+
+    # Routes of 2-4 stops (1-3 legs), like the generator's circuits, trips and multi-stop days
+    route_lengths = []
+    remaining = legs
+    while remaining > 0:
+        stops = min(int(rng.integers(2, 5)), remaining + 1)
+        route_lengths.append(stops)
+        remaining -= stops - 1
+    stop_ids = geometry.ids[rng.integers(0, len(geometry), int(sum(route_lengths)))]
+    bounds = np.cumsum([0] + route_lengths)
+    routes = [stop_ids[bounds[i]:bounds[i + 1]].tolist() for i in range(len(route_lengths))]
+
+    print(f"{len(geometry)} airports, {len(routes)} routes, {legs} legs")
+    timed('leg distances (vectorized)', legs, 'legs',
+          lambda: geometry.leg_distances(stop_ids[:-1][:legs], stop_ids[1:][:legs]))
+    distances = timed('route distances (vectorized)', legs, 'legs', lambda: geometry.route_distances(routes))
+
+    # The scalar path is far slower, so time a sample and check it agrees
+    coordinates = dict(zip(geometry.ids.tolist(), zip(geometry.latitudes.tolist(), geometry.longitudes.tolist())))
+    sample = routes[:max(1, len(routes) // 20)]
+    sample_legs = sum(len(route) - 1 for route in sample)
+    scalar = timed('route distances (scalar sample)', sample_legs, 'legs',
+                   lambda: [scalar_route_distance(coordinates, route) for route in sample])
+    assert np.allclose(scalar, distances[:len(sample)]), 'vectorized and scalar distances disagree'
+
+    timed('k-d tree build', len(geometry), 'airports', lambda: geometry.tree)
+    latitudes = np.degrees(np.arcsin(rng.uniform(-1, 1, queries)))
+    longitudes = rng.uniform(-180, 180, queries)
+    timed(f'nearest airports (k={k})', queries, 'points', lambda: geometry.nearest(latitudes, longitudes, k))
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Route distances and nearest-airport lookups')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    backfill_parser = subparsers.add_parser('backfill', help='Store route_distance_km for logbook entries')
+    backfill_parser.add_argument('--all', action='store_true',
+                                 help='Recompute every entry, not only those without a distance')
+    backfill_parser.add_argument('--batch-size', type=int, default=BATCH_SIZE)
+
+    nearest_parser = subparsers.add_parser('nearest', help='Nearest airports to a point')
+    nearest_parser.add_argument('latitude', type=float)
+    nearest_parser.add_argument('longitude', type=float)
+    nearest_parser.add_argument('-k', type=int, default=5)
+
+    bench_parser = subparsers.add_parser('bench', help='Microbenchmark distances and nearest lookups')
+    bench_parser.add_argument('--legs', type=int, default=1000000)
+    bench_parser.add_argument('--queries', type=int, default=100000)
+    bench_parser.add_argument('-k', type=int, default=5)
+    bench_parser.add_argument('--synthetic', type=int, metavar='AIRPORTS',
+                              help='Use this many random airports instead of the airports table')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        if args.command == 'bench' and args.synthetic:
+            geometry = synthetic_geometry(args.synthetic)
+        else:
+            # Connect to database
+            conn = psycopg2.connect(db_url)
+            start = time.perf_counter()
+            geometry = AirportGeometry.from_db(conn)
+            print(f"Loaded {len(geometry)} airports with coordinates in {time.perf_counter() - start:.2f}s")
+
+        if args.command == 'backfill':
+            start = time.perf_counter()
+            read, written = backfill(conn, geometry, args.all, args.batch_size)
+            elapsed = time.perf_counter() - start
+            print(f"Backfilled {written} route distances from {read} entries in {elapsed:.2f}s")
+
+        elif args.command == 'nearest':
+            ids, km = geometry.nearest(args.latitude, args.longitude, args.k)
+            with conn.cursor() as cur:
+                cur.execute("SELECT id, icao, iata, airport_name FROM airports WHERE id = ANY(%s);",
+                            ([int(i) for i in ids[0] if i != NO_AIRPORT],))
+                names = {row[0]: row[1:] for row in cur.fetchall()}
+            for airport_id, distance in zip(ids[0], km[0]):
+                if airport_id == NO_AIRPORT:
+                    continue
+                icao, iata, name = names[int(airport_id)]
+                print(f"  {distance:>8.1f} km  {icao or '----'} {iata or '---'} {name}")
+
+        else:
+            microbenchmark(geometry, args.legs, args.queries, args.k)
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
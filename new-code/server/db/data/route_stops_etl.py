@@ -0,0 +1,274 @@
+#!/usr/bin/env python3
+"""
+Normalizes logbook_entries.route_data into route_stops(entry_id, seq, type, airport_id,
+custom_name), so airport frequency, visited-airport and route queries can use B-tree
+indexes instead of expanding JSONB on every request.
+
+The first run backfills every entry in id order, chunk by chunk. Each chunk is committed
+together with its checkpoint in job_state, so an interrupted backfill resumes from the last
+committed chunk. Once the backfill has finished, later runs are incremental: new entries are
+read from past the checkpoint, and edited entries (updated_at past the watermark) have their
+stops rewritten. Deleted entries take their stops with them through the foreign key, or
+once logbook_entries is partitioned, through a trigger in its place: partition_logbook.py
+installs it at cutover, or ensure_table does when route_stops is created after that.
+
+    python route_stops_etl.py            # backfill, resume, or catch up
+    python route_stops_etl.py --full     # start over from an empty route_stops
+"""
+import argparse
+import csv
+import io
+import os
+import time
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import psycopg2
+from dotenv import load_dotenv
+
+import job_state
+import schema
+
+# Load environment variables
+load_dotenv()
+
+# Database connection parameters
+db_url = os.getenv('DATABASE_URL')
+
+JOB_NAME = 'route_stops_etl'
+
+STOP_COLUMNS = ['entry_id', 'seq', 'type', 'airport_id', 'custom_name']
+
+# Entries per committed chunk, and rows fetched per round trip from the server-side cursor
+CHUNK_SIZE = 10000
+FETCH_SIZE = 2000
+
+
+# Stands in for route_stops' ON DELETE CASCADE once partition_logbook.py has partitioned
+# logbook_entries: its primary key is then (id, flight_date), which entry_id can't reference.
+# An update that moves an entry to another partition is a delete and an insert underneath,
+# so only entries that are really gone lose their stops
+DELETE_STOPS_FUNCTION = """
+    CREATE OR REPLACE FUNCTION logbook_entries_delete_route_stops() RETURNS trigger AS $$
+    BEGIN
+        DELETE FROM route_stops
+        WHERE entry_id = OLD.id
+          AND NOT EXISTS (SELECT 1 FROM logbook_entries WHERE id = OLD.id);
+        RETURN NULL;
+    END;
+    $$ LANGUAGE plpgsql;
+"""
+
+
+def install_delete_trigger(cur):
+    """Remove a deleted entry's stops through a trigger on logbook_entries. Does not commit."""
+    cur.execute(DELETE_STOPS_FUNCTION)
+    cur.execute("""
+        CREATE TRIGGER logbook_entries_route_stops
+        AFTER DELETE ON logbook_entries
+        FOR EACH ROW EXECUTE FUNCTION logbook_entries_delete_route_stops();
+    """)
+
+
+def ensure_table(conn):
+    """
+    Create route_stops with its airport index, plus job_state for the ETL's checkpoint. When
+    logbook_entries is partitioned, route_stops gets the delete trigger instead of a foreign
+    key; the trigger is created through schema.with_lock_retries, which commits.
+    """
+    with conn.cursor() as cur:
+        cur.execute("SELECT relkind = 'p' FROM pg_class WHERE oid = 'logbook_entries'::regclass;")
+        partitioned = cur.fetchone()[0]
+        foreign_key = '' if partitioned else \
+            ', FOREIGN KEY (entry_id) REFERENCES logbook_entries(id) ON DELETE CASCADE'
+        cur.execute(f"""
+            CREATE TABLE IF NOT EXISTS route_stops (
+                entry_id INTEGER NOT NULL,
+                seq SMALLINT NOT NULL,
+                type VARCHAR(20),
+                airport_id INTEGER,
+                custom_name VARCHAR(255),
+                PRIMARY KEY (entry_id, seq){foreign_key}
+            );
+        """)
+        cur.execute("CREATE INDEX IF NOT EXISTS idx_route_stops_airport ON route_stops(airport_id);")
+        cur.execute("""
+            SELECT EXISTS (
+                SELECT 1 FROM pg_trigger
+                WHERE tgrelid = 'logbook_entries'::regclass AND tgname = 'logbook_entries_route_stops'
+            );
+        """)
+        has_trigger = cur.fetchone()[0]
+    job_state.ensure_table(conn)
+    job_state.ensure_changed_at_index(conn)
+    if partitioned and not has_trigger:
+        conn.commit()
+        schema.with_lock_retries(conn, 'logbook_entries', install_delete_trigger)
+
+
+def to_airport_id(value) -> Optional[int]:
+    """route_data ids are numbers, but older clients sent strings; anything else has no airport."""
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def route_stop_rows(entry_id: int, route_data) -> Iterable[List]:
+    for seq, stop in enumerate(route_data or []):
+        if not isinstance(stop, dict):
+            continue
+        stop_type, custom_name = stop.get('type'), stop.get('custom_name')
+        yield [
+            entry_id,
+            seq,
+            stop_type[:20] if isinstance(stop_type, str) else None,
+            to_airport_id(stop.get('airport_id')),
+            custom_name[:255] if isinstance(custom_name, str) else None,
+        ]
+
+
+def read_chunk(conn, where: str, params: Tuple, chunk_size: int) -> List[Tuple]:
+    """
+    Up to chunk_size (id, route_data) rows in id order, streamed from a named server-side
+    cursor FETCH_SIZE rows at a time, so the client never holds a whole result set it
+    didn't ask for.
+    """
+    with conn.cursor(name='route_stops_source') as cur:
+        cur.itersize = FETCH_SIZE
+        cur.execute(f"""
+            SELECT id, route_data FROM logbook_entries
+            WHERE {where}
+            ORDER BY id
+            LIMIT %s;
+        """, params + (chunk_size,))
+        return list(cur)
+
+
+def write_stops(conn, entries: List[Tuple]) -> int:
+    """Replace the stops of these entries with one COPY. Does not commit."""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    count = 0
+    for entry_id, route_data in entries:
+        for row in route_stop_rows(entry_id, route_data):
+            writer.writerow(row)
+            count += 1
+    buffer.seek(0)
+
+    with conn.cursor() as cur:
+        # A resumed chunk or an edited entry may already have stops
+        cur.execute("DELETE FROM route_stops WHERE entry_id = ANY(%s);", ([entry_id for entry_id, _ in entries],))
+        cur.copy_expert(f"COPY route_stops ({', '.join(STOP_COLUMNS)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    return count
+
+
+def copy_new_entries(conn, state: Dict, chunk_size: int) -> Tuple[int, int]:
+    """Copy entries past the checkpoint, committing the checkpoint with every chunk."""
+    entries_done = stops_done = 0
+    while True:
+        entries = read_chunk(conn, 'id > %s', (state['last_id'],), chunk_size)
+        if not entries:
+            return entries_done, stops_done
+
+        stops_done += write_stops(conn, entries)
+        entries_done += len(entries)
+        state['last_id'] = entries[-1][0]
+        job_state.save_state(conn, JOB_NAME, state['watermark'], state['last_id'], state['details'])
+        conn.commit()
+        print(f"  {entries_done} entries, {stops_done} stops (checkpoint id {state['last_id']})")
+
+
+def rewrite_edited_entries(conn, since, up_to_id: int, chunk_size: int) -> Tuple[int, int]:
+    """
+    Rewrite the stops of entries up to the checkpoint that were edited since `since`, or
+    inserted by a transaction that committed after a later id was already copied.
+    """
+    with conn.cursor() as cur:
+        # Found through idx_logbook_changed_at first; filtering an id-ordered read instead
+        # would walk the primary key across the whole table
+        cur.execute(f"""
+            SELECT id FROM logbook_entries
+            WHERE {job_state.ENTRY_CHANGED_AT} > %s AND id <= %s
+            ORDER BY id;
+        """, (since, up_to_id))
+        entry_ids = [row[0] for row in cur.fetchall()]
+
+    entries_done = stops_done = 0
+    for start in range(0, len(entry_ids), chunk_size):
+        # A large batch of edits is still written and committed in chunks
+        entries = read_chunk(conn, 'id = ANY(%s)', (entry_ids[start:start + chunk_size],), chunk_size)
+        stops_done += write_stops(conn, entries)
+        entries_done += len(entries)
+        conn.commit()
+    return entries_done, stops_done
+
+
+def run(conn, full: bool = False, chunk_size: int = CHUNK_SIZE):
+    ensure_table(conn)
+    conn.commit()
+
+    with conn.cursor() as cur:
+        # Taken before reading anything, so edits made during this run are seen by the next
+        cur.execute("SELECT CURRENT_TIMESTAMP::timestamp;")
+        started_at = cur.fetchone()[0]
+
+    state = None if full else job_state.load_state(conn, JOB_NAME)
+    if state is None:
+        print("Starting backfill from an empty route_stops")
+        with conn.cursor() as cur:
+            cur.execute("TRUNCATE route_stops;")
+        state = {'watermark': started_at, 'last_id': 0, 'details': {'phase': 'backfill'}}
+        job_state.save_state(conn, JOB_NAME, state['watermark'], state['last_id'], state['details'])
+        conn.commit()
+    elif state['details'].get('phase') == 'backfill':
+        print(f"Resuming backfill after entry {state['last_id']}")
+    else:
+        print(f"Catching up: entries after {state['last_id']}, edits since {state['watermark']}")
+
+    backfilling = state['details'].get('phase') == 'backfill'
+    previous_last_id = state['last_id']
+    # Edits are only looked for once a backfill has finished; during one the watermark
+    # stays at the time it started, so edits to entries it already copied are caught later
+    since = state['watermark'] - job_state.WATERMARK_OVERLAP
+
+    entries, stops = copy_new_entries(conn, state, chunk_size)
+    print(f"Copied {entries} entries ({stops} stops)")
+
+    edited_entries = edited_stops = 0
+    if not backfilling:
+        edited_entries, edited_stops = rewrite_edited_entries(conn, since, previous_last_id, chunk_size)
+        print(f"Rewrote {edited_entries} edited entries ({edited_stops} stops)")
+        watermark = started_at
+    else:
+        # The next run looks for edits made since the backfill started
+        watermark = state['watermark']
+
+    job_state.save_state(conn, JOB_NAME, watermark, state['last_id'], {'phase': 'incremental'})
+    conn.commit()
+    return entries + edited_entries
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Normalize route_data into route_stops')
+    parser.add_argument('--full', action='store_true', help='Discard route_stops and the checkpoint and start over')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE, help='Entries per committed chunk')
+    args = parser.parse_args()
+
+    conn = None
+    try:
+        # Connect to database
+        conn = psycopg2.connect(db_url)
+
+        start = time.perf_counter()
+        entries = run(conn, args.full, args.chunk_size)
+        elapsed = time.perf_counter() - start
+        print(f"Processed {entries} entries in {elapsed:.2f}s ({entries / elapsed:.0f} entries/sec)")
+
+    except Exception as e:
+        print(f"Error: {e}")
+    finally:
+        if conn:
+            conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Schema changes the data scripts make on a live database."""
+import time
+from typing import Callable, TypeVar
+
+from psycopg2.errors import LockNotAvailable
+
+T = TypeVar('T')
+
+# How long DDL on a live table waits for its lock before giving up on one attempt, so it
+# never queues behind a long query while blocking every query that arrives after it
+LOCK_TIMEOUT = '2s'
+LOCK_ATTEMPTS = 5
+
+
+def column_exists(conn, table: str, column: str) -> bool:
+    with conn.cursor() as cur:
+        cur.execute("""
+            SELECT 1 FROM information_schema.columns
+            WHERE table_schema = current_schema() AND table_name = %s AND column_name = %s;
+        """, (table, column))
+        return cur.fetchone() is not None
+
+
+def ensure_column(conn, table: str, column: str, definition: str):
+    """
+    Add `column` to `table` unless it's already there. ADD COLUMN locks the table even when
+    the column exists, so the catalog is asked first, and a missing column is added through
+    with_lock_retries, which commits. Call it before writing anything in the transaction.
+    """
+    if column_exists(conn, table, column):
+        return
+    with_lock_retries(conn, table, lambda cur: cur.execute(
+        f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column} {definition};"))
+
+
+def with_lock_retries(conn, table: str, work: Callable[..., T], lock_timeout: str = LOCK_TIMEOUT,
+                      attempts: int = LOCK_ATTEMPTS) -> T:
+    """
+    Run work(cur) in one transaction under lock_timeout and commit it. If a lock isn't
+    granted in time the transaction is rolled back and run again after a growing pause;
+    `table` is only named in the messages. Returns what work returned.
+    """
+    for attempt in range(1, attempts + 1):
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SET LOCAL lock_timeout = %s;", (lock_timeout,))
+                result = work(cur)
+            conn.commit()
+            return result
+        except LockNotAvailable:
+            conn.rollback()
+            print(f"  {table} is busy, retrying ({attempt}/{attempts})")
+            time.sleep(attempt)
+    raise RuntimeError(f"Could not lock {table} within {lock_timeout} in {attempts} attempts")
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import psycopg2
+import pytest
+from dotenv import load_dotenv
+
+# The data scripts import each other as top-level modules
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Load environment variables
+load_dotenv()
+
+
+@pytest.fixture
+def conn():
+    """
+    A connection whose transaction is rolled back afterwards. Tests create temporary tables
+    that shadow the real ones by name, so nothing they write reaches the database.
+    """
+    db_url = os.getenv('DATABASE_URL')
+    if not db_url:
+        pytest.skip('DATABASE_URL is not set')
+    try:
+        connection = psycopg2.connect(db_url)
+    except psycopg2.OperationalError as e:
+        pytest.skip(f"Database not reachable: {e}")
+    try:
+        yield connection
+    finally:
+        connection.rollback()
+        connection.close()
@@ -0,0 +1,72 @@
+"""The aircraft token index must answer like the /api/aircraft-types/search SQL it replaces."""
+import pytest
+from psycopg2.extras import execute_values
+
+import aircraft_search_index
+import api_queries
+
+# Covers each reachable priority, scores that outrank model order, stripped designators,
+# a NULL designator and a NULL model
+AIRCRAFT = [
+    (1, 'B738', '737-800', 'BOEING', 'M'),
+    (2, 'B737', '737-700', 'BOEING', 'M'),
+    (3, 'B38M', '737 MAX 8', 'BOEING', 'M'),
+    (4, 'B739', '737-900ER', 'BOEING', 'M'),
+    (5, 'A320', 'A-320', 'AIRBUS', 'M'),
+    (6, 'A20N', 'A-320neo', 'AIRBUS', 'M'),
+    (7, 'C172', 'Skyhawk 172', 'CESSNA', 'L'),
+    (8, 'C72R', 'Cutlass RG 172', 'CESSNA', 'L'),
+    (9, 'C150', '150', 'CESSNA', 'L'),
+    (10, 'C152', '152', 'CESSNA', 'L'),
+    (11, 'P28A', 'PA-28-140 Cherokee', 'PIPER', 'L'),
+    (12, 'P28B', 'PA-28-161 Warrior', 'PIPER', 'L'),
+    (13, 'P-28', None, 'PIPER', 'L'),
+    (14, 'B788', '787-8 Dreamliner', 'BOEING', 'H'),
+    (15, None, 'ASK 21', 'SCHLEICHER', None),
+    (16, 'A.32', 'Trainer 32', 'AEROPRAKT', 'L'),
+    (17, 'BE20', 'King Air 200', 'BEECH', 'L'),
+    (18, 'B350', 'King Air 100', 'BEECHCRAFT', 'L'),
+    (19, 'C208', 'Caravan 208', 'CESSNA', 'L'),
+    (20, 'C25A', 'Citation CJ2', 'CESSNA', 'L'),
+    (21, 'C25B', 'Citation CJ3', 'CESSNA', 'L'),
+    (22, 'C510', 'Citation Mustang', 'CESSNA', 'L'),
+    (23, 'C525', 'CitationJet', 'CESSNA', 'L'),
+    (24, 'C560', 'Citation 5', 'CESSNA', 'M'),
+    (25, 'C56X', 'Citation Excel', 'CESSNA', 'M'),
+]
+
+QUERIES = [
+    '737', 'boeing 737', '737 boeing', 'cessna 172', '172', 'a320', 'a-320', 'pa-28', 'p28', 'p-28',
+    'piper', 'boeing 787 dreamliner', 'max', 'cessna', 'citation', 'b7', 'c', 'air', 'king air',
+    'a32', 'a.32', 'ask', 'schleicher 21', 'beech', 'air be', 'king be', '8', 'xyz',
+]
+
+
+@pytest.fixture
+def index(conn):
+    """Temporary aircraft_types holding AIRCRAFT, and the index built from it."""
+    with conn.cursor() as cur:
+        # Models use code point order, as the index does
+        cur.execute("""
+            CREATE TEMP TABLE aircraft_types (
+                id INTEGER PRIMARY KEY,
+                designator VARCHAR(4),
+                model VARCHAR(255) COLLATE "C",
+                manufacturer VARCHAR(255) NOT NULL,
+                wtc VARCHAR(3)
+            );
+        """)
+        execute_values(cur, "INSERT INTO aircraft_types (id, designator, model, manufacturer, wtc) VALUES %s;",
+                       AIRCRAFT)
+    return aircraft_search_index.AircraftSearchIndex(
+        aircraft_search_index.build_index(aircraft_search_index.read_aircraft(conn)))
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_matches_sql(conn, index, query):
+    params = api_queries.aircraft_search_params(query)
+    with conn.cursor() as cur:
+        cur.execute(api_queries.aircraft_search_sql(len(params)), params)
+        expected = [row[0] for row in cur.fetchall()]
+
+    assert [aircraft['id'] for aircraft in index.search(query)] == expected
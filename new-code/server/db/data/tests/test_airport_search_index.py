@@ -0,0 +1,91 @@
+"""The prebuilt airport index must answer like the /api/airports/search SQL it replaces."""
+import pytest
+from psycopg2.extras import execute_values
+
+import airport_search_index
+import api_queries
+import import_airports
+
+# Covers every ranking tier, shared name lengths and a query with more than ten matches
+AIRPORTS = [
+    (1, 'YSSY', 'SYD', 'Sydney Kingsford Smith International Airport'),
+    (2, 'YSBK', 'BWU', 'Sydney Bankstown Airport'),
+    (3, 'YSCN', 'CDU', 'Camden Airport'),
+    (4, 'KSYR', 'SYR', 'Syracuse Hancock International Airport'),
+    (5, 'SYDA', None, 'Alpha Strip'),
+    (6, None, 'XSY', 'Bravo Field'),
+    (7, 'EGLL', 'LHR', 'London Heathrow Airport'),
+    (8, 'EGKK', 'LGW', 'London Gatwick Airport'),
+    (9, 'YMML', 'MEL', 'Melbourne Airport'),
+    (10, 'YMEN', 'MEB', 'Essendon Fields Airport'),
+    (11, 'KJFK', 'JFK', 'John F Kennedy International Airport'),
+    (12, 'OSYD', None, 'Remote Strip'),
+    (13, None, 'SYX', 'Charlie Field'),
+    (14, 'YSHW', None, 'Holsworthy Heliport'),
+    (15, 'YBAS', 'ASP', 'Alice Springs Airport'),
+    (16, None, 'ZZV', 'Zanesville Municipal Airport'),
+]
+
+QUERIES = [
+    'syd', 'SYD', 'yssy', 'ys', 'sy', 'y', 'lhr', 'heathrow', 'international airport',
+    'field', 'strip', 'airport', 'a', 'k', 'xsy', 'zz', 'zzz',
+]
+
+
+def create_airports(conn, rows):
+    """Temporary airports table holding `rows`. Names use code point order, as the index does."""
+    with conn.cursor() as cur:
+        cur.execute("""
+            CREATE TEMP TABLE airports (
+                id INTEGER PRIMARY KEY,
+                iata VARCHAR(3),
+                icao VARCHAR(4) UNIQUE,
+                airport_name VARCHAR(255) COLLATE "C" NOT NULL,
+                country_code VARCHAR(2),
+                region_name VARCHAR(255),
+                latitude DECIMAL(10, 7),
+                longitude DECIMAL(10, 7)
+            );
+        """)
+        execute_values(cur, """
+            INSERT INTO airports (id, icao, iata, airport_name, country_code, region_name, latitude, longitude)
+            VALUES %s;
+        """, rows)
+
+
+def sql_search(conn, query):
+    with conn.cursor() as cur:
+        cur.execute(api_queries.AIRPORT_SEARCH_SQL, api_queries.airport_search_params(query))
+        return cur.fetchall()
+
+
+def load_index(conn):
+    return airport_search_index.AirportSearchIndex(
+        airport_search_index.build_index(airport_search_index.read_airports(conn), 'test', 'test'))
+
+
+@pytest.mark.parametrize('query', QUERIES)
+def test_matches_sql_on_fixture(conn, query):
+    create_airports(conn, [(*airport, 'AU', None, None, None) for airport in AIRPORTS])
+    index = load_index(conn)
+
+    assert [airport['id'] for airport in index.search(query)] == [row[0] for row in sql_search(conn, query)]
+
+
+def test_matches_sql_on_csv(conn):
+    """
+    Same check over the whole bundled CSV. Its names repeat, and the SQL orders equal names
+    arbitrarily, so the ranked names are compared rather than the ids.
+    """
+    rows = [(airport_id, airport['icao'], airport['iata'], airport['airport_name'], airport['country_code'],
+             airport['region_name'], airport['latitude'], airport['longitude'])
+            for airport_id, airport in enumerate(import_airports.read_airports(), start=1)]
+    # The per-row importer keeps the last row of a duplicated ICAO
+    by_icao = {row[1]: row for row in rows if row[1]}
+    rows = [row for row in rows if not row[1] or by_icao[row[1]] is row]
+    create_airports(conn, rows)
+    index = load_index(conn)
+
+    for query in QUERIES + ['kingsford', 'los', 'new york', 'int', 'e', 'xyzq']:
+        names = [airport['airport_name'] for airport in index.search(query)]
+        assert names == [row[3] for row in sql_search(conn, query)], query
@@ -0,0 +1,50 @@
+"""Rows that can't be stored must be rejected to the rejects file, not stop the import."""
+from decimal import Decimal
+
+import pytest
+
+import import_logbook_csv
+from import_logbook_csv import RejectedRow, parse_hours
+
+
+@pytest.mark.parametrize('value, hours', [
+    ('', Decimal(0)),
+    ('1.5', Decimal('1.5')),
+    (' 2 ', Decimal('2.0')),
+    ('1.25', Decimal('1.3')),
+    ('1:30', Decimal('1.5')),
+    ('0:05', Decimal('0.1')),
+    ('99.9', Decimal('99.9')),
+    ('99:54', Decimal('99.9')),
+])
+def test_parses_hours(value, hours):
+    assert parse_hours(value, 'command_day') == hours
+
+
+@pytest.mark.parametrize('value', [
+    'NaN', 'nan', 'sNaN', '-NaN', 'inf', 'Infinity', '-Infinity',
+    '-1.5', '-0:30', '-0', '1:75', '1:60', ':30', '1:', '1:30:00', '+1:30', 'abc', '1,5',
+    '100', '99.96', '100:00', '1e3',
+])
+def test_rejects_unstorable_hours(value):
+    with pytest.raises(RejectedRow):
+        parse_hours(value, 'command_day')
+
+
+def test_rejects_over_max_hours():
+    with pytest.raises(RejectedRow, match='more than'):
+        parse_hours(str(import_logbook_csv.MAX_HOURS + Decimal('0.1')), 'command_day')
+
+
+def test_rejects_file_only_holds_this_runs_rows(tmp_path):
+    path = tmp_path / 'logbook.csv.rejects.csv'
+    path.write_text('line,error,date\n2,stale,2020-01-01\n')
+
+    rejects = import_logbook_csv.Rejects(str(path), ['date'])
+    rejects.close()
+    assert not path.exists()
+
+    rejects = import_logbook_csv.Rejects(str(path), ['date'])
+    rejects.add(3, 'bad date', {'date': 'x'})
+    rejects.close()
+    assert path.read_text().splitlines() == ['line,error,date', '3,bad date,x']
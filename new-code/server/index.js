@@ -82,15 +82,14 @@ app.get('/api/statistics/:userId', async (req, res) => {
         LIMIT 1
       ),
       popular_plane AS (
-        SELECT COALESCE(at.designator || ' - ' || at.manufacturer || ' ' || at.model, '') AS most_common_plane
+        SELECT COALESCE(ua.aircraft_designator || ' - ' || ua.aircraft_manufacturer || ' ' || ua.aircraft_model, '') AS most_common_plane
         FROM logbook_entries le
-        LEFT JOIN aircraft_types at ON le.aircraft_type = at.id
+        JOIN user_aircraft ua ON ua.user_id = le.user_id AND ua.aircraft_reg = le.aircraft_reg
         WHERE le.user_id = $1
           AND le.flight_date >= DATE_TRUNC('month', CURRENT_DATE)
-          AND le.aircraft_type IS NOT NULL
-        GROUP BY at.designator, at.manufacturer, at.model
+        GROUP BY ua.aircraft_designator, ua.aircraft_manufacturer, ua.aircraft_model
         ORDER BY COUNT(*) DESC
-        LIMIT 3
+        LIMIT 1
       ),
       longest_flight AS (
         SELECT 
@@ -365,15 +364,14 @@ app.get('/api/dashboard/:userId', async (req, res) => {
         LIMIT 1
       ),
       popular_plane AS (
-        SELECT COALESCE(at.designator || ' - ' || at.manufacturer || ' ' || at.model, '') AS most_common_plane
+        SELECT COALESCE(ua.aircraft_designator || ' - ' || ua.aircraft_manufacturer || ' ' || ua.aircraft_model, '') AS most_common_plane
         FROM logbook_entries le
-        LEFT JOIN aircraft_types at ON le.aircraft_type = at.id
+        JOIN user_aircraft ua ON ua.user_id = le.user_id AND ua.aircraft_reg = le.aircraft_reg
         WHERE le.user_id = $1
           AND le.flight_date >= DATE_TRUNC('month', CURRENT_DATE)
-          AND le.aircraft_type IS NOT NULL
-        GROUP BY at.designator, at.manufacturer, at.model
+        GROUP BY ua.aircraft_designator, ua.aircraft_manufacturer, ua.aircraft_model
         ORDER BY COUNT(*) DESC
-        LIMIT 3
+        LIMIT 1
       ),
       longest_flight AS (
         SELECT 
@@ -721,7 +719,10 @@ app.put('/api/logbook/:entryId', async (req, res) => {
         co_pilot_day = $15,
         co_pilot_night = $16,
         instrument_flight = $17,
-        instrument_sim = $18
+        instrument_sim = $18,
+        -- A changed route needs its distance measured again (db/data/route_geometry.py backfill)
+        route_distance_km = CASE WHEN route_data IS DISTINCT FROM $5::jsonb THEN NULL ELSE route_distance_km END,
+        updated_at = CURRENT_TIMESTAMP
       WHERE id = $19 AND user_id = $20
       RETURNING *;
     `;